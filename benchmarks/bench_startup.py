@@ -0,0 +1,89 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules each main.py mode imports
+MODE_IMPORTS = {
+    "clean": ["src.utils.preprocess"],
+    "day": ["src.agents.daily_topic_processor"],
+    "trend": ["src.agents.trend_builder", "src.agents.trend_analytics"],
+    "stream": ["src.agents.stream_pipeline", "src.agents.trend_store"],
+    "backfill": ["src.agents.backfill"],
+    "discover": ["src.agents.topic_discovery"],
+    "apps": ["src.agents.app_scheduler"],
+}
+
+# Heavy modules that must not be loaded just by importing a mode
+HEAVY_MODULES = ["torch", "sentence_transformers", "google.genai"]
+FORBIDDEN = {mode: list(HEAVY_MODULES) for mode in MODE_IMPORTS}
+FORBIDDEN["clean"] += ["pandas", "pyarrow", "numpy"]
+
+# Runs in a fresh interpreter: time the imports and report which watched modules got loaded
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+for name in {imports!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {watched!r} if m in sys.modules]}}))
+"""
+
+
+def measure_mode(mode: str, repeats: int = 5) -> dict:
+    """
+    Import a mode's modules in fresh interpreters and report the median import time.
+
+    Args:
+        mode: main.py mode name
+        repeats: Number of fresh interpreters to time
+
+    Returns:
+        Dictionary with the mode, median seconds and forbidden modules that were loaded
+    """
+    watched = sorted(set(HEAVY_MODULES) | {"pandas", "pyarrow", "numpy"})
+    code = PROBE.format(imports=MODE_IMPORTS[mode], watched=watched)
+    timings = []
+    loaded = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded = result["loaded"]
+    return {
+        "mode": mode,
+        "seconds": statistics.median(timings),
+        "loaded": loaded,
+        "forbidden": [m for m in loaded if m in FORBIDDEN[mode]],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Startup-time benchmark for main.py modes")
+    parser.add_argument("--modes", nargs="+", default=list(MODE_IMPORTS), choices=list(MODE_IMPORTS))
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per mode")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Fail if any mode's median import time exceeds this many seconds")
+    args = parser.parse_args()
+
+    failures = []
+    for mode in args.modes:
+        result = measure_mode(mode, args.repeats)
+        print(f"{mode:10s} {result['seconds'] * 1000:8.1f} ms  loaded: {', '.join(result['loaded']) or '-'}")
+        if result["forbidden"]:
+            failures.append(f"{mode} imports {', '.join(result['forbidden'])}")
+        if args.budget is not None and result["seconds"] > args.budget:
+            failures.append(f"{mode} took {result['seconds']:.3f}s (budget {args.budget:.3f}s)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
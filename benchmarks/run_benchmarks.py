@@ -0,0 +1,248 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+# Keep progress bars out of the timings
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic import write_corpus, HashingEncoder  # noqa: E402
+from src.agents import topic_agent  # noqa: E402
+from src.agents.daily_topic_processor import process_day, normalize_topic, normalize_topics  # noqa: E402
+from src.agents.topic_memory import TopicMemory  # noqa: E402
+from src.agents.trend_builder import build_trend_table  # noqa: E402
+from src.utils.fake_client import FakeGeminiClient, fake_phrases  # noqa: E402
+from src.utils.metrics import metrics  # noqa: E402
+from src.utils.preprocess import clean_daily_reviews  # noqa: E402
+
+RESULTS_PATH = PROJECT_ROOT / "benchmarks" / "results.jsonl"
+
+STAGES = ["clean", "process_day", "normalize_topics", "normalize_topic", "topic_memory", "trend_build"]
+
+
+def peak_rss_mb() -> float:
+    """
+    Return the process's peak resident set size so far, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(name: str, func, items: int, trace_memory: bool = False) -> dict:
+    """
+    Run one stage and measure its wall time, throughput and peak memory.
+
+    Args:
+        name: Stage name
+        func: Callable running the stage
+        items: Number of items the stage processes, for throughput and per-item latency
+        trace_memory: Measure the stage's peak Python allocations with tracemalloc
+            (slower); otherwise report the process's peak RSS after the stage
+
+    Returns:
+        Stage result dictionary
+    """
+    metrics.reset()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        func()
+    seconds = time.perf_counter() - started
+    result = {
+        "seconds": round(seconds, 4),
+        "items": items,
+        "items_per_s": round(items / seconds, 1) if seconds else None,
+        "us_per_item": round(seconds / items * 1e6, 2) if items else None,
+    }
+    if trace_memory:
+        result["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    result["peak_rss_mb"] = peak_rss_mb()
+
+    # Per-request latency of the (fake) LLM calls made by the stage
+    llm = metrics.report()["histograms"].get("llm.latency_s")
+    if llm:
+        result["llm_calls"] = llm["count"]
+        result["llm_p50_ms"] = round(llm["p50"] * 1000, 2)
+        result["llm_p95_ms"] = round(llm["p95"] * 1000, 2)
+    print(f"{name:18s} {result['seconds']:9.3f} s  {result['items_per_s'] or 0:12.1f} items/s  "
+          f"peak {result.get('peak_alloc_mb', result['peak_rss_mb'])} MB")
+    return result
+
+
+def git_commit() -> str | None:
+    """
+    Return the short hash of the checked-out commit, if available.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(record: dict, results_path: Path) -> None:
+    """
+    Print the change against the most recent earlier run with the same parameters.
+    """
+    previous = None
+    if results_path.exists():
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    earlier = json.loads(line)
+                    if earlier.get("params") == record["params"]:
+                        previous = earlier
+    if previous is None:
+        print("No earlier run with the same parameters to compare against")
+        return
+
+    print(f"Compared with {previous['timestamp']} ({previous.get('commit') or 'unknown commit'}):")
+    for stage, result in record["stages"].items():
+        before = previous["stages"].get(stage)
+        if not before or not before.get("seconds"):
+            continue
+        change = (result["seconds"] - before["seconds"]) / before["seconds"] * 100
+        print(f"  {stage:18s} {before['seconds']:9.3f} s -> {result['seconds']:9.3f} s ({change:+.1f}%)")
+
+
+def run(args: argparse.Namespace, workdir: str) -> dict:
+    """
+    Generate the corpus in `workdir` and benchmark the selected stages.
+    """
+    raw_dir = os.path.join(workdir, "raw")
+    processed_dir = os.path.join(workdir, "processed")
+    counts_dir = os.path.join(workdir, "counts")
+    store_dir = os.path.join(workdir, "trend_store")
+    cube_dir = os.path.join(workdir, "topic_cube")
+    cache_path = os.path.join(workdir, "extraction_cache.sqlite") if args.cache else None
+
+    started = time.perf_counter()
+    dates = write_corpus(raw_dir, args.reviews, args.days, duplicate_rate=args.duplicate_rate, seed=args.seed)
+    print(f"Generated {args.reviews} reviews over {args.days} days in {time.perf_counter() - started:.1f}s")
+
+    stages = {}
+    if "clean" in args.stages or not os.path.isdir(processed_dir):
+        result = measure("clean", lambda: clean_daily_reviews(raw_dir, processed_dir, workers=args.workers, force=True),
+                         args.reviews, args.trace_memory)
+        if "clean" in args.stages:
+            stages["clean"] = result
+
+    # Cleaned texts, used to size the later stages
+    texts = []
+    for path in sorted(glob.glob(os.path.join(processed_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.extend(review["text"] for review in json.load(f) if review.get("text"))
+
+    if "process_day" in args.stages or "trend_build" in args.stages:
+        topic_agent.set_client(FakeGeminiClient(latency=args.latency, error_rate=args.error_rate, seed=args.seed))
+
+        def process_all():
+            for day in dates:
+                process_day(day, processed_dir, concurrency=args.concurrency, cache_path=cache_path,
+                            counts_dir=counts_dir)
+
+        result = measure("process_day", process_all, len(texts), args.trace_memory)
+        if "process_day" in args.stages:
+            stages["process_day"] = result
+
+    phrases = [phrase for text in texts for phrase in fake_phrases(text)]
+    if "normalize_topics" in args.stages:
+        stages["normalize_topics"] = measure("normalize_topics", lambda: normalize_topics(phrases),
+                                             len(phrases), args.trace_memory)
+    if "normalize_topic" in args.stages:
+        stages["normalize_topic"] = measure("normalize_topic", lambda: [normalize_topic(p) for p in phrases],
+                                            len(phrases), args.trace_memory)
+
+    if "topic_memory" in args.stages:
+        unique_phrases = list(dict.fromkeys(phrases))
+        topics = unique_phrases[:args.topics]
+        queries = unique_phrases[:args.queries]
+        memory = TopicMemory(os.path.join(workdir, "topic_memory.json"), index=args.index,
+                             embedding_cache_path=None)
+        memory._model = HashingEncoder()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            memory.register_topics(topics)
+        stages["topic_memory"] = measure("topic_memory", lambda: memory.find_closest_topics(queries),
+                                         len(queries), args.trace_memory)
+        # flush now, not at exit, while the working directory still exists
+        memory.flush()
+
+    if "trend_build" in args.stages:
+        memory_path = os.path.join(workdir, "topic_memory.json")
+        stages["trend_build"] = measure(
+            "trend_build",
+            lambda: build_trend_table(dates, memory_path, input_dir=processed_dir, counts_dir=counts_dir,
+                                      cache_path=cache_path, store_dir=store_dir, cube_dir=cube_dir),
+            len(dates), args.trace_memory
+        )
+
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks on a synthetic corpus")
+    parser.add_argument("--reviews", type=int, default=10_000, help="Total synthetic reviews (e.g. 10000 to 1000000)")
+    parser.add_argument("--days", type=int, default=7, help="Days the reviews are spread over")
+    parser.add_argument("--duplicate-rate", type=float, default=0.25, help="Fraction of repeated review texts")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency per request in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake LLM error rate (429/5xx)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight for process_day (0 = sequential)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for clean")
+    parser.add_argument("--cache", action="store_true", help="Enable the extraction cache")
+    parser.add_argument("--topics", type=int, default=5_000, help="Topics registered before the matching benchmark")
+    parser.add_argument("--queries", type=int, default=20_000, help="Phrases matched in the topic_memory benchmark")
+    parser.add_argument("--index", type=str, default="exact", help="TopicMemory index backend")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Report each stage's peak Python allocations (tracemalloc; slows the stages)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", type=str, default=None,
+                        help="Directory for the corpus and outputs (default: a temporary directory)")
+    parser.add_argument("--output", type=str, default=str(RESULTS_PATH), help="JSONL file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="Do not append the results")
+    args = parser.parse_args()
+
+    params = {key: value for key, value in vars(args).items() if key not in ("workdir", "output", "no_save", "stages")}
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        stages = run(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="review_bench_") as workdir:
+            stages = run(args, workdir)
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": params,
+        "stages": stages,
+    }
+    output = Path(args.output)
+    compare(record, output)
+    if not args.no_save:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Results appended to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import json
+import os
+import random
+import zlib
+from datetime import date, timedelta
+from typing import Iterator
+
+import numpy as np
+
+# Issue phrases per topic, loosely following TOPIC_MAP, with the score range such reviews get
+TOPIC_PHRASES = {
+    "pricing": (["too expensive", "overpriced", "high price", "not value for money", "prices went up"], (1, 3)),
+    "delivery delay": (["delivery was late", "very slow delivery", "long wait time", "not on time", "delayed order"], (1, 3)),
+    "food cold": (["food arrived cold", "not hot at all", "cold pizza", "food was chilled"], (1, 2)),
+    "small quantity": (["small portion", "quantity is less", "not enough food", "tiny portions"], (2, 3)),
+    "missing items": (["item missing", "order incomplete", "forgot my drink", "item not delivered"], (1, 2)),
+    "no coupons": (["no coupon", "no discount anymore", "no offer for old users", "no promo codes"], (2, 4)),
+    "good quality": (["good food", "excellent taste", "nice packaging", "tasty and fresh", "quality maintained"], (4, 5)),
+    "bad quality": (["bad food", "poor quality", "stale bread", "burnt rice", "not good"], (1, 2)),
+}
+
+# Words that carry no topic, used to pad longer reviews
+FILLER = (
+    "the app order restaurant today again i we my was is it this very really so and but also "
+    "after before ordered from delivery guy support customer service time experience last week "
+    "please fix worst best ever always never every some ok okay"
+).split()
+
+# Short reviews that recur verbatim across users
+COMMON_SHORT = ["good", "nice app", "super", "very bad", "expensive", "ok", "worst app", "excellent", "late delivery", "good service"]
+
+EMOJIS = ["😀", "😡", "👍", "👎", "🔥", "😢"]
+
+
+def review_text(rng: random.Random) -> tuple[str, int]:
+    """
+    Build one synthetic review and its score.
+
+    Lengths follow a log-normal distribution (most reviews are a few words,
+    with a long tail), and each review mentions zero to three issues.
+    """
+    n_words = max(1, min(200, int(rng.lognormvariate(2.0, 1.0))))
+    if n_words <= 2:
+        text = rng.choice(COMMON_SHORT)
+        return text, 4 if "good" in text or "nice" in text or "super" in text or "excellent" in text else 2
+
+    topics = rng.sample(list(TOPIC_PHRASES), k=min(len(TOPIC_PHRASES), rng.choice([0, 1, 1, 1, 2, 3])))
+    parts = []
+    scores = []
+    for topic in topics:
+        phrases, (low, high) = TOPIC_PHRASES[topic]
+        parts.append(rng.choice(phrases))
+        scores.append(rng.randint(low, high))
+    words_so_far = sum(len(p.split()) for p in parts)
+    while words_so_far < n_words:
+        chunk = rng.sample(FILLER, k=min(len(FILLER), rng.randint(2, 6)))
+        parts.insert(rng.randrange(len(parts) + 1), " ".join(chunk))
+        words_so_far += len(chunk)
+
+    text = ", ".join(parts)
+    if rng.random() < 0.2:
+        text = text.capitalize()
+    if rng.random() < 0.1:
+        text += " " + rng.choice(EMOJIS)
+    if rng.random() < 0.05:
+        text = text.replace(", ", "\n\n", 1)
+    score = round(sum(scores) / len(scores)) if scores else rng.randint(1, 5)
+    return text, score
+
+
+def generate_reviews(n: int, day: str, duplicate_rate: float = 0.25, seed: int = 0) -> Iterator[dict]:
+    """
+    Yield raw reviews (scraper format) for one day.
+
+    Args:
+        n: Number of reviews
+        day: Date string in format YYYY-MM-DD
+        duplicate_rate: Fraction of reviews whose text repeats an earlier review of the day
+        seed: Random seed
+
+    Yields:
+        Dictionaries with 'reviewId', 'content', 'score' and 'at'
+    """
+    rng = random.Random(f"{seed}-{day}")
+    seen: list[tuple[str, int]] = []
+    for i in range(n):
+        if seen and rng.random() < duplicate_rate:
+            # Repeats favour early (popular) texts
+            text, score = seen[min(len(seen) - 1, int(rng.paretovariate(1.2)) - 1)]
+        else:
+            text, score = review_text(rng)
+            seen.append((text, score))
+        yield {"reviewId": f"{day}-{i}", "content": text, "score": score, "at": day}
+
+
+def write_corpus(raw_dir: str, n_reviews: int, days: int, start: str = "2024-06-01",
+                 duplicate_rate: float = 0.25, seed: int = 0) -> list[str]:
+    """
+    Write a synthetic corpus as one raw JSON file per day.
+
+    Args:
+        raw_dir: Directory for the raw day files
+        n_reviews: Total number of reviews, spread evenly over the days
+        days: Number of days
+        start: First date (default: "2024-06-01")
+        duplicate_rate: Fraction of repeated review texts (default: 0.25)
+        seed: Random seed (default: 0)
+
+    Returns:
+        List of dates written
+    """
+    os.makedirs(raw_dir, exist_ok=True)
+    first = date.fromisoformat(start)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(days)]
+    per_day = [n_reviews // days + (1 if i < n_reviews % days else 0) for i in range(days)]
+    for day, count in zip(dates, per_day):
+        with open(os.path.join(raw_dir, f"{day}.json"), "w", encoding="utf-8") as f:
+            json.dump(list(generate_reviews(count, day, duplicate_rate, seed)), f, ensure_ascii=False)
+    return dates
+
+
+class HashingEncoder:
+    """
+    Deterministic offline stand-in for the SentenceTransformer model.
+
+    Texts are embedded as hashed bag-of-words vectors, so similar phrases
+    get similar vectors and the benchmark needs no model download.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: list[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        return vectors
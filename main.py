@@ -1,33 +1,226 @@
 import argparse
+import cProfile
+import io
 import os
 import glob
-from src.utils.preprocess import clean_daily_reviews
-from src.agents.daily_topic_processor import process_day
-from src.agents.trend_builder import build_trend_table, save_trend_table
+import pstats
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="AI Trend Agent Runner")
-    parser.add_argument("--mode", type=str, required=True,
-                        choices=["clean", "day", "trend"],
-                        help="clean = preprocess raw reviews, day = extract topics for a single day, trend = build trend across all days")
+from src.utils.metrics import metrics
 
-    parser.add_argument("--date", type=str, help="Date format YYYY-MM-DD for mode=day")
+# Pipeline modules are imported inside each mode, so a mode only loads what it uses
+# (e.g. clean never imports pandas, the Gemini SDK or torch)
 
-    args = parser.parse_args()
+# Functions listed in the --cprofile section of the report
+CPROFILE_TOP = 30
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Run the selected mode.
+    """
+    from src.utils.app_layout import app_paths
+    paths = app_paths(args.app)
+    # Topic cube partition of the selected app (the cube is shared by all apps)
+    cube_app = args.app or "default"
 
     if args.mode == "clean":
-        clean_daily_reviews("data/raw", "data/processed")
+        from src.utils.preprocess import clean_daily_reviews
+        clean_daily_reviews(paths["raw"], paths["processed"], workers=args.workers, force=args.force)
         print("Cleaning complete.")
 
     elif args.mode == "day":
         if not args.date:
             raise ValueError("Please provide --date for day mode")
-        result = process_day(args.date, "data/processed")
+        from src.agents.daily_topic_processor import process_day
+        cache_path = None if args.no_cache else "cache/extraction_cache.sqlite"
+        result = process_day(args.date, paths["processed"], concurrency=args.concurrency, cache_path=cache_path,
+                             counts_dir=paths["counts"], cascade_threshold=args.cascade_threshold, dedup_threshold=args.dedup_threshold)
         print(result)
 
     elif args.mode == "trend":
-        dates = [os.path.basename(f).replace(".json", "") for f in glob.glob("data/processed/*.json")]
-        df = build_trend_table(dates)
-        save_trend_table(df)
-        print("Trend table saved to output/reports/trend.csv")
+        from src.agents.trend_builder import build_trend_table, save_trend_table
+        dates = [os.path.basename(f).replace(".json", "") for f in glob.glob(os.path.join(paths["processed"], "*.json"))]
+        cache_path = None if args.no_cache else "cache/extraction_cache.sqlite"
+        df = build_trend_table(dates, memory_path=paths["topic_memory"], input_dir=paths["processed"],
+                               counts_dir=paths["counts"],
+                               concurrency=args.concurrency, cache_path=cache_path, store_dir=paths["trend_store"],
+                               cascade_threshold=args.cascade_threshold, dedup_threshold=args.dedup_threshold,
+                               app=cube_app)
+        print(f"Trend store updated in {paths['trend_store']}")
+        if args.export_csv:
+            os.makedirs(paths["reports"], exist_ok=True)
+            save_trend_table(df, paths["trend_csv"])
+            print(f"Trend table saved to {paths['trend_csv']}")
+
+        # Rolling stats and spike detection, appending only days not analyzed yet
+        from src.agents.day_counts import load_review_totals
+        from src.agents.trend_analytics import update_analytics, spike_alerts
+        analytics = update_analytics(df, paths["analytics_state"],
+                                     totals=load_review_totals(list(df.columns), paths["counts"]))
+        alerts = spike_alerts(analytics)
+        os.makedirs(paths["reports"], exist_ok=True)
+        alerts.to_csv(paths["alerts_csv"], index=False)
+        print(f"{len(alerts)} spikes saved to {paths['alerts_csv']}")
+        latest = max(df.columns, default=None)
+        for row in alerts[alerts["date"] == latest].itertuples():
+            print(f"Spike {row.date}: {row.topic} ({row.count}, z={row.zscore:.1f}, baseline {row.ewma:.1f})")
+
+    elif args.mode == "stream":
+        if not args.date:
+            raise ValueError("Please provide --date for stream mode")
+        from src.agents.stream_pipeline import process_file_streaming
+        from src.agents.trend_store import upsert_day
+        raw_path = os.path.join(paths["raw"], f"{args.date}.jsonl")
+        if not os.path.exists(raw_path):
+            raw_path = os.path.join(paths["raw"], f"{args.date}.json")
+        cache_path = None if args.no_cache else "cache/extraction_cache.sqlite"
+        result = process_file_streaming(raw_path, concurrency=args.concurrency, cache_path=cache_path)
+        upsert_day(args.date, result, paths["trend_store"])
+        print(result)
+
+    elif args.mode == "backfill":
+        if not args.dates and not (args.date_from and args.date_to):
+            raise ValueError("Please provide --from and --to, or --dates, for backfill mode")
+        from src.agents.backfill import backfill, date_range, DEFAULT_WORKERS, DEFAULT_CONCURRENCY
+        if args.dates:
+            dates = [d.strip() for d in args.dates.split(",") if d.strip()]
+        else:
+            dates = date_range(args.date_from, args.date_to)
+        cache_path = None if args.no_cache else "cache/extraction_cache.sqlite"
+        backfill(dates, paths["processed"], paths["counts"], workers=args.workers or DEFAULT_WORKERS,
+                 concurrency=args.concurrency or DEFAULT_CONCURRENCY, cache_path=cache_path,
+                 store_dir=paths["trend_store"], force=args.force, cascade_threshold=args.cascade_threshold,
+                 dedup_threshold=args.dedup_threshold, app=cube_app)
+
+    elif args.mode == "discover":
+        from src.agents.topic_discovery import collect_unmatched, discover_topics, save_proposals
+        from src.agents.topic_memory import TopicMemory
+        if args.dates:
+            dates = [d.strip() for d in args.dates.split(",") if d.strip()]
+        elif args.date_from and args.date_to:
+            from src.agents.backfill import date_range
+            dates = date_range(args.date_from, args.date_to)
+        else:
+            dates = sorted(os.path.basename(f)[:-len(".unmatched.json")]
+                           for f in glob.glob(os.path.join(paths["counts"], "*.unmatched.json")))
+        phrases = collect_unmatched(dates, paths["counts"])
+        print(f"{len(phrases)} distinct unmatched phrases over {len(dates)} days")
+        memory = TopicMemory(paths["topic_memory"])
+        proposals = discover_topics(phrases, memory, method=args.cluster_method, register=args.register)
+        memory.close()
+        save_proposals(proposals, paths["proposals"])
+        for proposal in proposals[:20]:
+            print(f"{proposal['topic']}: {proposal['mentions']} mentions, e.g. {', '.join(proposal['examples'][:3])}")
+        print(f"Proposed topics saved to {paths['proposals']}")
+
+    elif args.mode == "apps":
+        from src.agents.app_scheduler import run_apps, combine_app_trends, save_app_alerts, DEFAULT_APP_WORKERS
+        from src.agents.backfill import DEFAULT_CONCURRENCY
+        from src.utils.app_layout import list_apps, APP_TRENDS_PATH, APP_ALERTS_PATH
+        apps = [a.strip() for a in args.apps.split(",") if a.strip()] if args.apps else list_apps()
+        if not apps:
+            raise ValueError("No apps found; pass --apps or add apps under data/apps/<package_id>/raw")
+        cache_path = None if args.no_cache else "cache/extraction_cache.sqlite"
+        results = run_apps(apps, workers=args.workers or DEFAULT_APP_WORKERS,
+                           concurrency=args.concurrency or DEFAULT_CONCURRENCY, cache_path=cache_path,
+                           cascade_threshold=args.cascade_threshold, dedup_threshold=args.dedup_threshold)
+        for result in results:
+            if "error" in result:
+                print(f"{result['app']}: failed ({result['error']})")
+            else:
+                print(f"{result['app']}: {result['days']} days, {len(result['failed_days'])} failed, "
+                      f"{len(result['alerts'])} spikes in {result['seconds']:.1f}s")
+        combined = combine_app_trends([result["app"] for result in results])
+        print(f"{len(combined)} app x date x topic rows saved to {APP_TRENDS_PATH}")
+        alerts = save_app_alerts(results)
+        print(f"{len(alerts)} spikes saved to {APP_ALERTS_PATH}")
+
+
+def profile_summary(profiler: cProfile.Profile, limit: int = CPROFILE_TOP) -> list[dict]:
+    """
+    Return the functions with the highest cumulative time from a cProfile run.
+    """
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_s": round(own, 6),
+            "cumulative_s": round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+    return rows[:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Trend Agent Runner")
+    parser.add_argument("--mode", type=str, required=True,
+                        choices=["clean", "day", "trend", "stream", "backfill", "discover", "apps"],
+                        help="clean = preprocess raw reviews, day = extract topics for a single day, trend = build trend across all days, "
+                             "stream = count topics for a single day straight from its raw file with bounded memory, "
+                             "backfill = extract topics for a range of days in one run, "
+                             "discover = cluster phrases that matched no topic into proposed new topics, "
+                             "apps = run clean, backfill and trend for many apps sharded across worker processes")
+
+    parser.add_argument("--app", type=str, default=None,
+                        help="Package ID whose per-app layout (data/apps/<id>, output/apps/<id>) the other modes use "
+                             "(default: the single-app layout under data/ and output/)")
+    parser.add_argument("--apps", type=str, default=None,
+                        help="Comma-separated package IDs for mode=apps (default: every app under data/apps)")
+
+    parser.add_argument("--date", type=str, help="Date format YYYY-MM-DD for mode=day/stream")
+    parser.add_argument("--from", dest="date_from", type=str, help="First date (YYYY-MM-DD) for mode=backfill/discover")
+    parser.add_argument("--to", dest="date_to", type=str, help="Last date (YYYY-MM-DD) for mode=backfill/discover")
+    parser.add_argument("--dates", type=str, help="Comma-separated dates for mode=backfill/discover")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="Number of extraction requests in flight for mode=day/trend/stream (0 = sequential) "
+                             "and mode=backfill/apps (default: 8; per worker process for mode=apps)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes for mode=clean (default: CPU count) and mode=apps (default: 4), "
+                             "or days processed at once for mode=backfill (default: 4)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-clean raw files even if they are unchanged for mode=clean, "
+                             "or reprocess already completed days for mode=backfill")
+    parser.add_argument("--export-csv", action=argparse.BooleanOptionalAction, default=True,
+                        help="Export the wide trend table to output/reports/trend.csv (or the app's reports) for mode=trend "
+                             "(default: on; --no-export-csv keeps only the Parquet trend store)")
+    parser.add_argument("--cascade-threshold", type=float, default=None,
+                        help="Classify short reviews locally with MiniLM when their topic similarity reaches this "
+                             "threshold and send only the rest to Gemini, for mode=day/trend/backfill/apps (e.g. 0.6)")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="Extract each group of near-duplicate reviews once when their estimated similarity "
+                             "reaches this threshold, for mode=day/trend/backfill/apps (e.g. 0.8)")
+    parser.add_argument("--cluster-method", type=str, default="kmeans", choices=["kmeans", "threshold"],
+                        help="Clustering for mode=discover: mini-batch k-means or threshold-based leader clustering")
+    parser.add_argument("--register", action="store_true",
+                        help="Register the proposed topics in topic memory for mode=discover")
+    parser.add_argument("--profile", nargs="?", const="output/reports/profile.json", default=None, metavar="PATH",
+                        help="Write per-stage timings, LLM latency/token/retry stats and cache hit rates as JSON "
+                             "(default path: output/reports/profile.json)")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="With --profile, also run under cProfile and include the hottest functions in the report")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the on-disk extraction cache for mode=day/trend/backfill/apps")
+
+    args = parser.parse_args()
 
+    if args.profile is None:
+        run(args)
+    else:
+        profiler = cProfile.Profile() if args.cprofile else None
+        try:
+            with metrics.timer(f"mode.{args.mode}"):
+                if profiler is not None:
+                    profiler.runcall(run, args)
+                else:
+                    run(args)
+        finally:
+            extra = {"mode": args.mode}
+            if profiler is not None:
+                profile_path = os.path.splitext(args.profile)[0] + ".prof"
+                os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+                profiler.dump_stats(profile_path)
+                extra["cprofile"] = {"stats_file": profile_path, "top": profile_summary(profiler)}
+            metrics.write_report(args.profile, extra)
+            print(f"Profile report saved to {args.profile}")
@@ -0,0 +1,237 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+from src.agents.async_extractor import set_shared_limiter
+from src.agents.backfill import backfill, DEFAULT_WORKERS, DEFAULT_CONCURRENCY
+from src.agents.day_counts import load_review_totals
+from src.agents.trend_analytics import update_analytics, spike_alerts
+from src.agents.trend_builder import build_trend_table, save_trend_table
+from src.agents.trend_store import read_trend
+from src.utils.app_layout import (
+    app_paths,
+    validate_package_id,
+    EXTRACTION_CACHE_PATH,
+    RATE_LIMIT_PATH,
+    CUBE_DIR,
+    APP_TRENDS_PATH,
+    APP_ALERTS_PATH,
+)
+from src.utils.metrics import metrics
+from src.utils.preprocess import clean_daily_reviews
+
+# Worker processes, each handling one shard of the apps
+DEFAULT_APP_WORKERS = 4
+
+TREND_COLUMNS = ["app", "date", "topic", "count", "reviews", "share"]
+
+
+def app_weight(package_id: str) -> int:
+    """
+    Estimate the work for one app as the size of its review files in bytes.
+    """
+    paths = app_paths(package_id)
+    files = glob.glob(os.path.join(paths["raw"], "*.json*")) or glob.glob(os.path.join(paths["processed"], "*.json"))
+    return sum(os.path.getsize(f) for f in files)
+
+
+def shard_apps(apps: list[str], shards: int, weights: dict[str, int] | None = None) -> list[list[str]]:
+    """
+    Split apps into shards of similar total work.
+
+    Apps are assigned largest first, each to the currently lightest shard,
+    so one big app does not end up sharing a worker with other big ones.
+
+    Args:
+        apps: Package IDs to schedule
+        shards: Number of shards (worker processes)
+        weights: Work estimate per app (default: size of its review files)
+
+    Returns:
+        Non-empty lists of package IDs, at most `shards` of them
+    """
+    if weights is None:
+        weights = {app: app_weight(app) for app in apps}
+    loads = [0] * max(1, min(shards, len(apps)))
+    assigned: list[list[str]] = [[] for _ in loads]
+    for app in sorted(apps, key=lambda a: (-weights.get(a, 0), a)):
+        lightest = loads.index(min(loads))
+        assigned[lightest].append(app)
+        loads[lightest] += weights.get(app, 0)
+    return [shard for shard in assigned if shard]
+
+
+def process_app(package_id: str, options: dict) -> dict:
+    """
+    Run the pipeline for one app in its own data layout: clean, extract, trend and analytics.
+
+    Args:
+        package_id: Package ID of the app
+        options: Settings shared by all apps (see `run_apps`)
+
+    Returns:
+        Summary with the app, days processed, failed days, spike alerts and elapsed seconds
+    """
+    started = time.perf_counter()
+    paths = app_paths(package_id)
+
+    if os.path.isdir(paths["raw"]):
+        clean_daily_reviews(paths["raw"], paths["processed"], workers=1)
+    dates = sorted(os.path.basename(f)[:-len(".json")] for f in glob.glob(os.path.join(paths["processed"], "*.json")))
+
+    # Extract every pending day, then build the trend table from the stored counts
+    completed = backfill(dates, paths["processed"], paths["counts"], workers=options["days_in_flight"],
+                         concurrency=options["concurrency"], cache_path=options["cache_path"],
+                         store_dir=paths["trend_store"], cascade_threshold=options["cascade_threshold"],
+                         cube_dir=options["cube_dir"], dedup_threshold=options["dedup_threshold"], app=package_id)
+    df = build_trend_table(list(completed), memory_path=paths["topic_memory"], input_dir=paths["processed"],
+                           counts_dir=paths["counts"],
+                           concurrency=options["concurrency"], cache_path=options["cache_path"],
+                           store_dir=paths["trend_store"], cascade_threshold=options["cascade_threshold"],
+                           cube_dir=options["cube_dir"], dedup_threshold=options["dedup_threshold"], app=package_id)
+
+    os.makedirs(paths["reports"], exist_ok=True)
+    save_trend_table(df, paths["trend_csv"])
+    alerts = pd.DataFrame()
+    if len(df.columns):
+        analytics = update_analytics(df, paths["analytics_state"],
+                                     totals=load_review_totals(list(df.columns), paths["counts"]))
+        alerts = spike_alerts(analytics)
+        alerts.to_csv(paths["alerts_csv"], index=False)
+        alerts.insert(0, "app", package_id)
+
+    return {
+        "app": package_id,
+        "days": len(completed),
+        "failed_days": sorted(set(dates) - set(completed)),
+        "alerts": alerts,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def run_shard(apps: list[str], options: dict) -> list[dict]:
+    """
+    Process a shard of apps one after another; the entry point of each worker process.
+
+    The extractor of every app draws from the rate limiter shared through
+    `options['rate_limit_path']`, and all apps read and fill the same
+    extraction cache. An app that fails is reported and skipped.
+    """
+    set_shared_limiter(options["rate_limit_path"])
+    results = []
+    for package_id in apps:
+        print(f"[{package_id}] processing")
+        try:
+            results.append(process_app(package_id, options))
+        except Exception as e:
+            print(f"[{package_id}] Error processing app: {e}")
+            results.append({"app": package_id, "error": str(e)})
+    return results
+
+
+def run_apps(apps: list[str], workers: int = DEFAULT_APP_WORKERS, concurrency: int = DEFAULT_CONCURRENCY,
+             days_in_flight: int = DEFAULT_WORKERS, cache_path: str | None = EXTRACTION_CACHE_PATH,
+             rate_limit_path: str = RATE_LIMIT_PATH, cube_dir: str | None = CUBE_DIR,
+             cascade_threshold: float | None = None, dedup_threshold: float | None = None) -> list[dict]:
+    """
+    Process many apps, sharded across worker processes.
+
+    Apps are balanced over `workers` processes by the size of their review
+    files. Each app keeps its own data, counts, trend store and analytics
+    (see app_layout.app_paths), while all processes share one extraction
+    cache, one global API quota and the topic cube, whose app dimension
+    holds every app side by side.
+
+    Args:
+        apps: Package IDs to process
+        workers: Number of worker processes (default: 4; 1 = run in this process)
+        concurrency: Extraction requests in flight per worker process (default: 8)
+        days_in_flight: Days of one app extracted at the same time (default: 4)
+        cache_path: Path to the shared extraction cache, or None to disable caching
+        rate_limit_path: Path to the database of the cross-process rate limiter
+            (default: 'cache/rate_limit.sqlite')
+        cube_dir: Root directory of the shared topic cube, or None to skip it (default: 'output/topic_cube')
+        cascade_threshold: Confidence threshold of the local classifier stage, or None to send
+            every review to the LLM (default: None)
+        dedup_threshold: Minimum estimated Jaccard similarity for reviews to share one extraction,
+            or None to extract every review (default: None)
+
+    Returns:
+        One summary per app (see `process_app`); failed apps carry an 'error' entry instead
+    """
+    apps = [validate_package_id(app) for app in dict.fromkeys(apps)]
+    options = {
+        "concurrency": max(1, concurrency),
+        "days_in_flight": max(1, days_in_flight),
+        "cache_path": cache_path,
+        "rate_limit_path": rate_limit_path,
+        "cube_dir": cube_dir,
+        "cascade_threshold": cascade_threshold,
+        "dedup_threshold": dedup_threshold,
+    }
+    shards = shard_apps(apps, max(1, workers))
+    print(f"Scheduling {len(apps)} apps over {len(shards)} worker processes")
+
+    with metrics.timer("apps.run"):
+        if len(shards) <= 1:
+            results = [result for shard in shards for result in run_shard(shard, options)]
+        else:
+            with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+                results = [result for shard_results in executor.map(run_shard, shards, [options] * len(shards))
+                           for result in shard_results]
+    metrics.incr("apps.run.items", len(apps))
+    for result in results:
+        if "seconds" in result:
+            metrics.add_time("apps.app", result["seconds"])
+
+    return sorted(results, key=lambda result: result["app"])
+
+
+def combine_app_trends(apps: list[str], output_path: str | None = APP_TRENDS_PATH) -> pd.DataFrame:
+    """
+    Combine the trend stores of several apps into one long table comparable across apps.
+
+    Raw counts grow with an app's review volume, so each row also carries
+    the app's number of reviews that day and the topic's share of them.
+    All apps are normalized with the same TOPIC_MAP, so topic names match.
+
+    Args:
+        apps: Package IDs to combine
+        output_path: CSV file to write, or None to skip writing (default: 'output/reports/app_trends.csv')
+
+    Returns:
+        DataFrame with the columns app, date, topic, count, reviews and share
+    """
+    frames = []
+    for package_id in apps:
+        paths = app_paths(package_id)
+        long_df = read_trend(paths["trend_store"])
+        if long_df.empty:
+            continue
+        totals = load_review_totals(sorted(long_df["date"].unique()), paths["counts"])
+        # Days without a recorded review count fall back to their total mentions
+        mentions = long_df.groupby("date")["count"].transform("sum")
+        long_df["reviews"] = long_df["date"].map(totals).fillna(mentions).astype(int)
+        long_df["share"] = (long_df["count"] / long_df["reviews"].where(long_df["reviews"] > 0)).fillna(0.0)
+        long_df.insert(0, "app", package_id)
+        frames.append(long_df)
+
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TREND_COLUMNS)
+    combined = combined.reindex(columns=TREND_COLUMNS)
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        combined.to_csv(output_path, index=False)
+    return combined
+
+
+def save_app_alerts(results: list[dict], output_path: str = APP_ALERTS_PATH) -> pd.DataFrame:
+    """
+    Write the spike alerts of all apps from a `run_apps` call to one CSV with an app column.
+    """
+    frames = [result["alerts"] for result in results if result.get("alerts") is not None and len(result["alerts"])]
+    alerts = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["app", "date", "topic"])
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    alerts.to_csv(output_path, index=False)
+    return alerts
@@ -0,0 +1,452 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+from src.agents.topic_agent import (
+    MODEL_NAME,
+    PROMPT_VERSION,
+    MAX_BATCH_TOKENS,
+    MAX_BATCH_SIZE,
+    get_client,
+    record_llm_call,
+    estimate_tokens,
+    build_prompt,
+    build_batch_prompt,
+    parse_phrases,
+    parse_batch_response,
+    split_batches,
+)
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.metrics import metrics
+
+# Default quota for the Gemini API (requests / tokens per minute)
+RPM_LIMIT = 60
+TPM_LIMIT = 1_000_000
+
+MAX_RETRIES = 5
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+# Database of the rate limiter shared by worker processes, or None for a per-process limiter
+_shared_limiter_path: str | None = None
+
+
+class TokenBucket:
+    """
+    Async token bucket that refills continuously at a fixed per-minute rate.
+
+    The level lives on the instance behind a thread lock and is refilled
+    from monotonic timestamps, so one bucket can be awaited from successive
+    event loops (e.g. repeated `extract()` calls) without granting a fresh
+    burst each time.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        """
+        Initialize TokenBucket.
+
+        Args:
+            per_minute: Tokens added per minute
+            capacity: Maximum burst size (default: one minute worth of tokens)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self, amount: float) -> float:
+        """
+        Take `amount` tokens if available.
+
+        Returns:
+            0 if the tokens were taken, else the seconds until they should be available
+        """
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Wait until `amount` tokens are available and take them.
+        """
+        # a request larger than the bucket can never fit; let it through at full capacity
+        amount = min(amount, self.capacity)
+        while True:
+            wait = self._take(amount)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Combined requests-per-minute and tokens-per-minute limiter.
+    """
+
+    def __init__(self, rpm: float = RPM_LIMIT, tpm: float = TPM_LIMIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait for one request slot and `tokens` tokens of budget.
+        """
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+
+class SharedRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by several processes.
+
+    Both token buckets live in one SQLite row per bucket. Each acquire
+    refills and debits them inside an IMMEDIATE transaction, so worker
+    processes pointing at the same file draw from one quota. A caller that
+    has to wait sleeps for the estimated refill time and tries again.
+    """
+
+    def __init__(self, path: str, rpm: float = RPM_LIMIT, tpm: float = TPM_LIMIT):
+        """
+        Initialize SharedRateLimiter.
+
+        Args:
+            path: Path to the SQLite database holding the buckets
+            rpm: Requests per minute quota
+            tpm: Tokens per minute quota
+        """
+        self.path = path
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+
+    def _take(self, amounts: dict[str, float]) -> float:
+        """
+        Take `amounts` from the buckets if they all have enough.
+
+        Returns:
+            0 if the amounts were taken, else the seconds until they should be available
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = {}
+                wait = 0.0
+                for name, amount in amounts.items():
+                    capacity = self.limits[name]
+                    row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                    tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * capacity / 60.0)
+                    levels[name] = tokens
+                    if tokens < amount:
+                        wait = max(wait, (amount - tokens) * 60.0 / capacity)
+                if wait == 0:
+                    levels = {name: tokens - amounts[name] for name, tokens in levels.items()}
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    [(name, tokens, now) for name, tokens in levels.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait for one request slot and `tokens` tokens of budget.
+        """
+        # a request larger than the bucket can never fit; let it through at full capacity
+        amounts = {"requests": 1, "tokens": min(tokens, self.limits["tokens"])}
+        while True:
+            wait = await asyncio.to_thread(self._take, amounts)
+            if wait == 0:
+                return
+            metrics.add_time("rate_limit.wait", wait)
+            await asyncio.sleep(wait)
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+
+def set_shared_limiter(path: str | None) -> None:
+    """
+    Make extractors created afterwards share the quota stored at `path`
+    with every other process using it (None restores per-process limiting).
+    """
+    global _shared_limiter_path
+    _shared_limiter_path = path
+
+
+class AdaptiveConcurrency:
+    """
+    Limits requests in flight and adapts the limit to quota errors (AIMD).
+
+    The limit is halved on every quota error and grows by one after
+    `increase_after` consecutive successes, up to `max_limit`. With the
+    default `max_limit` (the starting limit) it only backs off and
+    recovers; a higher ceiling lets it probe for more. The limit carries
+    over between event loops; only the condition used to wait is
+    recreated for each loop.
+    """
+
+    def __init__(self, limit: int, min_limit: int = 1, max_limit: int | None = None,
+                 increase_after: int = 20):
+        self.limit = max(min_limit, limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit if max_limit is not None else limit
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = None
+        self._loop = None
+
+    def bind(self) -> None:
+        """
+        Create the wait condition for the running event loop, if not done yet.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+            # requests of a finished loop can no longer be in flight
+            self.in_flight = 0
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, quota_error: bool = False) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if quota_error:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def error_code(exc: Exception) -> int | None:
+    """
+    Return the HTTP status code of an API error, if it carries one.
+    """
+    code = getattr(exc, "code", None)
+    if code is None:
+        code = getattr(exc, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Check whether an API error is worth retrying (429 or 5xx).
+    """
+    code = error_code(exc)
+    return code is not None and (code == 429 or code >= 500)
+
+
+class AsyncExtractor:
+    """
+    Runs batched topic extraction with many requests in flight.
+    """
+
+    def __init__(self, client=None, concurrency: int = 8, rpm: float = RPM_LIMIT,
+                 tpm: float = TPM_LIMIT, max_retries: int = MAX_RETRIES,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS, max_batch_size: int = MAX_BATCH_SIZE,
+                 cache: ExtractionCache | None = None, max_concurrency: int | None = None):
+        """
+        Initialize AsyncExtractor.
+
+        Args:
+            client: Client exposing `aio.models.generate_content` (default: shared Gemini client)
+            concurrency: Number of requests in flight to start with
+            rpm: Requests per minute quota
+            tpm: Tokens per minute quota
+            max_retries: Retries per request on 429/5xx errors
+            max_batch_tokens: Estimated token budget per batched request
+            max_batch_size: Maximum number of reviews per batched request
+            cache: Optional extraction cache consulted before and filled after requests
+            max_concurrency: Ceiling the adaptive limit may grow to after quota errors stop
+                (default: `concurrency`, so the limit only backs off and recovers)
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+
+        self.requests = 0
+        self.retries = 0
+        self.quota_errors = 0
+
+        # Quota and AIMD state persist across calls, even when each call runs its own event loop
+        self._limiter = None
+        self._slots = AdaptiveConcurrency(concurrency, max_limit=max(concurrency, max_concurrency or concurrency))
+
+    async def _generate(self, prompt: str) -> str | None:
+        """
+        Send one request, respecting the rate limiter and retrying with jittered backoff.
+
+        Returns:
+            Response text, or None if the request failed permanently
+        """
+        tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire(tokens)
+            await self._slots.acquire()
+            quota_error = False
+            try:
+                self.requests += 1
+                started = time.perf_counter()
+                response = await self.client.aio.models.generate_content(
+                    model=MODEL_NAME,
+                    contents=prompt
+                )
+                record_llm_call(prompt, response, time.perf_counter() - started)
+                return response.text
+            except Exception as e:
+                metrics.incr("llm.errors")
+                quota_error = error_code(e) == 429
+                if quota_error:
+                    self.quota_errors += 1
+                    metrics.incr("llm.quota_errors")
+                if not is_retryable(e) or attempt == self.max_retries:
+                    print(f"Error extracting topics: {e}")
+                    return None
+            finally:
+                await self._slots.release(quota_error)
+
+            # full jitter exponential backoff
+            self.retries += 1
+            metrics.incr("llm.retries")
+            delay = min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * 2 ** attempt)
+            await asyncio.sleep(random.uniform(0, delay))
+
+        return None
+
+    async def _extract_single(self, review_text: str) -> list[str] | None:
+        text = await self._generate(build_prompt(review_text))
+        return parse_phrases(text) if text is not None else None
+
+    async def _extract_batch(self, texts: list[str]) -> list[list[str] | None]:
+        if len(texts) == 1:
+            return [await self._extract_single(texts[0])]
+
+        text = await self._generate(build_batch_prompt(texts))
+        parsed = parse_batch_response(text, len(texts)) if text is not None else [None] * len(texts)
+
+        # fallback: per-item calls when the batched result is unusable
+        missing = [i for i, phrases in enumerate(parsed) if phrases is None]
+        retried = await asyncio.gather(*(self._extract_single(texts[i]) for i in missing))
+        for i, phrases in zip(missing, retried):
+            parsed[i] = phrases
+        return parsed
+
+    async def extract_async(self, review_texts: list[str],
+                            on_batch_done: Callable[[int], None] | None = None,
+                            failed: list[str] | None = None) -> list[list[str]]:
+        """
+        Extract topic phrases for all reviews concurrently.
+
+        Duplicate texts are sent once and cached texts are not sent at all.
+
+        Args:
+            review_texts: Review texts to process
+            on_batch_done: Optional callback receiving the number of input reviews each finished batch covers
+            failed: Optional list that receives texts whose extraction failed
+
+        Returns:
+            List of phrase lists, in the same order as `review_texts`; failed
+            texts get an empty list
+        """
+        if not review_texts:
+            return []
+
+        # Deduplicate texts, keeping first-seen order, and count how many inputs each covers
+        multiplicity: dict[str, int] = {}
+        for text in review_texts:
+            multiplicity[text] = multiplicity.get(text, 0) + 1
+        unique_texts = list(multiplicity)
+        found: dict[str, list[str]] = {}
+
+        if self.cache is not None:
+            for text, phrases in zip(unique_texts, self.cache.get_many(unique_texts, MODEL_NAME, PROMPT_VERSION)):
+                if phrases is not None:
+                    found[text] = phrases
+            if on_batch_done and found:
+                on_batch_done(sum(multiplicity[text] for text in found))
+
+        pending = [text for text in unique_texts if text not in found]
+        if pending and self.client is None:
+            self.client = get_client()
+
+        if pending and self.client is not None:
+            # One limiter for the extractor's lifetime, so successive calls share one quota;
+            # only the slots' wait condition is bound to the running loop
+            if self._limiter is None:
+                if _shared_limiter_path is not None:
+                    self._limiter = SharedRateLimiter(_shared_limiter_path, self.rpm, self.tpm)
+                else:
+                    self._limiter = RateLimiter(self.rpm, self.tpm)
+            self._slots.bind()
+
+            async def run(batch: list[int]) -> None:
+                texts = [pending[i] for i in batch]
+                phrases = await self._extract_batch(texts)
+                extracted = {text: item for text, item in zip(texts, phrases) if item is not None}
+                found.update(extracted)
+                if self.cache is not None:
+                    self.cache.put_many(extracted, MODEL_NAME, PROMPT_VERSION)
+                if on_batch_done:
+                    on_batch_done(sum(multiplicity[text] for text in texts))
+
+            batches = split_batches(pending, self.max_batch_tokens, self.max_batch_size)
+            await asyncio.gather(*(run(batch) for batch in batches))
+
+        if failed is not None:
+            failed.extend(text for text in pending if text not in found)
+
+        return [found.get(text, []) for text in review_texts]
+
+    def extract(self, review_texts: list[str],
+                on_batch_done: Callable[[int], None] | None = None,
+                failed: list[str] | None = None) -> list[list[str]]:
+        """
+        Synchronous wrapper around `extract_async`.
+        """
+        return asyncio.run(self.extract_async(review_texts, on_batch_done, failed))
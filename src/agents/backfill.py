@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+
+from src.agents.async_extractor import AsyncExtractor
+from src.agents.daily_topic_processor import load_day_reviews, pipeline_config, run_day_pipeline
+from src.agents.day_counts import load_manifest, load_fresh_day_counts, load_day_score_counts
+from src.agents.trend_store import load_index, upsert_day
+from src.agents import topic_cube
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.metrics import metrics
+
+# Days processed at the same time
+DEFAULT_WORKERS = 4
+
+# Extraction requests in flight, shared by all days
+DEFAULT_CONCURRENCY = 8
+
+
+def date_range(start: str, end: str) -> list[str]:
+    """
+    Return every date from `start` to `end` inclusive, in format YYYY-MM-DD.
+    """
+    first = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    if last < first:
+        raise ValueError(f"End date {end} is before start date {start}")
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+def backfill(dates: list[str], input_dir: str = 'data/processed', counts_dir: str = 'data/counts',
+             workers: int = DEFAULT_WORKERS, concurrency: int = DEFAULT_CONCURRENCY,
+             cache_path: str | None = 'cache/extraction_cache.sqlite',
+             store_dir: str | None = 'output/trend_store', force: bool = False,
+             cascade_threshold: float | None = None,
+             cube_dir: str | None = 'output/topic_cube',
+             dedup_threshold: float | None = None,
+             app: str = topic_cube.DEFAULT_APP) -> dict[str, dict[str, int]]:
+    """
+    Process many days in one process, sharing the client, rate limiter and extraction cache.
+
+    Up to `workers` days are loaded and extracted at once on a single event
+    loop, and all their requests go through one extractor, so the run is
+    bounded by API quota rather than per-day startup. A day is checkpointed
+    when its counts are saved to the counts manifest; days that already have
+    fresh counts are skipped, so rerunning the same command after a crash
+    resumes where it stopped. Dates without an input file are reported as
+    skipped. Each day runs the same pipeline as process_day (see
+    run_day_pipeline) in a worker thread, with its extraction sent to the
+    shared event loop.
+
+    Args:
+        dates: Date strings in format YYYY-MM-DD
+        input_dir: Directory containing processed review JSON files (default: 'data/processed')
+        counts_dir: Directory holding per-day count artifacts and their manifest (default: 'data/counts')
+        workers: Number of days processed at the same time (default: 4)
+        concurrency: Number of extraction requests in flight across all days (default: 8)
+        cache_path: Path to the extraction cache database, or None to disable caching
+        store_dir: Root directory of the partitioned trend store, or None to skip it
+            (default: 'output/trend_store')
+        force: Reprocess days even if they have fresh counts (default: False)
+        cascade_threshold: Confidence threshold of the local classifier stage, or None to send
+            every review to the LLM (default: None)
+        cube_dir: Root directory of the date x topic x score cube store, or None to skip it
+            (default: 'output/topic_cube')
+        dedup_threshold: Minimum estimated Jaccard similarity for reviews to share one extraction,
+            or None to extract every review (default: None)
+        app: App the days belong to, used as the app partition of the topic cube (default: 'default')
+
+    Returns:
+        Dictionary mapping each completed date to its topic counts
+    """
+    sorted_dates = sorted(set(dates))
+    config = pipeline_config(cascade_threshold, dedup_threshold)
+    manifest = load_manifest(counts_dir)
+
+    # Reuse checkpointed days; dates without input have nothing to process
+    results = {}
+    pending = []
+    skipped = []
+    for date_str in sorted_dates:
+        input_path = os.path.join(input_dir, f"{date_str}.json")
+        if not os.path.exists(input_path):
+            skipped.append(date_str)
+            continue
+        counts = None
+        if not force:
+            counts = load_fresh_day_counts(date_str, input_path, config, counts_dir, manifest)
+        if counts is None:
+            pending.append(date_str)
+        else:
+            results[date_str] = counts
+    print(f"Backfill: {len(pending)} days to process, {len(results)} already done, {len(skipped)} without input")
+
+    cache = ExtractionCache(cache_path) if cache_path else None
+    extractor = AsyncExtractor(concurrency=max(1, concurrency), cache=cache)
+    index = load_index(store_dir) if store_dir else None
+    cube_index = topic_cube.load_index(cube_dir) if cube_dir else None
+    failed_days = []
+
+    async def run_day(date_str: str, slots: asyncio.Semaphore, progress: list[int]) -> None:
+        async with slots:
+            started = time.perf_counter()
+            status = "failed"
+            loop = asyncio.get_running_loop()
+
+            def extract(texts: list[str], failed: list[str]) -> list[list[str]]:
+                # Runs in the day's worker thread; the requests go through the shared extractor on the loop
+                future = asyncio.run_coroutine_threadsafe(extractor.extract_async(texts, failed=failed), loop)
+                return future.result()
+
+            try:
+                loaded = await asyncio.to_thread(load_day_reviews, date_str, input_dir)
+                if loaded is not None:
+                    review_texts, scores, input_hash = loaded
+                    counts, failed = await asyncio.to_thread(run_day_pipeline, date_str, review_texts, scores,
+                                                             input_hash, extract, counts_dir, cascade_threshold,
+                                                             dedup_threshold)
+                    if not failed:
+                        if store_dir:
+                            await asyncio.to_thread(upsert_day, date_str, counts, store_dir, index)
+                        if cube_dir:
+                            score_counts = load_day_score_counts(date_str, counts_dir)
+                            if score_counts is not None:
+                                await asyncio.to_thread(topic_cube.upsert_day, date_str, score_counts, cube_dir,
+                                                        cube_index, app)
+                        results[date_str] = counts
+                        status = f"{len(review_texts)} reviews, {sum(counts.values())} topics"
+            except Exception as e:
+                print(f"Error processing {date_str}: {e}")
+
+            if date_str not in results:
+                failed_days.append(date_str)
+            metrics.add_time("backfill.day", time.perf_counter() - started)
+            progress[0] += 1
+            print(f"[{progress[0]}/{len(pending)}] {date_str}: {status} in {time.perf_counter() - started:.1f}s")
+
+    async def run_all() -> None:
+        # the semaphore binds to the running loop, so create it here
+        slots = asyncio.Semaphore(max(1, workers))
+        progress = [0]
+        await asyncio.gather(*(run_day(date_str, slots, progress) for date_str in pending))
+
+    started = time.perf_counter()
+    try:
+        if pending:
+            asyncio.run(run_all())
+    finally:
+        if cache is not None:
+            stats = cache.stats()
+            print(f"Extraction cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+            cache.close()
+
+    print(f"Backfill finished in {time.perf_counter() - started:.1f}s: "
+          f"{len(pending) - len(failed_days)} days processed, {len(failed_days)} failed, "
+          f"{extractor.requests} requests, {extractor.retries} retries")
+    if failed_days:
+        print(f"Failed days (rerun to retry): {', '.join(sorted(failed_days))}")
+    if skipped:
+        print(f"Skipped days without an input file: {', '.join(skipped)}")
+
+    return dict(sorted(results.items()))
@@ -1,10 +1,20 @@
+import hashlib
 import json
 import os
-from collections import Counter
+import threading
+from collections import Counter, defaultdict
+from typing import Callable
 from tqdm import tqdm
 
-from src.agents.topic_agent import extract_topic_phrases
-from src.agents.topic_memory import TopicMemory
+from src.agents.topic_agent import MODEL_NAME, PROMPT_VERSION, extract_topic_phrases_batch, split_batches
+from src.agents.day_counts import hash_bytes, save_day_counts
+from src.utils.dedup import collapse_texts
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.metrics import metrics
+from src.agents.async_extractor import AsyncExtractor
+from src.agents.topic_memory import TopicMemory, EMBEDDING_MODEL
+from src.agents.topic_classifier import TopicClassifier, CONFIDENCE_MARGIN, MAX_WORDS
 
 TOPIC_MAP = {
     "pricing": ["price", "expensive", "high price", "overpriced", "cost", "value for money", "affordable"],
@@ -17,63 +27,411 @@ TOPIC_MAP = {
     "bad quality": ["bad", "poor", "stale", "burnt", "not good", "worse"],
 }
 
+# Compiled matcher for TOPIC_MAP and the TOPIC_MAP generation it was built from
+_topic_matcher: KeywordMatcher | None = None
+_topic_matcher_generation = -1
+_topic_matcher_version: str | None = None
+
+# Bumped by update_topic_map, so a lookup only compares two integers to detect a stale matcher
+_topic_map_generation = 0
+
+# Local embedding classifier for the extraction cascade, created on first use
+_classifier: TopicClassifier | None = None
+
+# The classifier's prototypes and its memory's embedding LRU are not thread-safe
+_classifier_lock = threading.Lock()
+
+
+def topic_map_version() -> str:
+    """
+    Return a short hash identifying the current contents of TOPIC_MAP.
+    """
+    payload = json.dumps(list(TOPIC_MAP.items()), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def rebuild_topic_matcher() -> KeywordMatcher:
+    """
+    Compile TOPIC_MAP into a keyword matcher; call after changing TOPIC_MAP in place.
+    """
+    global _topic_matcher, _topic_matcher_generation, _topic_matcher_version
+    _topic_matcher = KeywordMatcher(TOPIC_MAP)
+    _topic_matcher_generation = _topic_map_generation
+    _topic_matcher_version = topic_map_version()
+    return _topic_matcher
+
+
+def get_topic_matcher(verify: bool = False) -> KeywordMatcher:
+    """
+    Return the compiled TOPIC_MAP matcher, rebuilding it if TOPIC_MAP changed since it was compiled.
+    
+    Changes made through `update_topic_map` are detected with an integer
+    comparison. In-place edits of TOPIC_MAP are only seen after
+    `rebuild_topic_matcher()`, or with `verify`, which compares a hash of
+    the whole map; batch callers verify once per day or file, never per phrase.
+    
+    Args:
+        verify: Also rebuild if the contents of TOPIC_MAP changed in place (default: False)
+    """
+    if _topic_matcher is None or _topic_matcher_generation != _topic_map_generation:
+        return rebuild_topic_matcher()
+    if verify and _topic_matcher_version != topic_map_version():
+        return rebuild_topic_matcher()
+    return _topic_matcher
+
+
+def update_topic_map(canonical: str, keywords: list[str]) -> None:
+    """
+    Add keywords to a canonical topic (creating it if needed) and rebuild the matcher.
+    
+    Args:
+        canonical: Canonical topic name
+        keywords: Keywords mapped to the topic; new topics get the lowest priority
+    """
+    global _topic_map_generation
+    existing = TOPIC_MAP.setdefault(canonical, [])
+    existing.extend(kw for kw in keywords if kw not in existing)
+    _topic_map_generation += 1
+    rebuild_topic_matcher()
+
+
+def pipeline_config(cascade_threshold: float | None = None, dedup_threshold: float | None = None) -> dict:
+    """
+    Return the settings that day counts depend on, recorded in the counts manifest.
+    
+    Args:
+        cascade_threshold: Confidence threshold of the local classifier stage, or None
+            if every review goes to the LLM
+        dedup_threshold: Similarity threshold of near-duplicate collapsing, or None if
+            every review is extracted on its own
+    """
+    cascade = None
+    if cascade_threshold is not None:
+        cascade = {
+            "model": EMBEDDING_MODEL,
+            "threshold": cascade_threshold,
+            "margin": CONFIDENCE_MARGIN,
+            "max_words": MAX_WORDS,
+        }
+    return {
+        "model": MODEL_NAME,
+        "prompt_version": PROMPT_VERSION,
+        "topic_map_version": topic_map_version(),
+        "cascade": cascade,
+        "dedup": dedup_threshold,
+    }
+
+
+def get_classifier(threshold: float) -> TopicClassifier:
+    """
+    Return the shared local classifier over TOPIC_MAP, set to the given confidence threshold.
+    """
+    global _classifier
+    if _classifier is None:
+        _classifier = TopicClassifier(TOPIC_MAP, threshold)
+    _classifier.threshold = threshold
+    return _classifier
+
+
+def classify_locally(review_texts: list[str], threshold: float) -> tuple[list[str | None], list[str]]:
+    """
+    Run the local stage of the cascade and report how many reviews each tier handles.
+    
+    Calls are serialized, so days processed in parallel threads can share the classifier.
+    
+    Args:
+        review_texts: Cleaned review texts
+        threshold: Minimum prototype similarity for a local label
+    
+    Returns:
+        Tuple of (local topic per review or None, texts to escalate to the LLM)
+    """
+    with _classifier_lock:
+        labels = get_classifier(threshold).classify(review_texts)
+    escalated = [text for text, label in zip(review_texts, labels) if label is None]
+    print(f"Cascade: {len(review_texts) - len(escalated)} reviews classified locally, {len(escalated)} sent to the LLM")
+    return labels, escalated
+
+
 def normalize_topic(raw_topic: str) -> str:
-    raw_topic = raw_topic.lower()
-    for canonical, keywords in TOPIC_MAP.items():
-        for kw in keywords:
-            if kw in raw_topic:
-                return canonical
-    return None
+    """
+    Map a raw phrase to its canonical topic, or None if no keyword matches.
+    
+    Topics are tried in TOPIC_MAP order, so the first topic with a keyword
+    contained in the phrase wins. Uses the compiled matcher, rebuilt first
+    if TOPIC_MAP changed through `update_topic_map` (see `get_topic_matcher`).
+    """
+    return get_topic_matcher().match(raw_topic.lower())
+
 
-def process_day(date_str: str, input_dir: str = 'data/processed', memory_path: str = 'topic_memory.json') -> dict[str, int]:
+def normalize_topics(raw_topics: list[str]) -> list[str | None]:
     """
-    Process reviews for a specific day, extract topics, and count topic frequencies.
+    Normalize a batch of phrases (e.g. a whole day's) in one pass.
+    
+    The matcher is rebuilt first if TOPIC_MAP changed through `update_topic_map`
+    (see `get_topic_matcher`).
+    
+    Args:
+        raw_topics: Raw topic phrases
+    
+    Returns:
+        List of canonical topic names (or None), aligned with `raw_topics`
+    """
+    return get_topic_matcher().match_many([phrase.lower() for phrase in raw_topics])
+
+def load_day_reviews(date_str: str, input_dir: str = 'data/processed') -> tuple[list[str], list[int | None], str] | None:
+    """
+    Load the non-empty review texts of a processed day file with their star ratings.
     
     Args:
         date_str: Date string in format YYYY-MM-DD (e.g., '2024-06-01')
         input_dir: Directory containing processed review JSON files (default: 'data/processed')
-        memory_path: Path to topic memory JSON file (default: 'topic_memory.json')
     
     Returns:
-        Dictionary mapping stable topic names to their frequency counts for that day
+        Tuple of (review texts, scores aligned with the texts, SHA-256 of the file),
+        or None if the file is missing or invalid
     """
     # Construct file path
     file_path = os.path.join(input_dir, f"{date_str}.json")
     
-    # Load reviews from JSON file
+    # Load reviews from JSON file, hashing the raw bytes for the counts manifest
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        input_hash = hash_bytes(content)
+        reviews = json.loads(content.decode('utf-8'))
     except FileNotFoundError:
         print(f"File not found: {file_path}")
-        return {}
+        return None
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON from {file_path}: {e}")
-        return {}
+        return None
+    
+    # Get review texts and scores, skipping empty texts
+    kept = [review for review in reviews if review.get('text')]
+    return [review['text'] for review in kept], [review.get('score') for review in kept], input_hash
+
+
+def load_day_texts(date_str: str, input_dir: str = 'data/processed') -> tuple[list[str], str] | None:
+    """
+    Load the non-empty review texts of a processed day file.
+    
+    Args:
+        date_str: Date string in format YYYY-MM-DD (e.g., '2024-06-01')
+        input_dir: Directory containing processed review JSON files (default: 'data/processed')
+    
+    Returns:
+        Tuple of (review texts, SHA-256 of the file), or None if the file is missing or invalid
+    """
+    loaded = load_day_reviews(date_str, input_dir)
+    if loaded is None:
+        return None
+    review_texts, _, input_hash = loaded
+    return review_texts, input_hash
+
+
+def count_day_topics(date_str: str, all_phrases: list[list[str]], input_hash: str,
+                     failed: list[str] | None = None, counts_dir: str | None = 'data/counts',
+                     local_topics: list[str | None] | None = None,
+                     cascade_threshold: float | None = None,
+                     scores: list[int | None] | None = None,
+                     dedup_threshold: float | None = None) -> dict[str, int]:
+    """
+    Normalize a day's extracted phrases, count topics and persist the counts.
+    
+    Args:
+        date_str: Date string in format YYYY-MM-DD
+        all_phrases: Extracted phrase lists, one per review sent to the LLM
+        input_hash: SHA-256 of the processed review file
+        failed: Texts whose extraction failed; if any, the counts are not persisted
+        counts_dir: Directory for per-day count artifacts, or None to skip persisting (default: 'data/counts')
+        local_topics: Topics assigned by the local classifier stage, one per review of the day
+            (None entries were sent to the LLM)
+        cascade_threshold: Threshold the local stage ran with, recorded in the manifest
+        scores: Star rating of every review of the day; when given, per-score counts are
+            persisted next to the counts for the topic cube
+        dedup_threshold: Threshold near-duplicates were collapsed with, recorded in the manifest
+    
+    Returns:
+        Dictionary mapping topic names to their frequency counts for that day
+    """
+    # Reviews the phrase lists belong to: all of them, or only those the local stage escalated
+    if local_topics is not None:
+        llm_reviews = [i for i, label in enumerate(local_topics) if label is None]
+    else:
+        llm_reviews = range(len(all_phrases))
     
-    # Collect all topics
-    topics = []
-    
-    # Process each review with progress bar
-    for review in tqdm(reviews, desc=f"Processing {date_str}"):
-        # Get review text
-        review_text = review.get('text', '')
-        
-        if not review_text:
-            continue
-        
-        # Extract topic phrases from review
-        extracted_phrases = extract_topic_phrases(review_text)
-        
-        # Map each phrase to canonical topic name and add to list
+    # Map each phrase to canonical topic name in one batch, skipping empty phrases
+    phrases = []
+    owners = []
+    for review, extracted_phrases in zip(llm_reviews, all_phrases):
         for phrase in extracted_phrases:
-            if phrase:  # Skip empty phrases
-                normalized = normalize_topic(phrase)
-                if normalized:    # ignore unmatched topics
-                    topics.append(normalized)
+            if phrase:
+                phrases.append(phrase)
+                owners.append(review)
+    
+    # Pick up in-place TOPIC_MAP edits once per day, then normalize without rehashing
+    get_topic_matcher(verify=True)
+    
+    # Collect (review, topic) pairs; phrases no topic matched are kept for topic discovery
+    matches = []
+    unmatched = Counter()
+    for owner, phrase, topic in zip(owners, phrases, normalize_topics(phrases)):
+        if topic:
+            matches.append((owner, topic))
+        else:
+            unmatched[phrase.strip().lower()] += 1
+    matches.extend((i, topic) for i, topic in enumerate(local_topics or []) if topic)
     
     # Count topic frequencies using Counter
-    topic_counts = Counter(topics)
+    topic_counts = Counter(topic for _, topic in matches)
+    
+    # Same counts split by the star rating of the review they came from
+    score_counts = None
+    if scores is not None:
+        score_counts = defaultdict(Counter)
+        for review, topic in matches:
+            if scores[review] is not None:
+                score_counts[topic][str(scores[review])] += 1
+        score_counts = {topic: dict(by_score) for topic, by_score in score_counts.items()}
+    
+    # Persist counts so trend builds can skip unchanged days
+    if counts_dir:
+        if failed:
+            print(f"{len(failed)} reviews failed extraction; counts for {date_str} not saved")
+        else:
+            # Reviews behind the counts: local labels cover the whole day, phrases only the escalated reviews
+            reviews = len(local_topics) if local_topics is not None else len(all_phrases)
+            save_day_counts(date_str, dict(topic_counts), input_hash,
+                            pipeline_config(cascade_threshold, dedup_threshold), counts_dir,
+                            reviews=reviews, score_counts=score_counts, unmatched=dict(unmatched))
     
     # Return as dict
     return dict(topic_counts)
+
+
+def run_day_pipeline(date_str: str, review_texts: list[str], scores: list[int | None], input_hash: str,
+                     extract: Callable[[list[str], list[str]], list[list[str]]],
+                     counts_dir: str | None = 'data/counts', cascade_threshold: float | None = None,
+                     dedup_threshold: float | None = None) -> tuple[dict[str, int], list[str]]:
+    """
+    Run one loaded day through cascade -> dedup -> extract -> count.
+    
+    This is the per-day pipeline shared by `process_day` and the backfill;
+    only the extraction step differs between them and is passed in.
+    
+    Args:
+        date_str: Date string in format YYYY-MM-DD
+        review_texts: The day's non-empty review texts
+        scores: Star rating of every review, aligned with `review_texts`
+        input_hash: SHA-256 of the processed review file
+        extract: Called as extract(texts, failed); returns one phrase list per text and
+            appends the texts whose extraction failed to `failed`
+        counts_dir: Directory for per-day count artifacts, or None to skip persisting (default: 'data/counts')
+        cascade_threshold: Confidence threshold of the local classifier stage, or None to send
+            every review to the LLM (default: None)
+        dedup_threshold: Minimum estimated Jaccard similarity for reviews to share one extraction,
+            or None to extract every review (default: None)
+    
+    Returns:
+        Tuple of (topic counts, texts whose extraction failed); counts are only persisted
+        when nothing failed
+    """
+    metrics.incr("day.reviews", len(review_texts))
+    
+    # Cascade: label confident short reviews locally, escalate the rest
+    local_topics = None
+    llm_texts = review_texts
+    if cascade_threshold is not None:
+        with metrics.timer("day.cascade"):
+            local_topics, llm_texts = classify_locally(review_texts, cascade_threshold)
+    
+    # Dedup: extract one representative per group of near-duplicate reviews
+    groups = None
+    if dedup_threshold is not None:
+        with metrics.timer("day.dedup"):
+            llm_texts, groups = collapse_texts(llm_texts, dedup_threshold)
+    
+    failed = []
+    with metrics.timer("day.extract"):
+        all_phrases = extract(llm_texts, failed)
+    metrics.incr("day.extract.items", len(llm_texts))
+    
+    # Every member of a group counts its representative's phrases
+    if groups is not None:
+        all_phrases = [all_phrases[g] for g in groups]
+    
+    with metrics.timer("day.count"):
+        counts = count_day_topics(date_str, all_phrases, input_hash, failed, counts_dir, local_topics,
+                                  cascade_threshold, scores, dedup_threshold)
+    return counts, failed
+
+
+def process_day(date_str: str, input_dir: str = 'data/processed', memory_path: str = 'topic_memory.json',
+                concurrency: int = 0, cache_path: str | None = 'cache/extraction_cache.sqlite',
+                counts_dir: str | None = 'data/counts', cascade_threshold: float | None = None,
+                dedup_threshold: float | None = None) -> dict[str, int]:
+    """
+    Process reviews for a specific day, extract topics, and count topic frequencies.
+    
+    The counts are written to `counts_dir` together with a manifest entry
+    recording the input file hash and pipeline config, so trend builds can
+    reuse them. Days where any extraction request failed are not persisted.
+    
+    With `cascade_threshold` set, short reviews are first classified locally
+    against TOPIC_MAP prototype embeddings (see TopicClassifier); only the
+    low-confidence ones are sent to the LLM.
+    
+    With `dedup_threshold` set, the reviews bound for the LLM are grouped
+    into exact and near-duplicates (MinHash LSH, see src/utils/dedup.py);
+    each group is extracted once and its phrases count once per member,
+    so the totals stay per review.
+    
+    Args:
+        date_str: Date string in format YYYY-MM-DD (e.g., '2024-06-01')
+        input_dir: Directory containing processed review JSON files (default: 'data/processed')
+        memory_path: Path to topic memory JSON file (default: 'topic_memory.json')
+        concurrency: Number of requests in flight; 0 runs batches sequentially (default: 0)
+        cache_path: Path to the extraction cache database, or None to disable caching
+            (default: 'cache/extraction_cache.sqlite')
+        counts_dir: Directory for per-day count artifacts, or None to skip persisting (default: 'data/counts')
+        cascade_threshold: Confidence threshold of the local classifier stage, or None to send
+            every review to the LLM (default: None)
+        dedup_threshold: Minimum estimated Jaccard similarity for reviews to share one extraction,
+            or None to extract every review (default: None)
+    
+    Returns:
+        Dictionary mapping stable topic names to their frequency counts for that day
+    """
+    with metrics.timer("day.load"):
+        loaded = load_day_reviews(date_str, input_dir)
+    if loaded is None:
+        return {}
+    review_texts, scores, input_hash = loaded
+    
+    # Open extraction cache so repeated texts skip the API
+    cache = ExtractionCache(cache_path) if cache_path else None
+    
+    def extract(texts: list[str], failed: list[str]) -> list[list[str]]:
+        # Extract topic phrases with progress bar
+        with tqdm(total=len(texts), desc=f"Processing {date_str}") as progress:
+            if concurrency > 0:
+                # Async mode: many batched requests in flight behind a rate limiter
+                extractor = AsyncExtractor(concurrency=concurrency, cache=cache)
+                return extractor.extract(texts, on_batch_done=progress.update, failed=failed)
+            # Sequential mode: one batched request at a time
+            all_phrases = []
+            for batch in split_batches(texts):
+                all_phrases.extend(extract_topic_phrases_batch([texts[i] for i in batch], cache=cache, failed=failed))
+                progress.update(len(batch))
+            return all_phrases
+    
+    try:
+        counts, _ = run_day_pipeline(date_str, review_texts, scores, input_hash, extract, counts_dir,
+                                     cascade_threshold, dedup_threshold)
+    finally:
+        if cache is not None:
+            stats = cache.stats()
+            print(f"Extraction cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+            cache.close()
+    return counts
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+MANIFEST_NAME = "manifest.json"
+
+# Guards manifest read-modify-write when several days are processed in threads
+_manifest_lock = threading.Lock()
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Return the SHA-256 hex digest of raw file content.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str | None:
+    """
+    Return the SHA-256 hex digest of a file, or None if it does not exist.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def load_manifest(counts_dir: str) -> dict:
+    """
+    Load the counts manifest mapping each date to the inputs and config its counts were built from.
+
+    Args:
+        counts_dir: Directory holding per-day count files and the manifest
+
+    Returns:
+        Dictionary mapping date strings to manifest entries
+    """
+    try:
+        with open(os.path.join(counts_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_json_atomic(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def score_counts_path(date_str: str, counts_dir: str = 'data/counts') -> str:
+    """
+    Return the file holding one day's topic counts split by star rating.
+    """
+    return os.path.join(counts_dir, f"{date_str}.scores.json")
+
+
+def unmatched_path(date_str: str, counts_dir: str = 'data/counts') -> str:
+    """
+    Return the file holding the phrases of one day that matched no topic.
+    """
+    return os.path.join(counts_dir, f"{date_str}.unmatched.json")
+
+
+def save_day_counts(date_str: str, counts: dict[str, int], input_hash: str, config: dict,
+                    counts_dir: str = 'data/counts', reviews: int | None = None,
+                    score_counts: dict[str, dict[str, int]] | None = None,
+                    unmatched: dict[str, int] | None = None) -> None:
+    """
+    Persist one day's topic counts and record how they were produced in the manifest.
+
+    Args:
+        date_str: Date string in format YYYY-MM-DD
+        counts: Mapping of topic name to count for that day
+        input_hash: SHA-256 of the processed review file the counts were built from
+        config: Pipeline settings the counts depend on (model, prompt and TOPIC_MAP versions)
+        counts_dir: Directory holding per-day count files and the manifest (default: 'data/counts')
+        reviews: Number of reviews the counts were built from, recorded for share-of-reviews analytics
+        score_counts: The same counts split by star rating ({topic: {score: count}}), for the topic cube
+        unmatched: Frequency of each extracted phrase that matched no topic, for topic discovery
+    """
+    os.makedirs(counts_dir, exist_ok=True)
+    _write_json_atomic(os.path.join(counts_dir, f"{date_str}.json"), counts)
+    if score_counts is not None:
+        _write_json_atomic(score_counts_path(date_str, counts_dir), score_counts)
+    elif os.path.exists(score_counts_path(date_str, counts_dir)):
+        # Drop a split left over from an earlier run so it never disagrees with the counts
+        os.remove(score_counts_path(date_str, counts_dir))
+    if unmatched is not None:
+        _write_json_atomic(unmatched_path(date_str, counts_dir), unmatched)
+
+    with _manifest_lock:
+        manifest = load_manifest(counts_dir)
+        manifest[date_str] = {
+            "input_hash": input_hash,
+            **config,
+            "reviews": reviews,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        _write_json_atomic(os.path.join(counts_dir, MANIFEST_NAME), dict(sorted(manifest.items())))
+
+
+def load_day_counts(date_str: str, counts_dir: str = 'data/counts') -> dict[str, int] | None:
+    """
+    Load stored counts for a day regardless of freshness, or None if there are none.
+    """
+    try:
+        with open(os.path.join(counts_dir, f"{date_str}.json"), 'r', encoding='utf-8') as f:
+            counts = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return counts if isinstance(counts, dict) else None
+
+
+def load_day_score_counts(date_str: str, counts_dir: str = 'data/counts') -> dict[str, dict[str, int]] | None:
+    """
+    Load a day's stored counts split by star rating, or None if there are none.
+    """
+    try:
+        with open(score_counts_path(date_str, counts_dir), 'r', encoding='utf-8') as f:
+            score_counts = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return score_counts if isinstance(score_counts, dict) else None
+
+
+def load_unmatched(date_str: str, counts_dir: str = 'data/counts') -> dict[str, int]:
+    """
+    Load the phrases of a day that matched no topic, with their frequencies (empty if none were stored).
+    """
+    try:
+        with open(unmatched_path(date_str, counts_dir), 'r', encoding='utf-8') as f:
+            unmatched = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return unmatched if isinstance(unmatched, dict) else {}
+
+
+def is_fresh(entry: dict | None, input_hash: str | None, config: dict) -> bool:
+    """
+    Check whether a manifest entry was built from the given input and config.
+    """
+    if entry is None or input_hash is None or entry.get("input_hash") != input_hash:
+        return False
+    return all(entry.get(key) == value for key, value in config.items())
+
+
+def load_fresh_day_counts(date_str: str, input_path: str, config: dict,
+                          counts_dir: str = 'data/counts', manifest: dict | None = None) -> dict[str, int] | None:
+    """
+    Load stored counts for a day if its input file and config are unchanged.
+
+    Args:
+        date_str: Date string in format YYYY-MM-DD
+        input_path: Processed review file for that day
+        config: Current pipeline settings
+        counts_dir: Directory holding per-day count files and the manifest (default: 'data/counts')
+        manifest: Preloaded manifest, to avoid rereading it for every day
+
+    Returns:
+        Stored counts, or None if the day has to be recomputed (including days
+        stored without their split by star rating)
+    """
+    if manifest is None:
+        manifest = load_manifest(counts_dir)
+    if not is_fresh(manifest.get(date_str), hash_file(input_path), config):
+        return None
+    if not os.path.exists(score_counts_path(date_str, counts_dir)):
+        return None
+    return load_day_counts(date_str, counts_dir)
+
+
+def load_review_totals(dates: list[str], counts_dir: str = 'data/counts',
+                       manifest: dict | None = None) -> dict[str, int]:
+    """
+    Return the number of reviews behind each day's counts, for days whose manifest entry records it.
+    """
+    if manifest is None:
+        manifest = load_manifest(counts_dir)
+    totals = {}
+    for date_str in dates:
+        reviews = (manifest.get(date_str) or {}).get("reviews")
+        if reviews is not None:
+            totals[date_str] = reviews
+    return totals
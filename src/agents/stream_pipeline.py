@@ -0,0 +1,220 @@
+import asyncio
+import json
+import threading
+from collections import Counter
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+
+from src.agents.topic_agent import MAX_BATCH_SIZE, extract_topic_phrases_batch
+from src.agents.async_extractor import AsyncExtractor
+from src.agents.daily_topic_processor import get_topic_matcher, normalize_topics
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.preprocess import clean_review
+from src.utils.metrics import metrics
+
+# Characters read from the input file per chunk
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(f: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator:
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time.
+
+    Only the current chunk and the element being decoded are held in memory.
+
+    Args:
+        f: Text file positioned at the start of the array
+        chunk_size: Characters read per chunk
+
+    Yields:
+        Decoded array elements
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # Skip whitespace and separators, reading more input as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        if pos >= len(buffer):
+            if started:
+                raise ValueError("Unexpected end of JSON array")
+            return
+
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        # Decode the next element; an element cut off by the chunk boundary needs more input.
+        # A decode ending exactly at the buffer end may be a truncated number, so read more first.
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+
+        if not complete:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield item
+        pos = end
+
+        # Drop the consumed prefix so the buffer stays bounded
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def iter_reviews(path: str) -> Iterator[dict]:
+    """
+    Stream raw reviews from a JSON array file or a JSONL file (one review per line).
+
+    Args:
+        path: Path of the review file
+
+    Yields:
+        Raw review dictionaries
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        # Peek at the first non-whitespace character to detect the format
+        first = ""
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                first = char
+                break
+        f.seek(0)
+
+        if first == "[":
+            yield from iter_json_array(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def clean_stream(reviews: Iterable[dict]) -> Iterator[dict]:
+    """
+    Clean raw reviews one at a time, dropping incomplete ones and empty texts.
+    """
+    for review in reviews:
+        cleaned = clean_review(review)
+        if cleaned is not None and cleaned['text']:
+            yield cleaned
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Group an iterable into lists of at most `size` items.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def extract_stream(reviews: Iterable[dict], window: int = MAX_BATCH_SIZE,
+                   cache: ExtractionCache | None = None, concurrency: int = 0) -> Iterator[tuple[dict, list[str]]]:
+    """
+    Extract topic phrases for a stream of cleaned reviews, one bounded window at a time.
+
+    The next window is only pulled from upstream once the current one has
+    been extracted and consumed downstream, so at most `window` reviews are
+    in memory (backpressure). Concurrent windows all run on one event loop
+    in a helper thread with one extractor, so the rate limiter and the
+    adaptive concurrency limit span the whole stream.
+
+    Args:
+        reviews: Cleaned reviews
+        window: Number of reviews extracted together
+        cache: Optional extraction cache
+        concurrency: Requests in flight per window; 0 runs batches sequentially
+
+    Yields:
+        Tuples of (review, extracted phrases)
+    """
+    if concurrency <= 0:
+        for chunk in batched(reviews, window):
+            yield from zip(chunk, extract_topic_phrases_batch([review['text'] for review in chunk], cache=cache))
+        return
+
+    extractor = AsyncExtractor(concurrency=concurrency, cache=cache)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="extract-stream", daemon=True)
+    thread.start()
+    try:
+        for chunk in batched(reviews, window):
+            texts = [review['text'] for review in chunk]
+            phrases = asyncio.run_coroutine_threadsafe(extractor.extract_async(texts), loop).result()
+            yield from zip(chunk, phrases)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def normalize_stream(extracted: Iterable[tuple[dict, list[str]]]) -> Iterator[str]:
+    """
+    Map each review's phrases to canonical topics, yielding matched topics only.
+
+    In-place TOPIC_MAP edits are checked for once per stream, not per review.
+    """
+    get_topic_matcher(verify=True)
+    for _, phrases in extracted:
+        for topic in normalize_topics([phrase for phrase in phrases if phrase]):
+            if topic:
+                yield topic
+
+
+def process_file_streaming(path: str, window: int = MAX_BATCH_SIZE, concurrency: int = 0,
+                           cache_path: str | None = 'cache/extraction_cache.sqlite') -> dict[str, int]:
+    """
+    Count topics in a raw review file with a streaming clean -> extract -> normalize -> count pipeline.
+
+    Memory use is bounded by `window` (times `concurrency` when extracting
+    concurrently), not by the file size.
+
+    Args:
+        path: Raw review file (JSON array or JSONL)
+        window: Number of reviews pulled through extraction at a time (default: MAX_BATCH_SIZE)
+        concurrency: Requests in flight; 0 runs batches sequentially (default: 0)
+        cache_path: Path to the extraction cache database, or None to disable caching
+
+    Returns:
+        Dictionary mapping topic names to their frequency counts
+    """
+    cache = ExtractionCache(cache_path) if cache_path else None
+    try:
+        with metrics.timer("stream.file"):
+            reviews = clean_stream(iter_reviews(path))
+            extracted = extract_stream(reviews, window * max(1, concurrency), cache, concurrency)
+            return dict(Counter(normalize_stream(extracted)))
+    finally:
+        if cache is not None:
+            cache.close()
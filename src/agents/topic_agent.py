@@ -1,21 +1,128 @@
 import os
-from google.genai import Client
 import json
 import re
+import time
+from typing import TYPE_CHECKING
 
-def extract_topic_phrases(review_text: str) -> list[str]:
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from google.genai import Client
+
+MODEL_NAME = "gemini-1.5-flash"
+
+# Bump whenever the prompts or parsing change, so cached extractions are not reused
+PROMPT_VERSION = "1"
+
+# Rough token budget for a single batched request (prompt + reviews)
+MAX_BATCH_TOKENS = 6000
+MAX_BATCH_SIZE = 50
+
+# Approximate characters per token, used to estimate request size without a tokenizer
+CHARS_PER_TOKEN = 4
+
+_client = None
+
+
+def get_client() -> "Client | None":
     """
-    Extract topic phrases using Gemini API and return list of short phrases.
+    Return a shared Gemini client, creating it on first use.
+
+    The SDK is imported here rather than at module level, so code paths
+    that never call the API (cache hits, fake clients) do not load it.
+
+    Returns:
+        Client instance, or None if the API key is missing
     """
+    global _client
+    if _client is None:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            print("Gemini API key missing.")
+            return None
+        from google.genai import Client
+        _client = Client(api_key=api_key)
+    return _client
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        print("Gemini API key missing.")
-        return []
 
-    client = Client(api_key=api_key)
+def set_client(client) -> None:
+    """
+    Replace the shared client, e.g. with `FakeGeminiClient` for offline runs.
+    """
+    global _client
+    _client = client
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def clean_phrase(phrase: str) -> str:
+    """
+    Strip punctuation from a phrase and lowercase it.
+    """
+    return re.sub(r'[^\w\s]', '', phrase).lower().strip()
+
+
+def strip_code_fence(text: str) -> str:
+    """
+    Remove markdown code block formatting from a model response if present.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        lines = lines[1:-1]
+        text = "\n".join(lines).strip()
+    return text
+
 
-    prompt = f"""
+def parse_phrases(text: str) -> list[str]:
+    """
+    Parse a single-review model response into a list of cleaned phrases.
+
+    Args:
+        text: Raw response text from the model
+
+    Returns:
+        List of cleaned topic phrases
+    """
+    text = strip_code_fence(text)
+
+    # try to parse JSON
+    try:
+        items = json.loads(text)
+        if isinstance(items, list):
+            cleaned = []
+            for phrase in items:
+                if isinstance(phrase, str) and phrase.strip():
+                    cleaned.append(clean_phrase(phrase))
+            return cleaned
+    except Exception:
+        pass
+
+    # fallback: line-based extraction
+    phrases = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        line = re.sub(r'^[\d\-\•\*\.\s]+', '', line).strip()
+        line = clean_phrase(line)
+        if len(line.split()) <= 6:
+            phrases.append(line)
+
+    return phrases
+
+
+def build_prompt(review_text: str) -> str:
+    """
+    Build the extraction prompt for a single review.
+    """
+    return f"""
     Extract core customer concern topics from the review below.
     Return a JSON list of short phrases (max 4 words each).
 
@@ -23,45 +130,252 @@ def extract_topic_phrases(review_text: str) -> list[str]:
     "{review_text}"
     """
 
+
+def build_batch_prompt(review_texts: list[str]) -> str:
+    """
+    Build one extraction prompt covering several reviews, each tagged with an ID.
+
+    Args:
+        review_texts: Reviews to include, in order; review i gets ID i
+
+    Returns:
+        Prompt text
+    """
+    reviews_block = "\n".join(
+        json.dumps({"id": i, "review": text}, ensure_ascii=False)
+        for i, text in enumerate(review_texts)
+    )
+    return f"""
+    Extract core customer concern topics from each review below.
+    Each review is a JSON object with an "id" and the "review" text.
+    Return a single JSON object mapping every review id (as a string) to a
+    JSON list of short phrases (max 4 words each). Use an empty list for
+    reviews with no concern. Do not skip any id.
+
+    Reviews:
+    {reviews_block}
+    """
+
+
+def parse_batch_response(text: str, count: int) -> list[list[str] | None]:
+    """
+    Parse a batched model response into per-review phrase lists.
+
+    Args:
+        text: Raw response text from the model
+        count: Number of reviews that were sent in the batch
+
+    Returns:
+        List of length `count`; entries are None for reviews whose result
+        is missing or malformed in the response
+    """
+    results: list[list[str] | None] = [None] * count
+
     try:
-        response = client.models.generate_content(
-            model="gemini-1.5-flash",
-            contents=prompt
-        )
-        text = response.text.strip()
+        data = json.loads(strip_code_fence(text))
+    except Exception:
+        return results
 
-        # remove code block formatting if present
-        if text.startswith("```"):
-            lines = text.split("\n")
-            lines = lines[1:-1]
-            text = "\n".join(lines).strip()
+    # accept both {"0": [...]} and [{"id": 0, "topics": [...]}] shapes
+    if isinstance(data, list):
+        data = {
+            str(item.get("id")): item.get("topics", item.get("phrases"))
+            for item in data if isinstance(item, dict)
+        }
+    if not isinstance(data, dict):
+        return results
 
-        # try to parse JSON
+    for key, items in data.items():
         try:
-            items = json.loads(text)
-            if isinstance(items, list):
-                cleaned = []
-                for phrase in items:
-                    if isinstance(phrase, str) and phrase.strip():
-                        phrase = re.sub(r'[^\w\s]', '', phrase).lower().strip()
-                        cleaned.append(phrase)
-                return cleaned
-        except Exception:
-            pass
-
-        # fallback: line-based extraction
-        phrases = []
-        for line in text.split("\n"):
-            line = line.strip()
-            if not line:
-                continue
-            line = re.sub(r'^[\d\-\•\*\.\s]+', '', line).strip()
-            line = re.sub(r'[^\w\s]', '', line).lower().strip()
-            if len(line.split()) <= 6:
-                phrases.append(line)
-
-        return phrases
+            idx = int(key)
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= idx < count or not isinstance(items, list):
+            continue
+        results[idx] = [
+            clean_phrase(phrase) for phrase in items
+            if isinstance(phrase, str) and phrase.strip()
+        ]
+
+    return results
+
+
+def split_batches(review_texts: list[str],
+                  max_batch_tokens: int = MAX_BATCH_TOKENS,
+                  max_batch_size: int = MAX_BATCH_SIZE) -> list[list[int]]:
+    """
+    Split reviews into batches of indices that fit the token budget.
+
+    A review that is larger than the budget on its own still gets a batch
+    of its own.
+
+    Args:
+        review_texts: Reviews to split
+        max_batch_tokens: Estimated token budget per batched request
+        max_batch_size: Maximum number of reviews per batch
+
+    Returns:
+        List of batches, each a list of indices into `review_texts`
+    """
+    overhead = estimate_tokens(build_batch_prompt([]))
+    batches = []
+    current = []
+    current_tokens = overhead
+
+    for i, text in enumerate(review_texts):
+        # per-review JSON wrapper adds a few tokens on top of the text itself
+        tokens = estimate_tokens(text) + 8
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            current_tokens = overhead
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def record_llm_call(prompt: str, response, seconds: float) -> None:
+    """
+    Record latency and token usage of one successful API call in the metrics registry.
+
+    Token counts come from the response's usage metadata when present,
+    otherwise from the character-based estimate.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    sent = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+    received = getattr(usage, "candidates_token_count", None) or estimate_tokens(response.text or "")
+    metrics.incr("llm.calls")
+    metrics.incr("llm.tokens_sent", sent)
+    metrics.incr("llm.tokens_received", received)
+    metrics.observe("llm.latency_s", seconds)
+
+
+def request_topic_phrases(client, review_text: str) -> list[str] | None:
+    """
+    Send a single-review extraction request.
+
+    Returns:
+        List of phrases, or None if the request failed
+    """
+    prompt = build_prompt(review_text)
+    try:
+        started = time.perf_counter()
+        response = client.models.generate_content(
+            model=MODEL_NAME,
+            contents=prompt
+        )
+        record_llm_call(prompt, response, time.perf_counter() - started)
+        return parse_phrases(response.text)
 
     except Exception as e:
+        metrics.incr("llm.errors")
         print(f"Error extracting topics: {e}")
+        return None
+
+
+def extract_topic_phrases(review_text: str, cache: ExtractionCache | None = None) -> list[str]:
+    """
+    Extract topic phrases using Gemini API and return list of short phrases.
+    """
+    if cache is not None:
+        cached = cache.get(review_text, MODEL_NAME, PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    client = get_client()
+    if client is None:
+        return []
+
+    phrases = request_topic_phrases(client, review_text)
+    if phrases is None:
+        return []
+
+    if cache is not None:
+        cache.put(review_text, phrases, MODEL_NAME, PROMPT_VERSION)
+    return phrases
+
+
+def extract_topic_phrases_batch(review_texts: list[str],
+                                max_batch_tokens: int = MAX_BATCH_TOKENS,
+                                max_batch_size: int = MAX_BATCH_SIZE,
+                                cache: ExtractionCache | None = None,
+                                failed: list[str] | None = None) -> list[list[str]]:
+    """
+    Extract topic phrases for many reviews using one Gemini request per batch.
+
+    Duplicate texts are sent once, and texts found in `cache` are not sent
+    at all. The rest are split into batches by estimated token budget and
+    sent with per-review IDs. Any review whose result is missing from a
+    batched response (or whose batch fails entirely) is retried with a
+    single-review call.
+
+    Args:
+        review_texts: Review texts to process
+        max_batch_tokens: Estimated token budget per batched request
+        max_batch_size: Maximum number of reviews per batched request
+        cache: Optional extraction cache consulted before and filled after requests
+        failed: Optional list that receives texts whose extraction failed
+
+    Returns:
+        List of phrase lists, in the same order as `review_texts`; failed
+        texts get an empty list
+    """
+    if not review_texts:
         return []
+
+    # Deduplicate texts, keeping first-seen order
+    unique_texts = list(dict.fromkeys(review_texts))
+    found: dict[str, list[str]] = {}
+
+    if cache is not None:
+        for text, phrases in zip(unique_texts, cache.get_many(unique_texts, MODEL_NAME, PROMPT_VERSION)):
+            if phrases is not None:
+                found[text] = phrases
+
+    pending = [text for text in unique_texts if text not in found]
+    client = get_client() if pending else None
+    extracted: dict[str, list[str]] = {}
+
+    if client is not None:
+        for batch in split_batches(pending, max_batch_tokens, max_batch_size):
+            texts = [pending[i] for i in batch]
+
+            if len(texts) == 1:
+                parsed = [request_topic_phrases(client, texts[0])]
+            else:
+                prompt = build_batch_prompt(texts)
+                try:
+                    started = time.perf_counter()
+                    response = client.models.generate_content(
+                        model=MODEL_NAME,
+                        contents=prompt
+                    )
+                    record_llm_call(prompt, response, time.perf_counter() - started)
+                    parsed = parse_batch_response(response.text, len(texts))
+                except Exception as e:
+                    metrics.incr("llm.errors")
+                    print(f"Error extracting topics for batch: {e}")
+                    parsed = [None] * len(texts)
+                metrics.incr("llm.batch_fallbacks", sum(phrases is None for phrases in parsed))
+
+                # fallback: per-item call when the batched result is unusable
+                parsed = [
+                    phrases if phrases is not None else request_topic_phrases(client, text)
+                    for text, phrases in zip(texts, parsed)
+                ]
+
+            for text, phrases in zip(texts, parsed):
+                if phrases is not None:    # failed requests are neither cached nor reused
+                    extracted[text] = phrases
+
+    if cache is not None:
+        cache.put_many(extracted, MODEL_NAME, PROMPT_VERSION)
+    if failed is not None:
+        failed.extend(text for text in pending if text not in extracted)
+
+    found.update(extracted)
+    return [found.get(text, []) for text in review_texts]
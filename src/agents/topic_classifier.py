@@ -0,0 +1,139 @@
+import json
+import numpy as np
+
+from src.agents.topic_memory import TopicMemory
+from src.utils.metrics import metrics
+
+# Minimum cosine similarity to the best topic prototype for a local label
+CONFIDENCE_THRESHOLD = 0.6
+
+# Minimum gap between the best and second-best topic scores
+CONFIDENCE_MARGIN = 0.05
+
+# Longer reviews often mention several issues, so they always go to the LLM
+MAX_WORDS = 12
+
+# Texts per model.encode call for embeddings not found in the caches
+EMBED_BATCH_SIZE = 64
+
+
+class TopicClassifier:
+    """
+    Local first stage of the extraction cascade.
+
+    Short reviews are embedded through a TopicMemory (its model, in-memory
+    LRU and on-disk embedding cache) and scored against one prototype
+    embedding per topic (the normalized mean of the topic name and its
+    keywords). A review gets a topic locally only when the best score
+    clears `threshold` and beats the runner-up by `margin`; everything
+    else is left for the LLM.
+    """
+
+    def __init__(self, topic_map: dict[str, list[str]], threshold: float = CONFIDENCE_THRESHOLD,
+                 margin: float = CONFIDENCE_MARGIN, max_words: int = MAX_WORDS,
+                 batch_size: int = EMBED_BATCH_SIZE, memory: TopicMemory | None = None):
+        """
+        Initialize TopicClassifier.
+
+        Args:
+            topic_map: Mapping of canonical topic to keywords (usually TOPIC_MAP); read on
+                every call, so in-place edits are picked up
+            threshold: Minimum cosine similarity for a local label (default: 0.6)
+            margin: Minimum gap between the best and second-best topic (default: 0.05)
+            max_words: Reviews with more words are always escalated (default: 12)
+            batch_size: Texts per model.encode call (default: 64)
+            memory: TopicMemory whose model and embedding caches embed the texts
+                (default: a TopicMemory over 'topic_memory.json', created on first use)
+        """
+        self.topic_map = topic_map
+        self.threshold = threshold
+        self.margin = margin
+        self.max_words = max_words
+        self.batch_size = batch_size
+
+        self._memory = memory
+        self._topics: list[str] = []
+        self._prototypes: np.ndarray | None = None
+        self._prototype_key: str | None = None
+
+        # Reviews labelled locally / escalated to the LLM over this classifier's lifetime
+        self.local = 0
+        self.escalated = 0
+
+    @property
+    def memory(self) -> TopicMemory:
+        """
+        TopicMemory used for embeddings, created on first use.
+        """
+        if self._memory is None:
+            self._memory = TopicMemory()
+        return self._memory
+
+    def prototypes(self) -> tuple[list[str], np.ndarray]:
+        """
+        Return topic names and their prototype matrix, rebuilding it if the topic map changed.
+        """
+        key = json.dumps(list(self.topic_map.items()), ensure_ascii=False)
+        if self._prototype_key != key:
+            topics = list(self.topic_map)
+            texts = []
+            owners = []
+            for i, topic in enumerate(topics):
+                for text in [topic, *self.topic_map[topic]]:
+                    texts.append(text)
+                    owners.append(i)
+            embeddings = self.memory.get_embeddings(texts, batch_size=self.batch_size)
+
+            # Mean of each topic's embeddings, renormalized
+            sums = np.zeros((len(topics), embeddings.shape[1]), dtype=np.float32)
+            np.add.at(sums, np.asarray(owners), embeddings)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+
+            self._topics = topics
+            self._prototypes = sums / norms
+            self._prototype_key = key
+        return self._topics, self._prototypes
+
+    def classify(self, review_texts: list[str]) -> list[str | None]:
+        """
+        Label confidently classifiable reviews with a topic.
+
+        Args:
+            review_texts: Cleaned review texts
+
+        Returns:
+            List aligned with `review_texts`; the topic for reviews labelled
+            locally, None for reviews that should go to the LLM
+        """
+        labels: list[str | None] = [None] * len(review_texts)
+        eligible = [i for i, text in enumerate(review_texts) if text and len(text.split()) <= self.max_words]
+
+        if eligible:
+            topics, prototypes = self.prototypes()
+            if len(topics) > 0:
+                # Embed each distinct text once
+                unique_texts = list(dict.fromkeys(review_texts[i] for i in eligible))
+                scores = self.memory.get_embeddings(unique_texts, batch_size=self.batch_size) @ prototypes.T
+
+                order = np.argsort(-scores, axis=1)
+                best = scores[np.arange(len(unique_texts)), order[:, 0]]
+                if len(topics) > 1:
+                    second = scores[np.arange(len(unique_texts)), order[:, 1]]
+                else:
+                    second = np.full(len(unique_texts), -1.0, dtype=np.float32)
+                confident = (best >= self.threshold) & (best - second >= self.margin)
+
+                by_text = {
+                    text: topics[order[row, 0]] if confident[row] else None
+                    for row, text in enumerate(unique_texts)
+                }
+                for i in eligible:
+                    labels[i] = by_text[review_texts[i]]
+
+        local = sum(label is not None for label in labels)
+        self.local += local
+        self.escalated += len(labels) - local
+        metrics.incr("cascade.local", local)
+        metrics.incr("cascade.escalated", len(labels) - local)
+        return labels
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+INDEX_NAME = "_index.json"
+
+# App label for single-app pipelines
+DEFAULT_APP = "default"
+
+# Long-format schema of each partition file; app and date live in the partition path
+PARTITION_SCHEMA = pa.schema([("topic", pa.string()), ("score", pa.int64()), ("count", pa.int64())])
+PARTITIONING = ds.partitioning(pa.schema([("app", pa.string()), ("date", pa.string())]), flavor="hive")
+
+DIMENSIONS = ("date", "topic", "score", "app")
+
+# Each app keeps its own index file under its partition directory, so one
+# process per app can write the shared store without cross-process locking.
+# The lock guards index read-modify-write when several days are written from threads
+_index_lock = threading.Lock()
+
+
+def cube_digest(score_counts: dict[str, dict]) -> str:
+    """
+    Return a short hash of a day's per-score counts, used to skip rewriting unchanged partitions.
+    """
+    rows = sorted((topic, int(score), int(count)) for topic, by_score in score_counts.items()
+                  for score, count in by_score.items())
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def partition_path(date_str: str, store_dir: str = 'output/topic_cube', app: str = DEFAULT_APP) -> str:
+    """
+    Return the Parquet file holding one app's counts for one day.
+    """
+    return os.path.join(store_dir, f"app={app}", f"date={date_str}", "part-0.parquet")
+
+
+def index_path(store_dir: str = 'output/topic_cube', app: str = DEFAULT_APP) -> str:
+    """
+    Return the index file of one app's partitions.
+    """
+    return os.path.join(store_dir, f"app={app}", INDEX_NAME)
+
+
+def load_app_index(store_dir: str = 'output/topic_cube', app: str = DEFAULT_APP) -> dict[str, str]:
+    """
+    Load one app's index mapping each stored date to the digest of its counts.
+    """
+    try:
+        with open(index_path(store_dir, app), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def load_index(store_dir: str = 'output/topic_cube') -> dict[str, str]:
+    """
+    Load the cube index mapping each stored "app/date" to the digest of its counts.
+    """
+    index = {}
+    if not os.path.isdir(store_dir):
+        return index
+    for name in sorted(os.listdir(store_dir)):
+        if name.startswith("app="):
+            app = name[len("app="):]
+            index.update({f"{app}/{date_str}": digest for date_str, digest in load_app_index(store_dir, app).items()})
+    return index
+
+
+def upsert_day(date_str: str, score_counts: dict[str, dict], store_dir: str = 'output/topic_cube',
+               index: dict[str, str] | None = None, app: str = DEFAULT_APP) -> bool:
+    """
+    Write one day's topic x score counts to its own partition, replacing any previous version.
+
+    Args:
+        date_str: Date string in format YYYY-MM-DD
+        score_counts: Mapping of topic name to {score: count} for that day
+        store_dir: Root directory of the cube store (default: 'output/topic_cube')
+        index: Preloaded cube index, to avoid rereading it for every day
+        app: App the counts belong to (default: 'default')
+
+    Returns:
+        True if the partition was written, False if it was already up to date
+    """
+    key = f"{app}/{date_str}"
+    digest = cube_digest(score_counts)
+    if index is None:
+        index = load_index(store_dir)
+    path = partition_path(date_str, store_dir, app)
+    if index.get(key) == digest and os.path.exists(path):
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = sorted((topic, int(score), int(count)) for topic, by_score in score_counts.items()
+                  for score, count in by_score.items())
+    table = pa.table(
+        {
+            "topic": [row[0] for row in rows],
+            "score": [row[1] for row in rows],
+            "count": [row[2] for row in rows],
+        },
+        schema=PARTITION_SCHEMA
+    )
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+    with _index_lock:
+        stored = load_app_index(store_dir, app)
+        stored[date_str] = digest
+        app_index = index_path(store_dir, app)
+        tmp_index = f"{app_index}.tmp"
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(stored.items())), f, indent=2)
+        os.replace(tmp_index, app_index)
+    index[key] = digest
+    return True
+
+
+class TopicCube:
+    """
+    In-memory date x topic x score x app cube for repeated slice and roll-up queries.
+
+    The stored partitions are read once into a dense count array with a
+    running sum over dates, so the total over any date range is the
+    difference of two slices rather than a scan of the days in it.
+    `refresh()` reloads only when the store changed.
+    """
+
+    def __init__(self, store_dir: str = 'output/topic_cube'):
+        """
+        Initialize TopicCube and load the store.
+
+        Args:
+            store_dir: Root directory of the cube store (default: 'output/topic_cube')
+        """
+        self.store_dir = store_dir
+        self._index: dict[str, str] | None = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Reload the cube if partitions were written since it was loaded.
+
+        Returns:
+            True if the cube was reloaded
+        """
+        index = load_index(self.store_dir)
+        if index == self._index:
+            return False
+
+        stored = []
+        for key in sorted(index):
+            app, date_str = key.split("/", 1)
+            if os.path.exists(partition_path(date_str, self.store_dir, app)):
+                stored.append((app, date_str))
+        paths = [partition_path(date_str, self.store_dir, app) for app, date_str in stored]
+        if paths:
+            dataset = ds.dataset(paths, format="parquet", partitioning=PARTITIONING,
+                                 partition_base_dir=self.store_dir)
+            frame = dataset.to_table(columns=["app", "date", "topic", "score", "count"]).to_pandas()
+        else:
+            frame = pd.DataFrame({"app": [], "date": [], "topic": [], "score": [], "count": []})
+
+        # Every stored day gets a slot, even if it had no topics
+        self.dates = sorted({date_str for _, date_str in stored})
+        self.apps = sorted({app for app, _ in stored})
+        self.topics = sorted(frame["topic"].unique().tolist())
+        self.scores = sorted(int(s) for s in frame["score"].unique())
+
+        lookup = {name: {label: i for i, label in enumerate(getattr(self, f"{name}s"))} for name in DIMENSIONS}
+        self.counts = np.zeros((len(self.dates), len(self.topics), len(self.scores), len(self.apps)), dtype=np.int64)
+        if len(frame):
+            codes = tuple(frame[name].map(lookup[name]).to_numpy(dtype=np.int64) for name in DIMENSIONS)
+            np.add.at(self.counts, codes, frame["count"].to_numpy(dtype=np.int64))
+
+        # cumulative[i] = sum of the first i dates
+        self.cumulative = np.concatenate(
+            [np.zeros((1,) + self.counts.shape[1:], dtype=np.int64), np.cumsum(self.counts, axis=0)]
+        )
+        self._index = index
+        return True
+
+    def _date_bounds(self, start: str | None, end: str | None, last_days: int | None) -> tuple[int, int]:
+        if last_days is not None:
+            end = end or (self.dates[-1] if self.dates else None)
+            if end is not None:
+                start = (date.fromisoformat(end) - timedelta(days=last_days - 1)).isoformat()
+        low = 0 if start is None else int(np.searchsorted(self.dates, start, side="left"))
+        high = len(self.dates) if end is None else int(np.searchsorted(self.dates, end, side="right"))
+        return low, max(low, high)
+
+    @staticmethod
+    def _positions(labels: list, wanted) -> np.ndarray:
+        if wanted is None:
+            return np.arange(len(labels))
+        lookup = {label: i for i, label in enumerate(labels)}
+        return np.array([lookup[w] for w in wanted if w in lookup], dtype=np.int64)
+
+    def query(self, topics: list[str] | None = None, scores: list[int] | None = None,
+              apps: list[str] | None = None, start: str | None = None, end: str | None = None,
+              last_days: int | None = None, by: str | list[str] | None = None) -> int | pd.Series:
+        """
+        Sum counts over a slice of the cube, optionally grouped by some dimensions.
+
+        Args:
+            topics: Topics to include (default: all)
+            scores: Star ratings to include (default: all)
+            apps: Apps to include (default: all)
+            start: First date, inclusive (default: earliest stored date)
+            end: Last date, inclusive (default: latest stored date)
+            last_days: Calendar days ending at `end` (or the latest stored date); overrides `start`
+            by: Dimension or list of dimensions to group by, out of 'date', 'topic', 'score', 'app'
+
+        Returns:
+            The total count if `by` is None, otherwise a Series indexed by the grouping dimensions
+        """
+        group = [by] if isinstance(by, str) else list(by or [])
+        unknown = [name for name in group if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s) {unknown}; expected some of {DIMENSIONS}")
+
+        low, high = self._date_bounds(start, end, last_days)
+        selectors = [
+            self._positions(self.topics, topics),
+            self._positions(self.scores, scores),
+            self._positions(self.apps, apps),
+        ]
+        if "date" in group:
+            block = self.counts[low:high]
+            labels = {"date": self.dates[low:high]}
+        else:
+            # Range total from the running sum: two slices, whatever the range length
+            block = (self.cumulative[high] - self.cumulative[low])[np.newaxis]
+            labels = {}
+        block = block[np.ix_(np.arange(block.shape[0]), *selectors)]
+        labels.update({
+            "topic": [self.topics[i] for i in selectors[0]],
+            "score": [self.scores[i] for i in selectors[1]],
+            "app": [self.apps[i] for i in selectors[2]],
+        })
+
+        summed_axes = tuple(axis for axis, name in enumerate(DIMENSIONS) if name not in group)
+        totals = block.sum(axis=summed_axes)
+        if not group:
+            return int(totals)
+
+        # Reorder axes to the requested grouping order
+        kept = [name for name in DIMENSIONS if name in group]
+        totals = np.transpose(totals, [kept.index(name) for name in group])
+        index = pd.MultiIndex.from_product([labels[name] for name in group], names=group)
+        series = pd.Series(totals.ravel(), index=index, name="count")
+        if len(group) == 1:
+            series.index = series.index.get_level_values(0)
+        return series
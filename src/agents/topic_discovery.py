@@ -0,0 +1,301 @@
+import json
+import os
+from collections import Counter
+import numpy as np
+from src.agents.day_counts import load_unmatched
+from src.agents.topic_memory import TopicMemory
+from src.utils.metrics import metrics
+
+# Minimum cosine similarity between a phrase and its cluster (threshold clustering),
+# and between two k-means centroids for them to be merged
+CLUSTER_THRESHOLD = 0.75
+
+# Upper bound on k for mini-batch k-means when it is chosen automatically
+MAX_CLUSTERS = 1000
+
+# Phrases per k-means mini-batch and number of mini-batch steps
+KMEANS_BATCH_SIZE = 2048
+KMEANS_STEPS = 100
+
+# Phrases embedded, or compared against the centroids, per chunk
+CHUNK_SIZE = 50_000
+
+# A cluster is proposed only if its phrases were mentioned this often in total...
+MIN_MENTIONS = 5
+
+# ...and they are on average at least this similar to the cluster centre
+MIN_COHESION = 0.5
+
+# Example phrases listed per proposed topic
+EXAMPLES = 5
+
+
+def collect_unmatched(dates: list[str], counts_dir: str = 'data/counts') -> Counter:
+    """
+    Sum the unmatched phrase frequencies stored for several days.
+
+    Args:
+        dates: Date strings in format YYYY-MM-DD
+        counts_dir: Directory holding per-day count artifacts (default: 'data/counts')
+
+    Returns:
+        Counter mapping each unmatched phrase to its total frequency
+    """
+    phrases = Counter()
+    for date_str in dates:
+        phrases.update(load_unmatched(date_str, counts_dir))
+    return phrases
+
+
+def embed_phrases(memory: TopicMemory, phrases: list[str], chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """
+    Embed phrases chunk by chunk into a float16 matrix of unit-length rows.
+
+    Embeddings go through TopicMemory's memoized batch path; storing them as
+    float16 halves the memory of a million-phrase matrix.
+    """
+    dim = None
+    matrix = None
+    for start in range(0, len(phrases), chunk_size):
+        chunk = memory.get_embeddings(phrases[start:start + chunk_size])
+        if matrix is None:
+            dim = chunk.shape[1]
+            matrix = np.empty((len(phrases), dim), dtype=np.float16)
+        matrix[start:start + len(chunk)] = chunk
+    return matrix if matrix is not None else np.zeros((0, 0), dtype=np.float16)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = CHUNK_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Assign every row to its most similar centroid, a chunk of rows at a time.
+
+    Returns:
+        Tuple of (centroid index, cosine similarity) per row
+    """
+    labels = np.empty(len(vectors), dtype=np.int64)
+    similarities = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), chunk_size):
+        scores = vectors[start:start + chunk_size].astype(np.float32) @ centroids.T
+        labels[start:start + len(scores)] = np.argmax(scores, axis=1)
+        similarities[start:start + len(scores)] = scores[np.arange(len(scores)), labels[start:start + len(scores)]]
+    return labels, similarities
+
+
+def minibatch_kmeans(vectors: np.ndarray, n_clusters: int, weights: np.ndarray | None = None,
+                     batch_size: int = KMEANS_BATCH_SIZE, steps: int = KMEANS_STEPS,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Train spherical k-means centroids with mini-batch updates.
+
+    Each step assigns one random mini-batch to its nearest centroids and
+    moves every centroid towards the weighted mean of its batch members,
+    with a step size that shrinks as the centroid absorbs more weight, so
+    the cost is O(steps * batch_size * k) regardless of the number of rows.
+
+    Args:
+        vectors: Matrix with one unit-length row per phrase
+        n_clusters: Number of centroids
+        weights: Phrase frequencies (default: all 1)
+        batch_size: Rows per mini-batch (default: 2048)
+        steps: Number of mini-batch updates (default: 100)
+        seed: Random seed (default: 0)
+
+    Returns:
+        float32 matrix of unit-length centroids
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+    probabilities = weights / weights.sum()
+    n_clusters = min(n_clusters, n)
+
+    # Seed from distinct phrases, favouring frequent ones
+    seeds = rng.choice(n, n_clusters, replace=False, p=probabilities)
+    centroids = vectors[seeds].astype(np.float32)
+    absorbed = np.zeros(n_clusters)
+
+    for _ in range(steps):
+        batch = rng.choice(n, min(batch_size, n), replace=False)
+        batch_vectors = vectors[batch].astype(np.float32)
+        batch_weights = weights[batch]
+        labels = np.argmax(batch_vectors @ centroids.T, axis=1)
+
+        # Weighted member sums as one product with a (clusters x batch) membership matrix
+        membership = np.zeros((n_clusters, len(batch)), dtype=np.float32)
+        membership[labels, np.arange(len(batch))] = batch_weights
+        sums = membership @ batch_vectors
+        batch_totals = membership.sum(axis=1)
+        moved = batch_totals > 0
+
+        # Running weighted mean: centroid weight so far vs the batch's weight
+        total = absorbed[moved] + batch_totals[moved]
+        centroids[moved] = (centroids[moved] * (absorbed[moved] / total)[:, None]
+                            + sums[moved] / total[:, None])
+        absorbed[moved] = total
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def leader_clustering(vectors: np.ndarray, threshold: float = CLUSTER_THRESHOLD,
+                      chunk_size: int = 4096) -> np.ndarray:
+    """
+    Threshold-based incremental clustering.
+
+    Rows are visited in order (put the most frequent phrases first); a row
+    that is less than `threshold` similar to every leader so far becomes
+    a new leader. Each chunk is compared with all existing leaders in one
+    matrix product, so the cost is O(n * clusters) rather than O(n^2).
+    Rows are then assigned to their nearest leader with `assign`.
+
+    Args:
+        vectors: Matrix with one unit-length row per phrase
+        threshold: Minimum cosine similarity to a cluster's leader (default: 0.75)
+        chunk_size: Rows compared with the leaders per matrix product (default: 4096)
+
+    Returns:
+        Matrix of unit-length leader vectors
+    """
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+    leaders = np.zeros((0, dim), dtype=np.float32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size].astype(np.float32)
+        if len(leaders):
+            covered = (chunk @ leaders.T).max(axis=1) >= threshold
+        else:
+            covered = np.zeros(len(chunk), dtype=bool)
+
+        # Rows no existing leader covers are resolved in order against the chunk's new leaders
+        uncovered = np.flatnonzero(~covered)
+        new_leaders = np.empty((len(uncovered), dim), dtype=np.float32)
+        count = 0
+        for row in uncovered:
+            if count and (new_leaders[:count] @ chunk[row]).max() >= threshold:
+                continue
+            new_leaders[count] = chunk[row]
+            count += 1
+        if count:
+            leaders = np.vstack([leaders, new_leaders[:count]])
+    return leaders
+
+
+def discover_topics(phrases: dict[str, int], memory: TopicMemory, method: str = "kmeans",
+                    n_clusters: int | None = None, threshold: float = CLUSTER_THRESHOLD,
+                    min_mentions: int = MIN_MENTIONS, min_cohesion: float = MIN_COHESION,
+                    register: bool = False, seed: int = 0) -> list[dict]:
+    """
+    Cluster phrases that matched no topic and propose a topic per coherent cluster.
+
+    Phrases already close to a TopicMemory topic are set aside first. The
+    rest are embedded in batches and clustered without pairwise
+    comparison: mini-batch spherical k-means (centroids closer than
+    `threshold` are then merged), or threshold-based leader clustering.
+    Each cluster's representative is its phrase closest to the centroid.
+
+    Args:
+        phrases: Mapping of unmatched phrase to frequency (see collect_unmatched)
+        memory: TopicMemory used for embeddings, for matching known topics and for registration
+        method: "kmeans" (mini-batch k-means) or "threshold" (leader clustering) (default: "kmeans")
+        n_clusters: k for k-means (default: about sqrt(n / 2), at most 1000)
+        threshold: Leader similarity, or centroid merge similarity for k-means (default: 0.75)
+        min_mentions: Minimum total frequency of a proposed cluster (default: 5)
+        min_cohesion: Minimum mean similarity of a proposed cluster's phrases to its centre (default: 0.5)
+        register: Register the representatives as TopicMemory topics (default: False)
+        seed: Random seed for k-means (default: 0)
+
+    Returns:
+        Proposed topics, most mentioned first; each a dict with 'topic', 'mentions',
+        'phrases', 'cohesion', 'examples' and 'registered_as'
+    """
+    if method not in ("kmeans", "threshold"):
+        raise ValueError(f"Unknown clustering method: {method}")
+
+    # Most frequent first, so leaders and representatives favour common wordings
+    texts = sorted((p for p in phrases if p), key=lambda p: (-phrases[p], p))
+    if not texts:
+        return []
+    weights = np.array([phrases[p] for p in texts], dtype=float)
+
+    with metrics.timer("discovery.embed"):
+        vectors = embed_phrases(memory, texts)
+    metrics.incr("discovery.embed.items", len(texts))
+
+    # Set aside phrases an existing memory topic already covers
+    known = np.zeros(len(texts), dtype=bool)
+    for start in range(0, len(texts), CHUNK_SIZE):
+        matches = memory.match_embeddings(vectors[start:start + CHUNK_SIZE].astype(np.float32))
+        known[start:start + len(matches)] = [match is not None for match in matches]
+    if known.any():
+        print(f"Discovery: {int(known.sum())} of {len(texts)} phrases already match a memory topic")
+        texts = [text for text, is_known in zip(texts, known) if not is_known]
+        vectors = vectors[~known]
+        weights = weights[~known]
+    if not texts:
+        return []
+
+    with metrics.timer("discovery.cluster"):
+        if method == "kmeans":
+            k = n_clusters or min(MAX_CLUSTERS, max(1, int(np.sqrt(len(texts) / 2))))
+            centroids = minibatch_kmeans(vectors, k, weights, seed=seed)
+            # Near-duplicate centroids describe the same topic
+            centroids = leader_clustering(centroids, threshold)
+        else:
+            centroids = leader_clustering(vectors, threshold)
+        labels, similarities = assign(vectors, centroids)
+    metrics.incr("discovery.cluster.items", len(texts))
+
+    # Per-cluster size and frequency-weighted cohesion
+    n_clusters = len(centroids)
+    mentions = np.bincount(labels, weights=weights, minlength=n_clusters)
+    sizes = np.bincount(labels, minlength=n_clusters)
+    cohesion = np.bincount(labels, weights=weights * similarities, minlength=n_clusters) / np.maximum(mentions, 1)
+
+    # Representative: the member closest to the centroid (ties go to the more frequent phrase)
+    order = np.lexsort((np.arange(len(texts)), -similarities, labels))
+    first = np.searchsorted(labels[order], np.arange(n_clusters))
+
+    # Members by frequency (texts are already sorted that way), for examples
+    members: dict[int, list[str]] = {}
+    for text, label in zip(texts, labels):
+        bucket = members.setdefault(int(label), [])
+        if len(bucket) < EXAMPLES:
+            bucket.append(text)
+
+    proposals = []
+    for cluster in np.argsort(-mentions):
+        if sizes[cluster] == 0 or mentions[cluster] < min_mentions or cohesion[cluster] < min_cohesion:
+            continue
+        proposals.append({
+            "topic": texts[order[first[cluster]]],
+            "mentions": int(mentions[cluster]),
+            "phrases": int(sizes[cluster]),
+            "cohesion": round(float(cohesion[cluster]), 4),
+            "examples": members[int(cluster)],
+            "registered_as": None,
+        })
+
+    if register and proposals:
+        registered = memory.register_topics([proposal["topic"] for proposal in proposals])
+        for proposal, name in zip(proposals, registered):
+            proposal["registered_as"] = name
+
+    print(f"Discovery: {len(texts)} phrases in {n_clusters} clusters, {len(proposals)} topics proposed")
+    return proposals
+
+
+def save_proposals(proposals: list[dict], output_path: str = 'output/reports/topic_proposals.json') -> None:
+    """
+    Save proposed topics as JSON for review.
+
+    Args:
+        proposals: Output of discover_topics
+        output_path: Path where the JSON file will be saved (default: 'output/reports/topic_proposals.json')
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(proposals, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,355 @@
+import hashlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+import numpy as np
+
+# IVF defaults: below MIN_TRAIN_SIZE vectors an exhaustive scan is faster than probing lists
+MIN_TRAIN_SIZE = 1024
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 50_000
+
+# HNSW search breadth for the chromadb backend (higher = better recall, slower queries)
+DEFAULT_SEARCH_EF = 64
+
+
+class VectorIndex(ABC):
+    """
+    Base class for nearest-neighbour indexes over normalized float32 embeddings.
+
+    Row ids are positions in insertion order, matching TopicMemory.topic_names.
+    """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def build(self, vectors: np.ndarray) -> None:
+        """
+        Replace the index contents with the given normalized vectors.
+        """
+
+    @abstractmethod
+    def add(self, vector: np.ndarray) -> None:
+        """
+        Append one normalized vector; its id is the previous length of the index.
+        """
+
+    @abstractmethod
+    def update(self, row: int, vector: np.ndarray) -> None:
+        """
+        Overwrite the vector stored at `row`.
+        """
+
+    @abstractmethod
+    def search(self, queries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the most similar stored vector for each query.
+
+        Args:
+            queries: float32 matrix with one unit-length row per query
+
+        Returns:
+            Tuple of (row ids, cosine similarities), one entry per query; id -1 if the index is empty
+        """
+
+
+class ExactIndex(VectorIndex):
+    """
+    Exhaustive search: one matrix product against every stored vector.
+
+    The matrix has spare capacity and grows geometrically, so adding a
+    vector is amortized O(dim).
+    """
+
+    def __init__(self):
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Stored vectors, one row per id.
+        """
+        return self._matrix[:self._count]
+
+    def build(self, vectors: np.ndarray) -> None:
+        self._matrix = np.array(vectors, dtype=np.float32)
+        self._count = len(self._matrix)
+
+    def add(self, vector: np.ndarray) -> None:
+        if self._count == 0 or self._matrix.shape[1] != vector.shape[0]:
+            self._matrix = np.zeros((16, vector.shape[0]), dtype=np.float32)
+        elif self._count == self._matrix.shape[0]:
+            grown = np.zeros((self._count * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._count] = self._matrix[:self._count]
+            self._matrix = grown
+        self._matrix[self._count] = vector
+        self._count += 1
+
+    def update(self, row: int, vector: np.ndarray) -> None:
+        self._matrix[row] = vector
+
+    def search(self, queries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self._count == 0:
+            return np.full(len(queries), -1), np.zeros(len(queries), dtype=np.float32)
+
+        # (vectors x dim) @ (dim x queries) -> cosine similarity of every pair
+        similarities = self.matrix @ queries.T
+        best = np.argmax(similarities, axis=0)
+        return best, similarities[best, np.arange(len(queries))]
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index: vectors are bucketed by their nearest k-means centroid
+    and a query only scans the `nprobe` most similar buckets.
+
+    `nprobe` is the recall-vs-latency knob: nprobe = nlist is an exact
+    search, small values scan a fraction of the vectors. New vectors are
+    assigned to their nearest bucket on insert; centroids are retrained once
+    the index has grown to `retrain_factor` times its size at the last
+    training. Small indexes (below `min_train_size`) are scanned exhaustively.
+    """
+
+    def __init__(self, nlist: int | None = None, nprobe: int = DEFAULT_NPROBE,
+                 min_train_size: int = MIN_TRAIN_SIZE, retrain_factor: float = 4.0, seed: int = 0):
+        """
+        Initialize IVFIndex.
+
+        Args:
+            nlist: Number of buckets (default: sqrt of the index size at training time)
+            nprobe: Number of buckets scanned per query (default: 8)
+            min_train_size: Minimum number of vectors before buckets are trained (default: 1024)
+            retrain_factor: Growth factor that triggers retraining (default: 4.0)
+            seed: Seed for centroid initialization
+        """
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self._random = np.random.default_rng(seed)
+
+        self.centroids: np.ndarray | None = None
+        self._lists: list[list[int]] = []
+        self._list_arrays: list[np.ndarray | None] = []
+        self._trained_size = 0
+
+    def build(self, vectors: np.ndarray) -> None:
+        super().build(vectors)
+        self.centroids = None
+        self._maybe_train()
+
+    def add(self, vector: np.ndarray) -> None:
+        super().add(vector)
+        if self.centroids is None or self._count >= self._trained_size * self.retrain_factor:
+            self._maybe_train()
+            return
+
+        # Incremental insert: put the new vector in its nearest bucket
+        bucket = int(np.argmax(self.centroids @ vector))
+        self._lists[bucket].append(self._count - 1)
+        self._list_arrays[bucket] = None
+
+    def update(self, row: int, vector: np.ndarray) -> None:
+        super().update(row, vector)
+        if self.centroids is not None:
+            for bucket, ids in enumerate(self._lists):
+                if row in ids:
+                    ids.remove(row)
+                    self._list_arrays[bucket] = None
+            bucket = int(np.argmax(self.centroids @ vector))
+            self._lists[bucket].append(row)
+            self._list_arrays[bucket] = None
+
+    def _maybe_train(self) -> None:
+        """
+        Train centroids with spherical k-means and assign every vector to a bucket.
+        """
+        if self._count < self.min_train_size:
+            return
+
+        vectors = self.matrix
+        nlist = self.nlist or max(1, int(np.sqrt(self._count)))
+        nlist = min(nlist, self._count)
+
+        # Train on a sample; assignment below still covers every vector
+        if self._count > KMEANS_SAMPLE_SIZE:
+            sample = vectors[self._random.choice(self._count, KMEANS_SAMPLE_SIZE, replace=False)]
+        else:
+            sample = vectors
+        centroids = sample[self._random.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+
+            # Reseed empty buckets from random sample points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[self._random.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        self._lists = [[] for _ in range(nlist)]
+        for row, bucket in enumerate(assignment):
+            self._lists[bucket].append(row)
+        self._list_arrays = [None] * nlist
+        self._trained_size = self._count
+
+    def _bucket(self, bucket: int) -> np.ndarray:
+        if self._list_arrays[bucket] is None:
+            self._list_arrays[bucket] = np.asarray(self._lists[bucket], dtype=np.int64)
+        return self._list_arrays[bucket]
+
+    def search(self, queries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self.centroids is None or self.nprobe >= len(self.centroids):
+            return super().search(queries)
+
+        ids = np.full(len(queries), -1)
+        scores = np.zeros(len(queries), dtype=np.float32)
+
+        # Pick the nprobe closest buckets for every query at once
+        centroid_sims = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_sims, self.nprobe - 1, axis=1)[:, :self.nprobe]
+
+        matrix = self.matrix
+        for q, buckets in enumerate(probes):
+            candidates = np.concatenate([self._bucket(b) for b in buckets])
+            if len(candidates) == 0:
+                continue
+            similarities = matrix[candidates] @ queries[q]
+            best = int(np.argmax(similarities))
+            ids[q] = candidates[best]
+            scores[q] = similarities[best]
+
+        return ids, scores
+
+
+class ChromaIndex(VectorIndex):
+    """
+    Approximate search backed by a local, persistent chromadb (HNSW) collection.
+
+    The collection persists across runs. Each entry's id is its row plus a
+    digest of its vector ("<row>:<digest>"), so on build only rows whose
+    vector is missing or changed are written and stale entries are deleted.
+    `search_ef` is the recall-vs-latency knob and is applied to existing
+    collections as well.
+    """
+
+    def __init__(self, path: str | Path = "chroma_topics", collection: str = "topics",
+                 search_ef: int = DEFAULT_SEARCH_EF):
+        """
+        Initialize ChromaIndex.
+
+        Args:
+            path: Directory of the persistent chromadb database (default: "chroma_topics")
+            collection: Collection name (default: "topics")
+            search_ef: HNSW candidate list size at query time (default: 64)
+        """
+        try:
+            import chromadb
+        except ImportError as e:
+            raise ImportError("The chroma index backend requires chromadb (pip install chromadb)") from e
+
+        self.client = chromadb.PersistentClient(path=str(path))
+        self.collection = self.client.get_or_create_collection(
+            name=collection,
+            metadata={"hnsw:space": "cosine", "hnsw:search_ef": search_ef}
+        )
+        # Creation metadata is ignored for a collection that already exists
+        hnsw = (getattr(self.collection, "configuration", None) or {}).get("hnsw") or {}
+        if hnsw.get("ef_search") != search_ef:
+            self.collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+
+        # Current entry id per row
+        self._ids: list[str] = []
+        for entry_id in self.collection.get(include=[])["ids"]:
+            row = self._row(entry_id)
+            if row >= len(self._ids):
+                self._ids.extend([""] * (row + 1 - len(self._ids)))
+            self._ids[row] = entry_id
+
+    @staticmethod
+    def _entry_id(row: int, vector: np.ndarray) -> str:
+        digest = hashlib.blake2b(np.asarray(vector, dtype='<f4').tobytes(), digest_size=8).hexdigest()
+        return f"{row}:{digest}"
+
+    @staticmethod
+    def _row(entry_id: str) -> int:
+        return int(entry_id.split(":", 1)[0])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def build(self, vectors: np.ndarray) -> None:
+        # Entries whose row and vector are unchanged are kept; everything else is replaced
+        vectors = np.asarray(vectors, dtype=np.float32)
+        wanted = [self._entry_id(row, vector) for row, vector in enumerate(vectors)]
+        existing = set(self.collection.get(include=[])["ids"])
+        stale = sorted(existing.difference(wanted))
+        for start in range(0, len(stale), 1000):
+            self.collection.delete(ids=stale[start:start + 1000])
+
+        missing = [row for row, entry_id in enumerate(wanted) if entry_id not in existing]
+        for start in range(0, len(missing), 1000):
+            rows = missing[start:start + 1000]
+            self.collection.add(ids=[wanted[row] for row in rows], embeddings=vectors[rows].tolist())
+        self._ids = wanted
+
+    def add(self, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        entry_id = self._entry_id(len(self._ids), vector)
+        self.collection.add(ids=[entry_id], embeddings=[vector.tolist()])
+        self._ids.append(entry_id)
+
+    def update(self, row: int, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        entry_id = self._entry_id(row, vector)
+        if self._ids[row] != entry_id:
+            self.collection.delete(ids=[self._ids[row]])
+            self.collection.add(ids=[entry_id], embeddings=[vector.tolist()])
+            self._ids[row] = entry_id
+
+    def search(self, queries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if not self._ids:
+            return np.full(len(queries), -1), np.zeros(len(queries), dtype=np.float32)
+
+        result = self.collection.query(query_embeddings=queries.tolist(), n_results=1)
+        ids = np.array([self._row(row[0]) if row else -1 for row in result["ids"]])
+        # chromadb returns cosine distance = 1 - cosine similarity
+        scores = np.array([1.0 - row[0] if row else 0.0 for row in result["distances"]], dtype=np.float32)
+        return ids, scores
+
+
+INDEX_BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+    "chroma": ChromaIndex,
+}
+
+
+def create_index(kind: str = "exact", **options) -> VectorIndex:
+    """
+    Create an index backend by name.
+
+    Args:
+        kind: One of "exact", "ivf" or "chroma"
+        **options: Backend-specific options (e.g. nprobe for "ivf", search_ef for "chroma")
+
+    Returns:
+        VectorIndex instance
+    """
+    if kind not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend '{kind}', expected one of {sorted(INDEX_BACKENDS)}")
+    return INDEX_BACKENDS[kind](**options)
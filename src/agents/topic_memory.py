@@ -1,62 +1,211 @@
 import json
-import os
+import weakref
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
 from pathlib import Path
 
+from src.agents.topic_store import TopicStore, FLUSH_EVERY
+from src.agents.topic_index import create_index
+from src.utils.embedding_cache import EmbeddingCache
+from src.utils.metrics import metrics
+
+# SentenceTransformer model used for topic embeddings
+EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Texts per model.encode call
+EMBED_BATCH_SIZE = 64
+
+# Embeddings kept in the in-memory LRU in front of the on-disk cache
+EMBEDDING_LRU_SIZE = 10_000
+
 
 class TopicMemory:
     """
     Manages topic embeddings and maps raw extracted topic phrases to stable topic names.
+    
+    Embeddings are persisted in a binary, append-only TopicStore next to
+    `memory_path`. A legacy JSON memory file at `memory_path` is migrated
+    to the binary store the first time it is opened. Nearest-topic search
+    goes through a pluggable index backend (see topic_index.py).
     """
     
-    def __init__(self, memory_path: str = "topic_memory.json"):
+    def __init__(self, memory_path: str = "topic_memory.json", flush_every: int = FLUSH_EVERY,
+                 index: str = "exact", embedding_cache_path: str | None = "cache/embedding_cache.sqlite",
+                 batch_size: int = EMBED_BATCH_SIZE, lru_size: int = EMBEDDING_LRU_SIZE, **index_options):
         """
         Initialize TopicMemory.
         
         Args:
-            memory_path: Path to the JSON file storing topic embeddings (default: "topic_memory.json")
+            memory_path: Path of the topic memory; the binary store files share its stem
+                (default: "topic_memory.json")
+            flush_every: Number of new topics buffered before they are written to disk (default: 64)
+            index: Search backend: "exact" (exhaustive), "ivf" (built-in approximate index)
+                or "chroma" (persistent chromadb HNSW) (default: "exact")
+            embedding_cache_path: Path of the on-disk embedding cache, or None to disable it
+                (default: "cache/embedding_cache.sqlite")
+            batch_size: Texts per model.encode call (default: 64)
+            lru_size: Embeddings kept in memory in front of the on-disk cache (default: 10000)
+            **index_options: Backend options, e.g. nprobe for "ivf" or search_ef for "chroma"
         """
         # Get project root (assuming this is run from project root)
         project_root = Path(__file__).parent.parent.parent
         self.memory_path = project_root / memory_path
-        self.memory = {}
+        self.store = TopicStore(self.memory_path.with_suffix(""), flush_every)
+        
+        # Name index plus a search index over pre-normalized float32 embeddings.
+        # The search index is built lazily from the memory-mapped store on first search.
+        self.topic_names: list[str] = []
+        self.topic_index: dict[str, int] = {}
+        if index == "chroma" and "path" not in index_options:
+            index_options["path"] = self.memory_path.with_name(self.memory_path.stem + ".chroma")
+        self.index = create_index(index, **index_options)
+        self._index_built = False
+        
+        # SentenceTransformer model, loaded on first embedding (see `model`)
+        self._model = None
         
-        # Initialize SentenceTransformer model
-        self.model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+        # Embedding memoization: in-memory LRU, then the persistent cache, then the model
+        self.batch_size = batch_size
+        self.lru_size = lru_size
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.embedding_cache = EmbeddingCache(str(project_root / embedding_cache_path)) if embedding_cache_path else None
+        self.encoded = 0
         
-        # Load existing memory if file exists
-        if self.memory_path.exists():
+        # Load existing memory, migrating the legacy JSON file once if needed
+        if self.store.exists():
             self.load_memory()
+        elif self.memory_path.suffix == ".json" and self.memory_path.exists():
+            self.migrate_json()
+        
+        # Write-behind: buffered topics reach disk on flush() or close(), when the memory is
+        # collected or when the interpreter exits; the finalizer holds the store, not this instance
+        self._finalizer = weakref.finalize(self, self.store.flush)
+    
+    def close(self) -> None:
+        """
+        Flush buffered topics and detach the exit-time flush.
+        """
+        self._finalizer()
     
-    def load_memory(self) -> dict:
+    @property
+    def model(self):
         """
-        Load topic embeddings from JSON file.
+        SentenceTransformer model, imported and loaded on first use.
+        
+        Importing sentence_transformers pulls in torch, so it is deferred
+        until a topic actually has to be embedded.
+        """
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(EMBEDDING_MODEL)
+        return self._model
+    
+    def load_memory(self) -> list[str]:
+        """
+        Load topic names and memory-map topic embeddings from the binary store.
         
         Returns:
-            Dictionary mapping topic names to embedding vectors
+            List of stored topic names
+        """
+        self.store.load()
+        self.topic_names = list(self.store.names)
+        self.topic_index = {name: i for i, name in enumerate(self.topic_names)}
+        self._index_built = False
+        return self.topic_names
+    
+    def migrate_json(self) -> None:
+        """
+        Convert the legacy JSON memory file at `memory_path` into the binary store.
         """
         try:
             with open(self.memory_path, 'r', encoding='utf-8') as f:
-                self.memory = json.load(f)
-            return self.memory
+                memory = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
-            self.memory = {}
-            return self.memory
+            memory = {}
+        if not memory:
+            return
+        
+        self.store.write_all(list(memory.keys()), self.normalize(np.asarray(list(memory.values()), dtype=np.float32)))
+        print(f"Migrated {len(memory)} topics from {self.memory_path} to {self.store.vectors_path}")
+        self.load_memory()
     
-    def save_memory(self) -> None:
+    @property
+    def memory(self) -> dict[str, list[float]]:
+        """
+        Dictionary mapping topic names to (normalized) embedding vectors.
+        """
+        return {name: row.tolist() for name, row in zip(self.topic_names, self.embedding_matrix)}
+    
+    def _ensure_index(self) -> None:
+        """
+        Build the search index from the memory-mapped store on first use.
         """
-        Save topic embeddings to JSON file.
+        if not self._index_built:
+            self.index.build(np.asarray(self.store.vectors, dtype=np.float32))
+            self._index_built = True
+    
+    def _add_to_index(self, topic_name: str, embedding: np.ndarray) -> None:
         """
-        # Create parent directory if it doesn't exist
-        self.memory_path.parent.mkdir(parents=True, exist_ok=True)
+        Add one normalized embedding to the search index (or replace an existing topic's).
+        """
+        self._ensure_index()
+        if topic_name in self.topic_index:
+            self.index.update(self.topic_index[topic_name], embedding)
+            return
+        
+        self.index.add(embedding)
+        self.topic_index[topic_name] = len(self.topic_names)
+        self.topic_names.append(topic_name)
+    
+    @property
+    def embedding_matrix(self) -> np.ndarray:
+        """
+        Normalized float32 embedding matrix with one row per topic, aligned with `topic_names`.
         
-        with open(self.memory_path, 'w', encoding='utf-8') as f:
-            json.dump(self.memory, f, indent=2, ensure_ascii=False)
+        Reading it never writes to disk; buffered topics are included.
+        """
+        self._ensure_index()
+        if hasattr(self.index, "matrix"):
+            return self.index.matrix
+        vectors = np.asarray(self.store.vectors, dtype=np.float32)
+        if self.store.has_pending:
+            vectors = np.concatenate([vectors.reshape(-1, self.store.dim),
+                                      np.asarray(self.store.pending_vectors, dtype=np.float32)])
+        return vectors
+    
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Scale each row of a matrix to unit length; zero rows stay zero.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def flush(self) -> None:
+        """
+        Write buffered topics to the binary store and pick up topics other writers added.
+        """
+        self.store.flush()
+        self._sync_with_store()
+    
+    def save_memory(self) -> None:
+        """
+        Flush buffered topics to the binary store (original name of `flush`).
+        """
+        self.flush()
+    
+    def _sync_with_store(self) -> None:
+        """
+        Reload names and index if a flush picked up topics written by another memory or process.
+        """
+        if self.store.external_rows and not self.store.has_pending:
+            self.load_memory()
     
     def get_embedding(self, text: str) -> list[float]:
         """
-        Get embedding vector for a text using SentenceTransformers.
+        Get the (normalized) embedding vector for a text using SentenceTransformers.
         
         Args:
             text: Input text to embed
@@ -65,13 +214,75 @@ class TopicMemory:
             List of floats representing the embedding vector
         """
         try:
-            # Encode text and convert to list
-            embedding = self.model.encode([text])[0]
-            return embedding.tolist()
+            return self.get_embeddings([text])[0].tolist()
         except Exception as e:
             print(f"Error getting embedding: {e}")
             return []
     
+    def get_embeddings(self, texts: list[str], batch_size: int | None = None) -> np.ndarray:
+        """
+        Embed several texts, encoding each distinct uncached text once.
+        
+        Lookups go through an in-memory LRU, then the on-disk embedding cache
+        (keyed by model name and text); only the remaining texts are encoded,
+        in batches of `batch_size`.
+        
+        Args:
+            texts: Input texts to embed
+            batch_size: Texts per model.encode call (default: the memory's batch_size)
+        
+        Returns:
+            float32 matrix with one unit-length row per text
+        """
+        texts = list(texts)
+        unique_texts = list(dict.fromkeys(texts))
+        found: dict[str, np.ndarray] = {}
+        
+        # In-memory LRU
+        for text in unique_texts:
+            vector = self._lru.get(text)
+            if vector is not None:
+                self._lru.move_to_end(text)
+                found[text] = vector
+        
+        # Persistent cache
+        missing = [text for text in unique_texts if text not in found]
+        if missing and self.embedding_cache is not None:
+            for text, vector in zip(missing, self.embedding_cache.get_many(missing, EMBEDDING_MODEL)):
+                if vector is not None:
+                    found[text] = vector
+                    self._remember(text, vector)
+            missing = [text for text in missing if text not in found]
+        
+        # Model, in batches
+        if missing:
+            with metrics.timer("embedding.encode"):
+                encoded = self.model.encode(missing, batch_size=batch_size or self.batch_size, convert_to_numpy=True)
+            metrics.incr("embedding.encode.items", len(missing))
+            encoded = self.normalize(encoded)
+            self.encoded += len(missing)
+            new_vectors = dict(zip(missing, encoded))
+            found.update(new_vectors)
+            for text, vector in new_vectors.items():
+                self._remember(text, vector)
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(new_vectors, EMBEDDING_MODEL)
+        
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[text] for text in texts]).astype(np.float32, copy=False)
+    
+    def _remember(self, text: str, vector: np.ndarray) -> None:
+        """
+        Put an embedding in the in-memory LRU, evicting the oldest entry when full.
+        """
+        if self.lru_size <= 0:
+            return
+        self._lru[text] = vector
+        self._lru.move_to_end(text)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+    
     def cosine_similarity(self, vec1: list[float], vec2: list[float]) -> float:
         """
         Compute cosine similarity between two vectors.
@@ -106,29 +317,54 @@ class TopicMemory:
         Returns:
             Existing topic name if similarity >= threshold, else None
         """
-        if not self.memory:
-            return None
+        return self.find_closest_topics([new_topic], threshold)[0]
+    
+    def find_closest_topics(self, new_topics: list[str], threshold: float = 0.85) -> list[str | None]:
+        """
+        Find the closest existing topic for each of several topic phrases.
         
-        # Get embedding for new topic
-        new_embedding = self.get_embedding(new_topic)
-        if not new_embedding:
-            return None
+        All phrases are embedded in one model call and matched in one index
+        search (a single matrix product for the exact backend).
+        
+        Args:
+            new_topics: Topic phrases to match
+            threshold: Minimum cosine similarity threshold (default: 0.85)
+        
+        Returns:
+            List aligned with `new_topics`; existing topic name if similarity >= threshold, else None
+        """
+        if not self.topic_names or not new_topics:
+            return [None] * len(new_topics)
+        
+        try:
+            queries = self.get_embeddings(new_topics)
+        except Exception as e:
+            print(f"Error getting embedding: {e}")
+            return [None] * len(new_topics)
+        
+        return self.match_embeddings(queries, threshold)
+    
+    def match_embeddings(self, queries: np.ndarray, threshold: float = 0.85) -> list[str | None]:
+        """
+        Match normalized query embeddings against stored topics using the search index.
         
-        # Find maximum similarity with existing topics
-        max_similarity = 0.0
-        closest_topic = None
+        Args:
+            queries: float32 matrix with one unit-length row per query
+            threshold: Minimum cosine similarity threshold (default: 0.85)
         
-        for topic_name, stored_embedding in self.memory.items():
-            similarity = self.cosine_similarity(new_embedding, stored_embedding)
-            if similarity > max_similarity:
-                max_similarity = similarity
-                closest_topic = topic_name
+        Returns:
+            List aligned with the query rows; existing topic name if similarity >= threshold, else None
+        """
+        if not self.topic_names or len(queries) == 0:
+            return [None] * len(queries)
         
-        # Return closest topic if similarity meets threshold
-        if max_similarity >= threshold:
-            return closest_topic
+        self._ensure_index()
+        best, best_scores = self.index.search(queries)
         
-        return None
+        return [
+            self.topic_names[idx] if idx >= 0 and score >= threshold else None
+            for idx, score in zip(best, best_scores)
+        ]
     
     def register_topic(self, new_topic: str) -> str:
         """
@@ -140,16 +376,78 @@ class TopicMemory:
         Returns:
             Existing topic name if similar topic found, else the new topic name
         """
+        # Embed once and reuse the vector for both matching and registration
+        embedding = self.get_embedding(new_topic)
+        if not embedding:
+            return new_topic
+        query = self.normalize(np.asarray([embedding], dtype=np.float32))
+        
         # Check if similar topic already exists
-        existing_topic = self.find_closest_topic(new_topic)
+        existing_topic = self.match_embeddings(query)[0]
         
         if existing_topic:
             return existing_topic
         
-        # Register new topic
-        embedding = self.get_embedding(new_topic)
-        if embedding:
-            self.memory[new_topic] = embedding
-            self.save_memory()
+        # Register new topic; the store appends it on its next flush
+        self._add_to_index(new_topic, query[0])
+        self.store.append(new_topic, query[0])
+        self._sync_with_store()
         
         return new_topic
+    
+    def register_topics(self, new_topics: list[str], threshold: float = 0.85) -> list[str]:
+        """
+        Register several topics, returning the existing similar topic for each where there is one.
+        
+        Equivalent to calling `register_topic` on each phrase in order (a
+        phrase can match a topic registered earlier in the same batch), but
+        all phrases are embedded together and matched against stored topics
+        in one index search.
+        
+        Args:
+            new_topics: New topic phrases to register
+            threshold: Minimum cosine similarity threshold (default: 0.85)
+        
+        Returns:
+            List aligned with `new_topics`; existing topic name if a similar topic was found, else the new topic name
+        """
+        if not new_topics:
+            return []
+        try:
+            queries = self.get_embeddings(new_topics)
+        except Exception as e:
+            print(f"Error getting embedding: {e}")
+            return list(new_topics)
+        
+        # One search against the topics stored before this batch
+        if self.topic_names:
+            self._ensure_index()
+            best, best_scores = self.index.search(queries)
+        else:
+            best = np.full(len(new_topics), -1)
+            best_scores = np.full(len(new_topics), -np.inf)
+        
+        # Then resolve in order, also comparing against topics added earlier in the batch
+        added_names: list[str] = []
+        added_vectors: list[np.ndarray] = []
+        results = []
+        for phrase, query, idx, score in zip(new_topics, queries, best, best_scores):
+            match = self.topic_names[idx] if idx >= 0 and score >= threshold else None
+            if added_vectors:
+                added_scores = np.stack(added_vectors) @ query
+                j = int(np.argmax(added_scores))
+                if added_scores[j] >= threshold and (match is None or added_scores[j] > score):
+                    match = added_names[j]
+            if match is not None:
+                results.append(match)
+                continue
+            
+            # Register new topic; the store appends it on its next flush
+            self._add_to_index(phrase, query)
+            self.store.append(phrase, query)
+            added_names.append(phrase)
+            added_vectors.append(query)
+            results.append(phrase)
+        
+        self._sync_with_store()
+        return results
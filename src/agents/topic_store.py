@@ -0,0 +1,237 @@
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STORE_VERSION = 1
+
+# Number of pending topics buffered in memory before they are appended to disk
+FLUSH_EVERY = 64
+
+
+class TopicStore:
+    """
+    Compact, append-only on-disk store for topic embeddings.
+
+    The store consists of three files next to each other:
+        <stem>.vectors.f16  raw little-endian float16 rows, memory-mapped on load
+        <stem>.names.jsonl  one JSON-encoded topic name per line, aligned with the rows
+        <stem>.meta.json    embedding dimension and format version
+
+    New topics are buffered and appended in batches (write-behind), so the
+    cost of a registration does not depend on the size of the store.
+    Vectors are written before names, and on load only rows that have both
+    are used, so a crash mid-flush never yields a misaligned store.
+
+    Flushes hold an exclusive lock on <stem>.lock. Rows that other
+    instances or processes appended in the meantime are read and kept
+    (see `external_rows`), and new rows are appended after them.
+    """
+
+    def __init__(self, base_path: str | Path, flush_every: int = FLUSH_EVERY):
+        """
+        Initialize TopicStore.
+
+        Args:
+            base_path: Path prefix of the store files (e.g. project_root / "topic_memory")
+            flush_every: Number of buffered topics that triggers a flush (default: 64)
+        """
+        base_path = Path(base_path)
+        self.vectors_path = base_path.with_name(base_path.name + ".vectors.f16")
+        self.names_path = base_path.with_name(base_path.name + ".names.jsonl")
+        self.meta_path = base_path.with_name(base_path.name + ".meta.json")
+        self.lock_path = base_path.with_name(base_path.name + ".lock")
+        self.flush_every = flush_every
+
+        self.dim: int | None = None
+        self.names: list[str] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float16)
+        self._pending_names: list[str] = []
+        self._pending_vectors: list[np.ndarray] = []
+        self._names_size = 0
+
+        # Rows appended by other writers that flushes picked up since the last load
+        self.external_rows = 0
+
+    @property
+    def has_pending(self) -> bool:
+        """
+        Whether topics are buffered but not yet written.
+        """
+        return bool(self._pending_names)
+
+    @property
+    def pending_vectors(self) -> list[np.ndarray]:
+        """
+        Buffered vectors not yet written, in the order they will be appended.
+        """
+        return self._pending_vectors
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the store's exclusive write lock, shared with other processes.
+        """
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_names(self, vector_rows: int) -> tuple[list[str], int]:
+        """
+        Read the complete name lines after the ones already loaded, up to `vector_rows` rows in total.
+
+        Returns:
+            Tuple of (new names, size in bytes of the names file covered by all loaded names)
+        """
+        names = []
+        size = self._names_size
+        if not self.names_path.exists():
+            return names, size
+        with open(self.names_path, 'rb') as f:
+            f.seek(self._names_size)
+            for line in f:
+                if len(self.names) + len(names) >= vector_rows or not line.endswith(b"\n"):
+                    break
+                names.append(json.loads(line))
+                size += len(line)
+        return names, size
+
+    def exists(self) -> bool:
+        """
+        Check whether the store files are present on disk.
+        """
+        return self.meta_path.exists() and self.names_path.exists()
+
+    def load(self) -> None:
+        """
+        Load the store, memory-mapping the vector file without copying it.
+        """
+        self.names = []
+        self.vectors = np.zeros((0, 0), dtype=np.float16)
+        self._pending_names = []
+        self._pending_vectors = []
+        self._names_size = 0
+        self.external_rows = 0
+        if not self.exists():
+            return
+
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+
+        row_bytes = self.dim * 2
+        vector_rows = os.path.getsize(self.vectors_path) // row_bytes if self.vectors_path.exists() else 0
+
+        # Read complete name lines only, up to the number of stored vectors
+        self.names, self._names_size = self._read_names(vector_rows)
+
+        rows = len(self.names)
+        if rows:
+            self.vectors = np.memmap(self.vectors_path, dtype='<f2', mode='r', shape=(rows, self.dim))
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float16)
+
+    def append(self, name: str, vector: np.ndarray) -> None:
+        """
+        Buffer one topic for writing, flushing when enough topics are pending.
+
+        Args:
+            name: Topic name
+            vector: Normalized embedding vector
+        """
+        vector = np.asarray(vector, dtype='<f2')
+        if self.dim is None:
+            self.dim = vector.shape[0]
+        self._pending_names.append(name)
+        self._pending_vectors.append(vector)
+        if len(self._pending_names) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Append all buffered topics to disk, after any rows other writers appended.
+        """
+        if not self._pending_names:
+            return
+
+        self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            if not self.meta_path.exists():
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({"version": STORE_VERSION, "dim": self.dim, "dtype": "float16"}, f)
+
+            # The store was rewritten (e.g. migrated) since it was read: start over from its start
+            if not self.names_path.exists() or os.path.getsize(self.names_path) < self._names_size:
+                self.external_rows += 1 if self.names else 0
+                self.names = []
+                self._names_size = 0
+
+            # Pick up rows other writers committed since this store last read the files
+            row_bytes = self.dim * 2
+            vector_rows = os.path.getsize(self.vectors_path) // row_bytes if self.vectors_path.exists() else 0
+            new_names, self._names_size = self._read_names(vector_rows)
+            self.names.extend(new_names)
+            self.external_rows += len(new_names)
+
+            # Only a torn tail of an interrupted flush can be unaligned while the lock is held
+            committed = len(self.names)
+            if self.vectors_path.exists() and os.path.getsize(self.vectors_path) != committed * row_bytes:
+                with open(self.vectors_path, 'r+b') as f:
+                    f.truncate(committed * row_bytes)
+            if self.names_path.exists() and os.path.getsize(self.names_path) != self._names_size:
+                with open(self.names_path, 'r+b') as f:
+                    f.truncate(self._names_size)
+
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.stack(self._pending_vectors).astype('<f2').tobytes())
+            names_block = "".join(json.dumps(name, ensure_ascii=False) + "\n" for name in self._pending_names)
+            names_block = names_block.encode('utf-8')
+            with open(self.names_path, 'ab') as f:
+                f.write(names_block)
+            self._names_size += len(names_block)
+
+        self.names.extend(self._pending_names)
+        self._pending_names = []
+        self._pending_vectors = []
+        self.vectors = np.memmap(self.vectors_path, dtype='<f2', mode='r', shape=(len(self.names), self.dim))
+
+    def write_all(self, names: list[str], vectors: np.ndarray) -> None:
+        """
+        Replace the store contents with the given topics (used for migration).
+
+        Args:
+            names: Topic names
+            vectors: Normalized embedding matrix, one row per name
+        """
+        self.names = []
+        self._pending_names = []
+        self._pending_vectors = []
+        self._names_size = 0
+        self.dim = vectors.shape[1]
+        with self._locked():
+            for path in (self.vectors_path, self.names_path, self.meta_path):
+                if path.exists():
+                    path.unlink()
+        for name, vector in zip(names, vectors):
+            self._pending_names.append(name)
+            self._pending_vectors.append(np.asarray(vector, dtype='<f2'))
+        self.flush()
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.utils.metrics import metrics
+
+# Days in the rolling mean
+ROLLING_WINDOW = 7
+
+# Lag of the week-over-week delta
+WEEK = 7
+
+# Weight of the newest day in the EWMA baseline
+EWMA_ALPHA = 0.1
+
+# Minimum z-score against the EWMA baseline for a spike
+Z_THRESHOLD = 3.0
+
+# Minimum count on the day for a spike, so tiny topics going 0 -> 2 are not flagged
+MIN_COUNT = 5
+
+# Floor of the baseline standard deviation, so flat topics do not divide by ~0;
+# counts are also never assumed to vary less than Poisson noise (sqrt of the mean)
+MIN_STD = 1.0
+
+COLUMNS = ["date", "topic", "count", "share", "rolling_mean", "dod", "wow", "ewma", "zscore", "spike"]
+
+
+def analytics_params(window: int = ROLLING_WINDOW, alpha: float = EWMA_ALPHA,
+                     z_threshold: float = Z_THRESHOLD, min_count: int = MIN_COUNT) -> dict:
+    """
+    Return the settings the analytics state depends on; a change forces a full recompute.
+    """
+    return {"window": window, "alpha": alpha, "z_threshold": z_threshold, "min_count": min_count}
+
+
+def empty_state(params: dict) -> dict:
+    """
+    Return the analytics state before any day has been seen.
+    """
+    return {
+        "params": params,
+        "days_seen": 0,
+        "digests": {},
+        "topics": [],
+        "history": [],
+        "ewma_mean": [],
+        "ewma_var": [],
+    }
+
+
+def load_state(state_path: str) -> dict | None:
+    """
+    Load the incremental analytics state, or None if there is none.
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_state(state: dict, state_path: str) -> None:
+    """
+    Save the incremental analytics state (write then rename).
+    """
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def _history_length(window: int) -> int:
+    # Trailing days needed for the rolling mean and the week-over-week delta
+    return max(window - 1, WEEK)
+
+
+def advance(state: dict, counts: pd.DataFrame, totals: dict[str, int] | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Compute analytics for days appended after the ones already in `state`.
+
+    All topics are processed at once as rows of one matrix: the rolling mean
+    comes from a cumulative sum, the deltas from shifted columns, and only
+    the EWMA recursion steps through the new days. The state carries the
+    last few days of counts and the EWMA mean/variance per topic, so
+    appending a day costs the same whatever the length of the history.
+
+    Args:
+        state: Analytics state after the previous day (see `empty_state`)
+        counts: Topic x date count matrix of the new days, in chronological order
+        totals: Reviews per date for share normalization; dates missing here use
+            the sum of that day's topic counts
+
+    Returns:
+        Tuple of (long-format analytics for the new days, updated state)
+    """
+    params = state["params"]
+    window, alpha = params["window"], params["alpha"]
+    history_length = _history_length(window)
+    dates = list(counts.columns)
+
+    # Keep the state's topic order and append unseen topics, which have zero history
+    known = state["topics"]
+    known_set = set(known)
+    topics = known + sorted(t for t in counts.index if t not in known_set)
+    n_topics, n_days = len(topics), len(dates)
+
+    history = np.zeros((n_topics, history_length))
+    mean = np.zeros(n_topics)
+    var = np.zeros(n_topics)
+    if known:
+        history[:len(known)] = np.asarray(state["history"], dtype=float)
+        mean[:len(known)] = state["ewma_mean"]
+        var[:len(known)] = state["ewma_var"]
+
+    x = counts.reindex(index=topics, fill_value=0).fillna(0).to_numpy(dtype=float)
+    extended = np.hstack([history, x])
+    position = state["days_seen"] + np.arange(n_days)
+    columns = history_length + np.arange(n_days)
+
+    # Rolling mean over the last `window` days (fewer at the start of the history)
+    cumulative = np.concatenate([np.zeros((n_topics, 1)), np.cumsum(extended, axis=1)], axis=1)
+    rolling = (cumulative[:, columns + 1] - cumulative[:, columns + 1 - window]) / np.minimum(window, position + 1)
+
+    dod = x - extended[:, columns - 1]
+    dod[:, position < 1] = np.nan
+    wow = x - extended[:, columns - WEEK]
+    wow[:, position < WEEK] = np.nan
+
+    # Share of the day's reviews
+    mention_totals = x.sum(axis=0)
+    day_totals = np.array([(totals or {}).get(d) or mention_totals[i] for i, d in enumerate(dates)], dtype=float)
+    share = np.divide(x, day_totals, out=np.zeros_like(x), where=day_totals > 0)
+
+    # z-score of each day against the EWMA baseline of the days before it
+    zscore = np.empty_like(x)
+    ewma = np.empty_like(x)
+    for j in range(n_days):
+        diff = x[:, j] - mean
+        zscore[:, j] = diff / np.maximum(np.sqrt(np.maximum(var, mean)), MIN_STD)
+        increment = alpha * diff
+        mean = mean + increment
+        var = (1 - alpha) * (var + diff * increment)
+        ewma[:, j] = mean
+
+    # Days before a full window has been seen only warm up the baseline
+    spike = (zscore >= params["z_threshold"]) & (x >= params["min_count"]) & (position >= window)
+
+    # Rows ordered by date, then topic
+    order = np.argsort(np.asarray(topics, dtype=object))
+
+    def by_date(values: np.ndarray) -> np.ndarray:
+        return values[order].T.ravel()
+
+    result = pd.DataFrame({
+        "date": np.repeat(np.asarray(dates, dtype=object), n_topics),
+        "topic": np.tile(np.asarray(topics, dtype=object)[order], n_days),
+        "count": by_date(x.astype(np.int64)),
+        "share": by_date(share),
+        "rolling_mean": by_date(rolling),
+        "dod": by_date(dod),
+        "wow": by_date(wow),
+        "ewma": by_date(ewma),
+        "zscore": by_date(zscore),
+        "spike": by_date(spike),
+    }, columns=COLUMNS)
+
+    new_state = {
+        "params": params,
+        "days_seen": state["days_seen"] + n_days,
+        "digests": {**state["digests"], **day_digests(counts)},
+        "topics": topics,
+        "history": extended[:, -history_length:].astype(np.int64).tolist(),
+        "ewma_mean": mean.tolist(),
+        "ewma_var": var.tolist(),
+    }
+    return result, new_state
+
+
+def day_digests(counts: pd.DataFrame) -> dict[str, str]:
+    """
+    Return a short digest of each day's counts (zero counts ignored), used to detect changed days.
+    """
+    counts = counts.sort_index()
+    topic_hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(str(t).encode("utf-8"), digest_size=8).digest(), "little") for t in counts.index],
+        dtype=np.uint64
+    )
+    values = counts.fillna(0).to_numpy(dtype=np.int64)
+    digests = {}
+    for j, date_str in enumerate(counts.columns):
+        nonzero = values[:, j] != 0
+        payload = topic_hashes[nonzero].tobytes() + values[nonzero, j].tobytes()
+        digests[date_str] = hashlib.sha1(payload).hexdigest()[:16]
+    return digests
+
+
+def compute_analytics(counts: pd.DataFrame, totals: dict[str, int] | None = None,
+                      window: int = ROLLING_WINDOW, alpha: float = EWMA_ALPHA,
+                      z_threshold: float = Z_THRESHOLD, min_count: int = MIN_COUNT) -> pd.DataFrame:
+    """
+    Compute rolling means, deltas, shares and spike flags over a whole trend table.
+
+    Args:
+        counts: Topic x date count matrix, as returned by build_trend_table
+        totals: Reviews per date for share normalization (default: sum of topic counts)
+        window: Days in the rolling mean (default: 7)
+        alpha: Weight of the newest day in the EWMA baseline (default: 0.1)
+        z_threshold: Minimum z-score for a spike (default: 3.0)
+        min_count: Minimum count on the day for a spike (default: 5)
+
+    Returns:
+        Long-format DataFrame with one row per (date, topic) and the columns
+        count, share, rolling_mean, dod, wow, ewma, zscore and spike
+    """
+    counts = counts.reindex(columns=sorted(counts.columns))
+    result, _ = advance(empty_state(analytics_params(window, alpha, z_threshold, min_count)), counts, totals)
+    return result
+
+
+def update_analytics(counts: pd.DataFrame, state_path: str = 'output/trend_analytics.json',
+                     totals: dict[str, int] | None = None, window: int = ROLLING_WINDOW,
+                     alpha: float = EWMA_ALPHA, z_threshold: float = Z_THRESHOLD,
+                     min_count: int = MIN_COUNT) -> pd.DataFrame:
+    """
+    Bring the stored analytics state up to date with a trend table and return the new days' analytics.
+
+    Days after the last analyzed one are appended using only the stored
+    state. The state is rebuilt from the full table when the settings
+    changed, an analyzed day's counts changed, or a day earlier than the
+    last analyzed one was added.
+
+    Args:
+        counts: Topic x date count matrix, as returned by build_trend_table
+        state_path: JSON file holding the incremental state (default: 'output/trend_analytics.json')
+        totals: Reviews per date for share normalization (default: sum of topic counts)
+        window: Days in the rolling mean (default: 7)
+        alpha: Weight of the newest day in the EWMA baseline (default: 0.1)
+        z_threshold: Minimum z-score for a spike (default: 3.0)
+        min_count: Minimum count on the day for a spike (default: 5)
+
+    Returns:
+        Long-format analytics for the days that were (re)computed
+    """
+    params = analytics_params(window, alpha, z_threshold, min_count)
+    dates = sorted(counts.columns)
+    state = load_state(state_path)
+
+    rebuild = state is None or state.get("params") != params
+    if not rebuild:
+        analyzed = state["digests"]
+        last = max(analyzed) if analyzed else None
+        digests = day_digests(counts)
+        for date_str in dates:
+            if date_str in analyzed:
+                if analyzed[date_str] != digests[date_str]:
+                    rebuild = True
+                    break
+            elif last is not None and date_str < last:
+                rebuild = True
+                break
+
+    if rebuild:
+        state = empty_state(params)
+        new_dates = dates
+    else:
+        new_dates = [d for d in dates if d not in state["digests"]]
+
+    with metrics.timer("trend.analytics"):
+        result, state = advance(state, counts.reindex(columns=new_dates), totals)
+    metrics.incr("trend.analytics.items", len(new_dates))
+    save_state(state, state_path)
+
+    action = "rebuilt over" if rebuild else "appended"
+    print(f"Trend analytics: {action} {len(new_dates)} days")
+    return result
+
+
+def spike_alerts(analytics: pd.DataFrame, date: str | None = None) -> pd.DataFrame:
+    """
+    Return the spiking (date, topic) rows, strongest first within each date.
+
+    Args:
+        analytics: Output of compute_analytics or update_analytics
+        date: Only return alerts for this date (default: all dates)
+
+    Returns:
+        DataFrame of spike rows sorted by date and descending z-score
+    """
+    alerts = analytics[analytics["spike"]]
+    if date is not None:
+        alerts = alerts[alerts["date"] == date]
+    return alerts.sort_values(["date", "zscore"], ascending=[True, False], ignore_index=True)
@@ -1,85 +1,115 @@
 import os
-import glob
 import pandas as pd
-from src.agents.daily_topic_processor import process_day
-import json
+from src.agents.daily_topic_processor import process_day, pipeline_config
+from src.agents.day_counts import load_manifest, load_fresh_day_counts, load_day_counts, load_day_score_counts
+from src.agents.trend_store import load_index, upsert_day
+from src.agents import topic_cube
+from src.utils.metrics import metrics
 
 
-def build_trend_table(dates: list[str], memory_path: str = 'topic_memory.json') -> pd.DataFrame:
+def build_trend_table(dates: list[str], memory_path: str = 'topic_memory.json',
+                      input_dir: str = 'data/processed', counts_dir: str = 'data/counts',
+                      concurrency: int = 0, cache_path: str | None = 'cache/extraction_cache.sqlite',
+                      store_dir: str | None = 'output/trend_store',
+                      cascade_threshold: float | None = None,
+                      cube_dir: str | None = 'output/topic_cube',
+                      dedup_threshold: float | None = None,
+                      app: str = topic_cube.DEFAULT_APP) -> pd.DataFrame:
     """
     Build a trend table DataFrame showing topic frequencies across multiple days.
     
+    Days whose processed input file and pipeline config (model, prompt and
+    TOPIC_MAP versions) match the counts manifest are merged from stored
+    counts; only new or changed days are re-extracted with `process_day`.
+    Days whose counts changed are upserted into the date-partitioned trend
+    store, and their counts by star rating into the topic cube; other
+    partitions are left untouched.
+    
     Args:
         dates: List of date strings in format YYYY-MM-DD (e.g., ['2024-06-01', '2024-06-02'])
         memory_path: Path to topic memory JSON file (default: 'topic_memory.json')
+        input_dir: Directory containing processed review JSON files (default: 'data/processed')
+        counts_dir: Directory holding per-day count artifacts and their manifest (default: 'data/counts')
+        concurrency: Number of requests in flight when a day is recomputed (default: 0)
+        cache_path: Path to the extraction cache database, or None to disable caching
+        store_dir: Root directory of the partitioned trend store, or None to skip it
+            (default: 'output/trend_store')
+        cascade_threshold: Confidence threshold of the local classifier stage, or None to send
+            every review to the LLM (default: None)
+        cube_dir: Root directory of the date x topic x score cube store, or None to skip it
+            (default: 'output/topic_cube')
+        dedup_threshold: Minimum estimated Jaccard similarity for reviews to share one extraction,
+            or None to extract every review (default: None)
+        app: App the days belong to, used as the app partition of the topic cube (default: 'default')
     
     Returns:
         pandas DataFrame with topics as index (rows) and dates as columns (values = frequencies)
     """
-    # Extract pure date strings from file paths
-    dates = [os.path.basename(f).replace(".json", "") for f in glob.glob("data/processed/*.json")]
-    
-    # Clean dates - remove any path components that might have leaked in
-    dates = [d.replace("processed\\", "").replace("processed/", "").strip() for d in dates]
+    # Sort dates chronologically, dropping duplicates
+    sorted_dates = sorted(set(dates))
     
-    # Sort dates chronologically
-    sorted_dates = sorted(dates)
+    config = pipeline_config(cascade_threshold, dedup_threshold)
+    manifest = load_manifest(counts_dir)
     
     # Dictionary to store topic frequencies for each date
     all_topic_data = {}
+    recomputed = []
     
     # Process each date
     for date_str in sorted_dates:
-        processed_path = f"data/processed/{date_str}.json"
-        try:
-            with open(processed_path, "r", encoding="utf-8") as f:
-                day_topics = json.load(f)  # this must load a dict of {topic: count}
-                if not isinstance(day_topics, dict):
-                    print(f"Invalid format in {processed_path}, skipping...")
+        input_path = os.path.join(input_dir, f"{date_str}.json")
+        
+        day_topics = load_fresh_day_counts(date_str, input_path, config, counts_dir, manifest)
+        if day_topics is None:
+            if os.path.exists(input_path):
+                # Inputs or config changed since the stored counts were built
+                day_topics = process_day(date_str, input_dir, memory_path, concurrency=concurrency,
+                                         cache_path=cache_path, counts_dir=counts_dir,
+                                         cascade_threshold=cascade_threshold, dedup_threshold=dedup_threshold)
+                recomputed.append(date_str)
+            else:
+                # No input to recompute from; fall back to whatever counts are stored
+                day_topics = load_day_counts(date_str, counts_dir)
+                if day_topics is None:
+                    print(f"Processed file not found: {input_path}")
                     continue
-        except FileNotFoundError:
-            print(f"Processed file not found: {processed_path}")
-            continue
         all_topic_data[date_str] = day_topics
     
-    # Collect all unique topics across all days
-    all_topics = set()
-    for day_topics in all_topic_data.values():
-        all_topics.update(day_topics.keys())
-    
-    # Sort topics for consistent ordering
-    sorted_topics = sorted(all_topics)
+    print(f"Trend build: {len(recomputed)} days recomputed, {len(all_topic_data) - len(recomputed)} reused from stored counts")
+    metrics.incr("trend.days_recomputed", len(recomputed))
+    metrics.incr("trend.days_reused", len(all_topic_data) - len(recomputed))
     
-    # Build DataFrame
-    # Initialize with zeros
-    # Create DataFrame with topics as index and dates as columns
-    df = pd.DataFrame(0, index=sorted_topics, columns=sorted_dates)
-    
-    # Populate DataFrame
-    for date_str in sorted_dates:
-        if date_str in all_topic_data:
-            day_topics = all_topic_data[date_str]
-            for topic, count in day_topics.items():
-                if topic in df.index:
-                    df.at[topic, date_str] = count
-
-    # --- CLEAN COLUMN NAMES ---
-    # remove any 'processed\' or 'processed/' prefix from column names
-    df.columns = [c.replace("processed\\", "").replace("processed/", "").replace("processed", "").strip() for c in df.columns]
-    # --------------------------------
+    # Upsert changed days into the partitioned store
+    if store_dir:
+        with metrics.timer("trend.store_upsert"):
+            index = load_index(store_dir)
+            written = sum(upsert_day(date_str, counts, store_dir, index) for date_str, counts in all_topic_data.items())
+        print(f"Trend store: {written} partitions written")
     
-    # Fill any missing values with 0 (shouldn't be needed, but just in case)
-    df = df.fillna(0)
+    # Upsert per-score counts into the topic cube
+    if cube_dir:
+        with metrics.timer("trend.cube_upsert"):
+            cube_index = topic_cube.load_index(cube_dir)
+            written = 0
+            for date_str in all_topic_data:
+                score_counts = load_day_score_counts(date_str, counts_dir)
+                if score_counts is not None:
+                    written += topic_cube.upsert_day(date_str, score_counts, cube_dir, cube_index, app)
+        print(f"Topic cube: {written} partitions written")
     
-    # Ensure all values are integers
-    df = df.astype(int)
+    # Create DataFrame with topics as index and dates as columns, filling missing counts with 0
+    with metrics.timer("trend.table"):
+        df = pd.DataFrame.from_dict(all_topic_data, orient='columns')
+        df = df.reindex(columns=[d for d in sorted_dates if d in all_topic_data])
+        df = df.sort_index().fillna(0).astype(int)
+    df.index.name = 'topic'
     
     return df
 
 
 def save_trend_table(df: pd.DataFrame, output_path: str = 'output/reports/trend.csv') -> None:
     """
-    Save trend table DataFrame to CSV file.
+    Save trend table DataFrame to CSV file (compatibility export; see trend_store.export_csv).
     
     Args:
         df: pandas DataFrame to save
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+INDEX_NAME = "_index.json"
+
+# Long-format schema of each partition file; the date lives in the partition path
+PARTITION_SCHEMA = pa.schema([("topic", pa.string()), ("count", pa.int64())])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+# Guards index read-modify-write when several days are written from threads
+_index_lock = threading.Lock()
+
+
+def counts_digest(counts: dict[str, int]) -> str:
+    """
+    Return a short hash of a day's counts, used to skip rewriting unchanged partitions.
+    """
+    payload = json.dumps(sorted(counts.items()), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def partition_path(date_str: str, store_dir: str = 'output/trend_store') -> str:
+    """
+    Return the Parquet file holding one day's counts.
+    """
+    return os.path.join(store_dir, f"date={date_str}", "part-0.parquet")
+
+
+def load_index(store_dir: str = 'output/trend_store') -> dict[str, str]:
+    """
+    Load the store index mapping each stored date to the digest of its counts.
+    """
+    try:
+        with open(os.path.join(store_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def upsert_day(date_str: str, counts: dict[str, int], store_dir: str = 'output/trend_store',
+               index: dict[str, str] | None = None) -> bool:
+    """
+    Write one day's counts to its own partition, replacing any previous version.
+
+    Only that day's partition is touched; unchanged counts are not rewritten.
+
+    Args:
+        date_str: Date string in format YYYY-MM-DD
+        counts: Mapping of topic name to count for that day
+        store_dir: Root directory of the partitioned store (default: 'output/trend_store')
+        index: Preloaded store index, to avoid rereading it for every day
+
+    Returns:
+        True if the partition was written, False if it was already up to date
+    """
+    digest = counts_digest(counts)
+    if index is None:
+        index = load_index(store_dir)
+    if index.get(date_str) == digest and os.path.exists(partition_path(date_str, store_dir)):
+        return False
+
+    path = partition_path(date_str, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    topics = sorted(counts)
+    table = pa.table(
+        {"topic": topics, "count": [int(counts[t]) for t in topics]},
+        schema=PARTITION_SCHEMA
+    )
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+    with _index_lock:
+        stored = load_index(store_dir)
+        stored[date_str] = digest
+        tmp_index = os.path.join(store_dir, f"{INDEX_NAME}.tmp")
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(stored.items())), f, indent=2)
+        os.replace(tmp_index, os.path.join(store_dir, INDEX_NAME))
+    index[date_str] = digest
+    return True
+
+
+def list_dates(store_dir: str = 'output/trend_store') -> list[str]:
+    """
+    Return all dates present in the store, sorted.
+    """
+    return sorted(
+        date_str for date_str in load_index(store_dir)
+        if os.path.exists(partition_path(date_str, store_dir))
+    )
+
+
+def read_trend(store_dir: str = 'output/trend_store', dates: list[str] | None = None,
+               topics: list[str] | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Read counts in long format, pruning partitions by date and rows by topic.
+
+    Args:
+        store_dir: Root directory of the partitioned store (default: 'output/trend_store')
+        dates: Dates to read (default: all); other partitions are not opened
+        topics: Topics to keep (default: all)
+        columns: Columns to return out of 'date', 'topic', 'count' (default: all)
+
+    Returns:
+        DataFrame with one row per (date, topic)
+    """
+    columns = columns or ["date", "topic", "count"]
+    stored = list_dates(store_dir)
+    if dates is not None:
+        wanted = set(dates)
+        stored = [d for d in stored if d in wanted]
+    if not stored:
+        return pd.DataFrame({c: pd.Series(dtype="int64" if c == "count" else "object") for c in columns})
+
+    # Only hand the selected partitions to the dataset, so pruning never lists the whole store
+    dataset = ds.dataset(
+        [partition_path(d, store_dir) for d in stored],
+        format="parquet",
+        partitioning=PARTITIONING,
+        partition_base_dir=store_dir,
+    )
+    row_filter = ds.field("topic").isin(topics) if topics is not None else None
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    return table.to_pandas().sort_values([c for c in ("date", "topic") if c in columns], ignore_index=True)
+
+
+def to_wide(long_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pivot long-format counts into the topic x date trend table.
+    """
+    if long_df.empty:
+        return pd.DataFrame(dtype=int)
+    wide = long_df.pivot_table(index="topic", columns="date", values="count", aggfunc="sum", fill_value=0)
+    wide.columns.name = None
+    return wide.astype(int)
+
+
+def export_csv(output_path: str = 'output/reports/trend.csv', store_dir: str = 'output/trend_store',
+               dates: list[str] | None = None) -> pd.DataFrame:
+    """
+    Export the store as the wide topic x date CSV (compatibility format).
+
+    Args:
+        output_path: Path where CSV file will be saved (default: 'output/reports/trend.csv')
+        store_dir: Root directory of the partitioned store (default: 'output/trend_store')
+        dates: Dates to include (default: all)
+
+    Returns:
+        The exported wide DataFrame
+    """
+    stored = list_dates(store_dir)
+    if dates is not None:
+        wanted = set(dates)
+        stored = [d for d in stored if d in wanted]
+    wide = to_wide(read_trend(store_dir, dates=stored))
+    # days with no matched topics have empty partitions but still get a column
+    wide = wide.reindex(columns=stored, fill_value=0)
+    wide.index.name = "topic"
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    wide.to_csv(output_path)
+    return wide
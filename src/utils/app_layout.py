@@ -0,0 +1,82 @@
+import os
+import re
+
+# Root directories of the per-app layout
+APPS_DATA_DIR = "data/apps"
+APPS_OUTPUT_DIR = "output/apps"
+
+# Files shared by every app: extraction cache, cross-process rate limiter and the topic cube
+EXTRACTION_CACHE_PATH = "cache/extraction_cache.sqlite"
+RATE_LIMIT_PATH = "cache/rate_limit.sqlite"
+CUBE_DIR = "output/topic_cube"
+
+# Cross-app reports, one row per (app, date, topic) or per spike
+APP_TRENDS_PATH = "output/reports/app_trends.csv"
+APP_ALERTS_PATH = "output/reports/app_alerts.csv"
+
+# Android package names: dot-separated identifiers
+PACKAGE_ID_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]*(\.[A-Za-z][A-Za-z0-9_]*)*$")
+
+
+def validate_package_id(package_id: str) -> str:
+    """
+    Check that a package ID is safe to use as a directory name and return it.
+
+    Raises:
+        ValueError: If the ID is not a dot-separated list of identifiers
+    """
+    if not PACKAGE_ID_PATTERN.match(package_id or ""):
+        raise ValueError(f"Invalid package ID: {package_id!r}")
+    return package_id
+
+
+def app_paths(package_id: str | None = None) -> dict[str, str]:
+    """
+    Return the data and output locations of one app.
+
+    Each app gets its own raw, processed and counts directories and topic
+    memory under data/apps/<package_id>/, and its own trend store, analytics
+    state and reports under output/apps/<package_id>/. Without a package ID
+    the single-app layout (data/raw, data/processed, topic_memory.json, ...)
+    is returned.
+
+    Args:
+        package_id: Package ID of the app, or None for the single-app layout
+
+    Returns:
+        Dictionary with the keys raw, processed, counts, topic_memory, trend_store,
+        analytics_state, reports, trend_csv, alerts_csv and proposals
+    """
+    if package_id is None:
+        data_dir, output_dir = "data", "output"
+        topic_memory = "topic_memory.json"
+    else:
+        validate_package_id(package_id)
+        data_dir = os.path.join(APPS_DATA_DIR, package_id)
+        output_dir = os.path.join(APPS_OUTPUT_DIR, package_id)
+        topic_memory = os.path.join(data_dir, "topic_memory.json")
+    reports = os.path.join(output_dir, "reports")
+    return {
+        "raw": os.path.join(data_dir, "raw"),
+        "processed": os.path.join(data_dir, "processed"),
+        "counts": os.path.join(data_dir, "counts"),
+        "topic_memory": topic_memory,
+        "trend_store": os.path.join(output_dir, "trend_store"),
+        "analytics_state": os.path.join(output_dir, "trend_analytics.json"),
+        "reports": reports,
+        "trend_csv": os.path.join(reports, "trend.csv"),
+        "alerts_csv": os.path.join(reports, "alerts.csv"),
+        "proposals": os.path.join(reports, "topic_proposals.json"),
+    }
+
+
+def list_apps(data_dir: str = APPS_DATA_DIR) -> list[str]:
+    """
+    Return the package IDs that have a directory in the per-app layout, sorted.
+    """
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(data_dir)
+        if os.path.isdir(os.path.join(data_dir, name)) and PACKAGE_ID_PATTERN.match(name)
+    )
@@ -0,0 +1,195 @@
+import re
+import numpy as np
+
+from src.utils.metrics import metrics
+
+# Minimum estimated Jaccard similarity (of character shingles) for two reviews to be collapsed
+DEDUP_THRESHOLD = 0.8
+
+# MinHash signature length; longer signatures estimate similarity more precisely
+NUM_PERM = 64
+
+# Bytes per shingle; four bytes pack into one uint32, so shingles need no hashing pass
+SHINGLE_SIZE = 4
+
+# Required chance that a pair exactly at the threshold shares at least one LSH band
+MIN_RECALL = 0.95
+
+# Shingles hashed per vectorized MinHash step (bounds the temporary matrix to ~50 MB)
+SHINGLE_CHUNK = 100_000
+
+# Punctuation and symbols; differences in them never separate two reviews
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def dedup_key(text: str) -> str:
+    """
+    Normalize a cleaned review for duplicate detection (lowercase, no punctuation, single spaces).
+    """
+    return WHITESPACE_PATTERN.sub(" ", PUNCTUATION_PATTERN.sub(" ", text.lower())).strip()
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """
+    Choose the LSH banding for a similarity threshold.
+
+    Picks the most rows per band (fewest false candidates) such that a pair
+    exactly at `threshold` still shares a band with probability MIN_RECALL.
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= MIN_RECALL:
+            best = (bands, rows)
+    return best
+
+
+def minhash_signatures(keys: list[str], num_perm: int = NUM_PERM, seed: int = 0) -> np.ndarray:
+    """
+    Compute MinHash signatures of normalized texts over their 4-byte shingles.
+
+    Each shingle is read straight from the UTF-8 bytes as a uint32 and
+    permuted with multiply-shift hashes. All shingles of a chunk of texts
+    go through one vectorized step, and `np.minimum.reduceat` takes the
+    per-text minimum. Texts shorter than a shingle are one zero-padded shingle.
+
+    Args:
+        keys: Normalized texts (see dedup_key)
+        num_perm: Signature length (default: 64)
+        seed: Seed of the hash permutations (default: 0)
+
+    Returns:
+        uint32 matrix with one signature row per text
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    encoded = [key.encode("utf-8") for key in keys]
+    lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+    # Shingles per text: one per start position, at least one
+    counts = np.maximum(lengths - SHINGLE_SIZE + 1, 1)
+
+    signatures = np.empty((len(keys), num_perm), dtype=np.uint32)
+    start = 0
+    while start < len(keys):
+        # Texts whose shingles fit in one chunk (at least one text)
+        end = start + max(1, int(np.searchsorted(np.cumsum(counts[start:]), SHINGLE_CHUNK, side="right")))
+
+        # Concatenate the texts, each padded so its last shingle stays inside its own bytes
+        padding = b"\0" * (SHINGLE_SIZE - 1)
+        buffer = np.frombuffer(padding.join(encoded[start:end]) + padding, dtype=np.uint8).astype(np.uint32)
+        text_starts = np.concatenate([[0], np.cumsum(lengths[start:end] + SHINGLE_SIZE - 1)[:-1]])
+        chunk_counts = counts[start:end]
+        first_shingle = np.concatenate([[0], np.cumsum(chunk_counts)[:-1]])
+
+        # Byte offset of every shingle in the buffer
+        positions = np.repeat(text_starts - first_shingle, chunk_counts) + np.arange(chunk_counts.sum())
+        shingles = ((buffer[positions] << 24) | (buffer[positions + 1] << 16)
+                    | (buffer[positions + 2] << 8) | buffer[positions + 3])
+
+        values = shingles.astype(np.uint64)[:, None] * multipliers + offsets
+        signatures[start:end] = np.minimum.reduceat(values >> np.uint64(32), first_shingle, axis=0)
+        start = end
+    return signatures
+
+
+def group_near_duplicates(texts: list[str], threshold: float = DEDUP_THRESHOLD,
+                          num_perm: int = NUM_PERM) -> list[int]:
+    """
+    Group exact and near-duplicate texts.
+
+    Texts identical after normalization are grouped by a dictionary lookup.
+    The remaining distinct texts are compared through MinHash LSH: each
+    text is checked only against group representatives that share a band
+    with it, and joins the most similar one if the estimated Jaccard
+    similarity reaches `threshold`. Otherwise it starts a new group. As
+    members are compared with the representative rather than with each
+    other, groups do not chain into loosely related reviews.
+
+    Args:
+        texts: Cleaned review texts
+        threshold: Minimum estimated Jaccard similarity of character shingles (default: 0.8)
+        num_perm: MinHash signature length (default: 64)
+
+    Returns:
+        List aligned with `texts`; the index of each text's group representative
+        (the group's first text)
+    """
+    representatives = list(range(len(texts)))
+
+    # Exact duplicates after normalization
+    first_by_key: dict[str, int] = {}
+    distinct: list[int] = []
+    distinct_keys: list[str] = []
+    for i, text in enumerate(texts):
+        key = dedup_key(text)
+        first = first_by_key.setdefault(key, i)
+        if first == i:
+            distinct.append(i)
+            distinct_keys.append(key)
+        else:
+            representatives[i] = first
+    if threshold >= 1 or len(distinct) < 2:
+        return representatives
+
+    # Near duplicates among the distinct texts
+    signatures = minhash_signatures(distinct_keys, num_perm)
+    bands, rows = lsh_params(threshold, num_perm)
+    weights = np.random.default_rng(1).integers(1, 2 ** 63, rows, dtype=np.uint64)
+    band_keys = np.stack([
+        (signatures[:, band * rows:(band + 1) * rows].astype(np.uint64) * weights).sum(axis=1)
+        for band in range(bands)
+    ], axis=1)
+
+    buckets: list[dict[int, list[int]]] = [{} for _ in range(bands)]
+    for position, i in enumerate(distinct):
+        keys = band_keys[position].tolist()
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(buckets[band].get(key, ()))
+
+        if candidates:
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (signatures[candidates] == signatures[position]).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                representatives[i] = distinct[candidates[best]]
+                continue
+
+        # New group: only representatives are indexed
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(position)
+
+    # Exact duplicates follow their first occurrence's group
+    return [representatives[representatives[i]] for i in range(len(texts))]
+
+
+def collapse_texts(texts: list[str], threshold: float = DEDUP_THRESHOLD) -> tuple[list[str], list[int]]:
+    """
+    Collapse near-duplicate texts before extraction and report the collapse ratio.
+
+    Args:
+        texts: Cleaned review texts
+        threshold: Minimum estimated Jaccard similarity for two texts to share a group (default: 0.8)
+
+    Returns:
+        Tuple of (one representative text per group, group position of every text);
+        expand per-group results with `[results[g] for g in groups]`
+    """
+    with metrics.timer("dedup"):
+        representatives = group_near_duplicates(texts, threshold)
+    positions: dict[int, int] = {}
+    groups = [positions.setdefault(rep, len(positions)) for rep in representatives]
+    unique_texts = [texts[rep] for rep in positions]
+
+    metrics.incr("dedup.items", len(texts))
+    metrics.incr("dedup.groups", len(unique_texts))
+    if texts:
+        print(f"Dedup: {len(texts)} reviews collapsed into {len(unique_texts)} groups "
+              f"({1 - len(unique_texts) / len(texts):.0%} fewer extractions)")
+    return unique_texts, groups
@@ -0,0 +1,69 @@
+import hashlib
+import numpy as np
+
+from src.utils.sqlite_cache import SQLiteCache, MAX_CACHE_BYTES
+
+
+def embedding_key(text: str, model: str) -> str:
+    """
+    Build the content-addressed key for a text embedding.
+
+    Args:
+        text: Embedded text
+        model: Embedding model name
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(SQLiteCache):
+    """
+    Persistent SQLite cache of float32 embeddings keyed by model name and text.
+
+    Vectors are stored as raw float32 bytes; storage, concurrency and
+    eviction are handled by SQLiteCache.
+    """
+
+    table = "embeddings"
+    value_column = "vector"
+    value_type = "BLOB"
+    metrics_prefix = "embedding_cache"
+
+    def __init__(self, path: str = "cache/embedding_cache.sqlite", max_bytes: int = MAX_CACHE_BYTES):
+        """
+        Initialize EmbeddingCache.
+
+        Args:
+            path: Path to the SQLite database file (default: "cache/embedding_cache.sqlite")
+            max_bytes: Database size above which old entries are evicted (default: 256 MB)
+        """
+        super().__init__(path, max_bytes)
+
+    def get_many(self, texts: list[str], model: str) -> list[np.ndarray | None]:
+        """
+        Look up cached embeddings for several texts.
+
+        Args:
+            texts: Texts to look up
+            model: Embedding model name
+
+        Returns:
+            List aligned with `texts`; float32 vectors, or None on a cache miss
+        """
+        values = self._lookup([embedding_key(text, model) for text in texts])
+        return [np.frombuffer(value, dtype=np.float32) if value is not None else None for value in values]
+
+    def put_many(self, items: dict[str, np.ndarray], model: str) -> None:
+        """
+        Store embeddings for several texts, evicting old entries if the cache is too large.
+
+        Args:
+            items: Mapping of text to embedding vector
+            model: Embedding model name
+        """
+        self._store([
+            (embedding_key(text, model), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in items.items()
+        ])
@@ -0,0 +1,83 @@
+import hashlib
+import json
+
+from src.utils.sqlite_cache import SQLiteCache, MAX_CACHE_BYTES
+
+
+def cache_key(text: str, model: str, prompt_version: str) -> str:
+    """
+    Build the content-addressed key for an extraction result.
+
+    Args:
+        text: Cleaned review text
+        model: Model name used for extraction
+        prompt_version: Version of the extraction prompt
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(f"{model}\0{prompt_version}\0{text}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache(SQLiteCache):
+    """
+    Persistent SQLite cache of extracted topic phrases keyed by review text, model and prompt version.
+
+    Phrases are stored as JSON; storage, concurrency and eviction are
+    handled by SQLiteCache.
+    """
+
+    table = "extractions"
+    value_column = "phrases"
+    metrics_prefix = "extraction_cache"
+
+    def __init__(self, path: str = "cache/extraction_cache.sqlite", max_bytes: int = MAX_CACHE_BYTES):
+        """
+        Initialize ExtractionCache.
+
+        Args:
+            path: Path to the SQLite database file (default: "cache/extraction_cache.sqlite")
+            max_bytes: Database size above which old entries are evicted (default: 256 MB)
+        """
+        super().__init__(path, max_bytes)
+
+    def get_many(self, texts: list[str], model: str, prompt_version: str) -> list[list[str] | None]:
+        """
+        Look up cached phrases for several texts.
+
+        Args:
+            texts: Review texts to look up
+            model: Model name used for extraction
+            prompt_version: Version of the extraction prompt
+
+        Returns:
+            List aligned with `texts`; entries are None on a cache miss
+        """
+        values = self._lookup([cache_key(text, model, prompt_version) for text in texts])
+        return [json.loads(value) if value is not None else None for value in values]
+
+    def get(self, text: str, model: str, prompt_version: str) -> list[str] | None:
+        """
+        Look up cached phrases for one text; None on a miss.
+        """
+        return self.get_many([text], model, prompt_version)[0]
+
+    def put_many(self, items: dict[str, list[str]], model: str, prompt_version: str) -> None:
+        """
+        Store extracted phrases for several texts, evicting old entries if the cache is too large.
+
+        Args:
+            items: Mapping of review text to extracted phrases
+            model: Model name used for extraction
+            prompt_version: Version of the extraction prompt
+        """
+        self._store([
+            (cache_key(text, model, prompt_version), json.dumps(phrases, ensure_ascii=False))
+            for text, phrases in items.items()
+        ])
+
+    def put(self, text: str, phrases: list[str], model: str, prompt_version: str) -> None:
+        """
+        Store extracted phrases for one text.
+        """
+        self.put_many({text: phrases}, model, prompt_version)
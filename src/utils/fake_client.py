@@ -0,0 +1,143 @@
+import json
+import random
+import re
+import threading
+import time
+import asyncio
+
+
+class FakeAPIError(Exception):
+    """
+    Error raised by the fake client; mirrors the `code` attribute of google.genai APIError.
+    """
+
+    def __init__(self, code: int, message: str = ""):
+        self.code = code
+        super().__init__(f"{code} {message}".strip())
+
+
+class FakeResponse:
+    """
+    Minimal stand-in for a Gemini GenerateContentResponse.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def fake_phrases(review_text: str) -> list[str]:
+    """
+    Deterministically derive topic phrases from a review: consecutive chunks of up to 4 words.
+    """
+    words = re.sub(r'[^\w\s]', ' ', review_text.lower()).split()
+    return [" ".join(words[i:i + 4]) for i in range(0, len(words), 4)]
+
+
+def fake_response_text(prompt: str) -> str:
+    """
+    Build the response a well-behaved model would give for one of our extraction prompts.
+    """
+    if "Reviews:" in prompt:
+        # batched prompt: one JSON object per line with "id" and "review"
+        results = {}
+        for line in prompt.split("Reviews:", 1)[1].strip().split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            results[str(item["id"])] = fake_phrases(item["review"])
+        return json.dumps(results)
+
+    # single-review prompt: review text is quoted after "Review:"
+    match = re.search(r'Review:\s*"(.*)"', prompt, flags=re.DOTALL)
+    review_text = match.group(1) if match else ""
+    return json.dumps(fake_phrases(review_text))
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self._owner = owner
+
+    def generate_content(self, model: str, contents: str) -> FakeResponse:
+        self._owner._begin()
+        try:
+            if self._owner.latency:
+                time.sleep(self._owner.latency)
+            return self._owner._respond(contents)
+        finally:
+            self._owner._end()
+
+
+class _FakeAsyncModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self._owner = owner
+
+    async def generate_content(self, model: str, contents: str) -> FakeResponse:
+        self._owner._begin()
+        try:
+            if self._owner.latency:
+                await asyncio.sleep(self._owner.latency)
+            return self._owner._respond(contents)
+        finally:
+            self._owner._end()
+
+
+class _FakeAio:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self.models = _FakeAsyncModels(owner)
+
+
+class FakeGeminiClient:
+    """
+    Offline, deterministic replacement for `google.genai.Client`.
+
+    Supports `client.models.generate_content` and `client.aio.models.generate_content`
+    with configurable latency, a random error rate and a simulated concurrency quota.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0,
+                 max_in_flight: int | None = None, seed: int = 0):
+        """
+        Initialize FakeGeminiClient.
+
+        Args:
+            latency: Seconds each request takes
+            error_rate: Probability that a request fails with a 503 error
+            max_in_flight: Requests beyond this many in flight fail with 429 (default: unlimited)
+            seed: Seed for the error generator
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_in_flight = max_in_flight
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _begin(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            over_quota = self.max_in_flight is not None and self.in_flight > self.max_in_flight
+            failed = self._random.random() < self.error_rate
+            if over_quota or failed:
+                self.errors += 1
+        if over_quota:
+            self._end()
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED")
+        if failed:
+            self._end()
+            raise FakeAPIError(503, "UNAVAILABLE")
+
+    def _end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _respond(self, contents: str) -> FakeResponse:
+        return FakeResponse(fake_response_text(contents))
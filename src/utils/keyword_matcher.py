@@ -0,0 +1,83 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton mapping text to the highest-priority label whose keyword occurs in it.
+
+    Labels are prioritized by their order in the keyword map, exactly like a
+    nested loop over `keyword_map.items()` returning the first label with a
+    keyword that is a substring of the text. Matching walks the text once,
+    so its cost does not grow with the number of keywords.
+    """
+
+    def __init__(self, keyword_map: dict[str, list[str]]):
+        """
+        Build the automaton.
+
+        Args:
+            keyword_map: Mapping of label to keywords, in priority order
+        """
+        self.labels = list(keyword_map.keys())
+
+        # Trie: goto transitions per node and the best (lowest) label index ending at each node
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[int | None] = [None]
+        for priority, keywords in enumerate(keyword_map.values()):
+            for keyword in keywords:
+                node = 0
+                for char in keyword:
+                    nxt = self._goto[node].get(char)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][char] = nxt
+                        self._goto.append({})
+                        self._out.append(None)
+                    node = nxt
+                if self._out[node] is None or priority < self._out[node]:
+                    self._out[node] = priority
+
+        # Failure links (BFS); each node's output also covers keywords ending at its suffixes
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                inherited = self._out[self._fail[child]]
+                if inherited is not None and (self._out[child] is None or inherited < self._out[child]):
+                    self._out[child] = inherited
+                queue.append(child)
+
+    def match(self, text: str) -> str | None:
+        """
+        Return the highest-priority label with a keyword occurring in `text`, or None.
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        # the root only has an output for an empty keyword, which matches every text
+        best = out[0]
+        node = 0
+        for char in text:
+            if best == 0:
+                break
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = out[node]
+            if found is not None and (best is None or found < best):
+                best = found
+
+        return self.labels[best] if best is not None else None
+
+    def match_many(self, texts: list[str]) -> list[str | None]:
+        """
+        Match several texts; results are aligned with `texts`.
+        """
+        return [self.match(text) for text in texts]
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metrics:
+    """
+    Thread-safe, in-process registry of stage timers, counters and latency histograms.
+
+    Recording is cheap (a lock and a few additions), so instrumentation is
+    always on; `report()` turns the raw numbers into the --profile JSON.
+    Worker processes keep their own registry, which is not merged back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop everything recorded so far.
+        """
+        with self._lock:
+            self.started = time.time()
+            self.stages: dict[str, list[float]] = {}
+            self.counters: dict[str, float] = {}
+            self.histograms: dict[str, dict] = {}
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """
+        Record one run of a stage taking `seconds` of wall time.
+        """
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                # count, total, min, max
+                self.stages[stage] = [1, seconds, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = min(entry[2], seconds)
+                entry[3] = max(entry[3], seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        Context manager recording the wall time of the enclosed block under `stage`.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        """
+        Add `amount` to a counter.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Add one sample (e.g. a request latency in seconds) to a histogram.
+        """
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)}
+                self.histograms[name] = hist
+            hist["count"] += 1
+            hist["sum"] += value
+            hist["max"] = max(hist["max"], value)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+                    break
+            else:
+                hist["buckets"][-1] += 1
+
+    @staticmethod
+    def _quantile(hist: dict, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it (capped at the maximum).
+        """
+        target = q * hist["count"]
+        seen = 0
+        for i, count in enumerate(hist["buckets"]):
+            seen += count
+            if seen >= target and count:
+                bound = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else hist["max"]
+                return round(min(bound, hist["max"]), 6)
+        return round(hist["max"], 6)
+
+    def report(self) -> dict:
+        """
+        Build the metrics report: stage times, counters, histograms, cache hit rates and throughput.
+        """
+        with self._lock:
+            stages = {
+                name: {
+                    "count": count,
+                    "total_s": round(total, 6),
+                    "mean_s": round(total / count, 6),
+                    "min_s": round(low, 6),
+                    "max_s": round(high, 6),
+                }
+                for name, (count, total, low, high) in sorted(self.stages.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+            histograms = {}
+            for name, hist in sorted(self.histograms.items()):
+                labels = [f"<={bound}" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}"]
+                histograms[name] = {
+                    "count": hist["count"],
+                    "mean": round(hist["sum"] / hist["count"], 6),
+                    "p50": self._quantile(hist, 0.5),
+                    "p95": self._quantile(hist, 0.95),
+                    "max": round(hist["max"], 6),
+                    "buckets": dict(zip(labels, hist["buckets"])),
+                }
+
+        # Hit rates for every "<cache>.hits" / "<cache>.misses" counter pair
+        hit_rates = {}
+        for name in counters:
+            if name.endswith(".hits"):
+                prefix = name[:-len(".hits")]
+                lookups = counters[name] + counters.get(f"{prefix}.misses", 0)
+                hit_rates[prefix] = round(counters[name] / lookups, 4) if lookups else 0.0
+
+        # Items per second for every "<stage>.items" counter with a matching stage timer
+        throughput = {}
+        for name, value in counters.items():
+            if name.endswith(".items"):
+                stage = name[:-len(".items")]
+                total = stages.get(stage, {}).get("total_s")
+                if total:
+                    throughput[f"{stage}.per_s"] = round(value / total, 2)
+
+        return {
+            "started_at": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "wall_s": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": counters,
+            "histograms": histograms,
+            "cache_hit_rates": hit_rates,
+            "throughput": throughput,
+        }
+
+    def write_report(self, path: str, extra: dict | None = None) -> dict:
+        """
+        Write the report (plus any `extra` sections) as JSON and return it.
+        """
+        data = self.report()
+        if extra:
+            data.update(extra)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        return data
+
+
+# Process-wide registry used by the pipeline modules
+metrics = Metrics()
@@ -1,16 +1,50 @@
+import hashlib
 import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from src.utils.metrics import metrics
 
-def clean_daily_reviews(input_path: str, output_path: str):
+# Name of the file in the output directory that records which raw files were cleaned
+CLEAN_MANIFEST = ".clean_manifest.json"
+
+# Regexes are compiled once at import time instead of once per review.
+# Using regex to match emoji patterns (Unicode ranges for emojis)
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"  # dingbats
+    "\U000024C2-\U0001F251"  # enclosed characters
+    "\U0001F900-\U0001F9FF"  # supplemental symbols and pictographs
+    "\U0001FA00-\U0001FA6F"  # chess symbols
+    "\U0001FA70-\U0001FAFF"  # symbols and pictographs extended-A
+    "\U00002600-\U000026FF"  # miscellaneous symbols
+    "\U00002700-\U000027BF"  # dingbats
+    "]+",
+    flags=re.UNICODE
+)
+NEWLINES_PATTERN = re.compile(r'\n+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def clean_daily_reviews(input_path: str, output_path: str, workers: int | None = None, force: bool = False):
     """
     Clean daily review files by processing text and standardizing format.
     
+    Raw files that are unchanged since the last run (same mtime and size,
+    or same content hash) are skipped. The remaining files are cleaned in
+    parallel across a process pool.
+    
     Args:
         input_path: Directory path containing input JSON files (e.g., 'data/raw')
         output_path: Directory path where cleaned JSON files will be saved (e.g., 'data/processed')
+        workers: Number of worker processes (default: CPU count; 1 = run in this process)
+        force: Clean every file even if it is unchanged (default: False)
     
     Returns:
         None
@@ -20,43 +54,139 @@ def clean_daily_reviews(input_path: str, output_path: str):
     
     # Get all JSON files in the input directory
     input_dir = Path(input_path)
-    json_files = list(input_dir.glob('*.json'))
+    json_files = sorted(input_dir.glob('*.json'))
+    
+    # Load record of previously cleaned files
+    manifest_path = Path(output_path) / CLEAN_MANIFEST
+    manifest = load_clean_manifest(manifest_path)
     
-    # Process each JSON file
+    # Work out which files changed since the last run
+    pending = []
     for json_file in json_files:
-        # Load reviews from the input file
-        with open(json_file, 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+        stat = json_file.stat()
+        entry = manifest.get(json_file.name)
+        output_exists = (Path(output_path) / json_file.name).exists()
         
-        # Clean each review
-        cleaned_reviews = []
-        for review in reviews:
-            # Extract text and score (map 'content' to 'text')
-            text = review.get('content') or review.get('text', '')
-            score = review.get('score')
-            
-            # Skip if text or score is missing
-            if not text or score is None:
+        if not force and entry and output_exists:
+            # Fast path: untouched file
+            if entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size:
                 continue
-            
-            # Clean the text
-            cleaned_text = clean_text(text)
-            
-            # Add cleaned review
-            cleaned_reviews.append({
-                'text': cleaned_text,
-                'score': score
-            })
-        
-        # Save cleaned reviews to output path with same filename
-        output_file = Path(output_path) / json_file.name
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_reviews, f, indent=2, ensure_ascii=False)
+            # Touched but identical content: refresh stat info only
+            if entry.get('sha256') == file_sha256(json_file):
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                continue
+        pending.append(json_file)
+    
+    # Clean changed files, in parallel when there is more than one
+    with metrics.timer("clean.files"):
+        if workers == 1 or len(pending) <= 1:
+            results = [clean_file(str(f), output_path) for f in pending]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(clean_file, [str(f) for f in pending], [output_path] * len(pending)))
+    metrics.incr("clean.files.items", len(pending))
+    metrics.incr("clean.files_skipped", len(json_files) - len(pending))
+    
+    for name, entry in results:
+        manifest[name] = entry
+    
+    save_clean_manifest(manifest_path, manifest)
+    print(f"Cleaned {len(pending)} files, skipped {len(json_files) - len(pending)} unchanged")
+
+
+def clean_file(json_file: str, output_path: str) -> tuple[str, dict]:
+    """
+    Clean one raw review file and write the result to the output directory.
+    
+    Args:
+        json_file: Path of the raw JSON file
+        output_path: Directory path where the cleaned file will be saved
+    
+    Returns:
+        Tuple of (file name, manifest entry describing the raw file)
+    """
+    json_file = Path(json_file)
+    stat = json_file.stat()
+    
+    # Load reviews from the input file, hashing the bytes for the manifest
+    with open(json_file, 'rb') as f:
+        content = f.read()
+    reviews = json.loads(content.decode('utf-8'))
+    
+    # Clean each review, dropping incomplete ones
+    cleaned_reviews = [cleaned for cleaned in map(clean_review, reviews) if cleaned is not None]
+    
+    # Save cleaned reviews compactly to output path with same filename (write then rename)
+    output_file = Path(output_path) / json_file.name
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cleaned_reviews, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, output_file)
+    
+    return json_file.name, {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': hashlib.sha256(content).hexdigest(),
+    }
+
+
+def clean_review(review: dict) -> dict | None:
+    """
+    Clean one raw review into the processed format.
+    
+    Args:
+        review: Raw review with 'content' (or 'text') and 'score'
+    
+    Returns:
+        Dictionary with cleaned 'text' and 'score', or None if either is missing
+    """
+    # Extract text and score (map 'content' to 'text')
+    text = review.get('content') or review.get('text', '')
+    score = review.get('score')
+    
+    # Skip if text or score is missing
+    if not text or score is None:
+        return None
+    
+    return {
+        'text': clean_text(text),
+        'score': score
+    }
+
+
+def file_sha256(path: Path) -> str:
+    """
+    Return the SHA-256 hex digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_clean_manifest(manifest_path: Path) -> dict:
+    """
+    Load the record of cleaned raw files, or an empty dict if there is none.
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_clean_manifest(manifest_path: Path, manifest: dict) -> None:
+    """
+    Save the record of cleaned raw files.
+    """
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
 
 
 def clean_text(text: str) -> str:
     """
-    Clean text by converting to lowercase, stripping whitespace, 
+    Clean text by converting to lowercase, stripping whitespace,
     removing repeated newlines, and replacing emojis with space.
     
     Args:
@@ -69,33 +199,15 @@ def clean_text(text: str) -> str:
     text = text.lower()
     
     # Replace emojis with space
-    # Using regex to match emoji patterns (Unicode ranges for emojis)
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002702-\U000027B0"  # dingbats
-        "\U000024C2-\U0001F251"  # enclosed characters
-        "\U0001F900-\U0001F9FF"  # supplemental symbols and pictographs
-        "\U0001FA00-\U0001FA6F"  # chess symbols
-        "\U0001FA70-\U0001FAFF"  # symbols and pictographs extended-A
-        "\U00002600-\U000026FF"  # miscellaneous symbols
-        "\U00002700-\U000027BF"  # dingbats
-        "]+",
-        flags=re.UNICODE
-    )
-    text = emoji_pattern.sub(' ', text)
+    text = EMOJI_PATTERN.sub(' ', text)
     
     # Remove repeated newlines (replace multiple newlines with single space)
-    text = re.sub(r'\n+', ' ', text)
+    text = NEWLINES_PATTERN.sub(' ', text)
     
     # Strip extra whitespace (replace multiple spaces with single space)
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_PATTERN.sub(' ', text)
     
     # Strip leading and trailing whitespace
     text = text.strip()
     
     return text
-
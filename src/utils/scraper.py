@@ -1,72 +1,300 @@
+import argparse
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from collections import defaultdict
+from types import SimpleNamespace
 from google_play_scraper import reviews, Sort
 
+from src.utils.metrics import metrics
 
-def fetch_and_save_reviews(package_id: str, save_path: str, max_reviews: int = 2000):
+# Name of the file in the save directory that holds pagination state per app
+STATE_FILE = ".scrape_state.json"
+
+# Reviews requested per page
+PAGE_SIZE = 200
+
+
+def to_utc(at: datetime) -> datetime:
+    """
+    Return `at` as an aware UTC datetime; naive times are taken to be UTC already.
+    """
+    if at.tzinfo is None:
+        return at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc)
+
+
+def parse_review_time(at) -> datetime | None:
+    """
+    Convert a review's 'at' field to an aware UTC datetime, or None if it cannot be parsed.
+    """
+    if isinstance(at, datetime):
+        return to_utc(at)
+    if isinstance(at, str):
+        # If it's a string, try to parse it
+        try:
+            return to_utc(datetime.fromisoformat(at.replace('Z', '+00:00')))
+        except (ValueError, AttributeError):
+            return None
+    return None
+
+
+def token_to_dict(token) -> dict | None:
+    """
+    Serialize a google_play_scraper continuation token to a JSON-safe dict.
+    """
+    if token is None or getattr(token, 'token', None) is None:
+        return None
+    return {
+        'token': token.token,
+        'lang': token.lang,
+        'country': token.country,
+        'sort': token.sort,
+        'count': token.count,
+        'filter_score_with': token.filter_score_with,
+        'filter_device_with': token.filter_device_with,
+    }
+
+
+def token_from_dict(data: dict | None):
+    """
+    Rebuild a continuation token accepted by `reviews()` from its serialized form.
+    """
+    if not data:
+        return None
+    # reviews() only reads these attributes, so a namespace stands in for the library's token class
+    return SimpleNamespace(**data)
+
+
+def load_scrape_state(save_path: str) -> dict:
+    """
+    Load pagination state for all apps scraped into `save_path`.
+    """
+    try:
+        with open(os.path.join(save_path, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_scrape_state(save_path: str, state: dict) -> None:
+    """
+    Save pagination state for all apps scraped into `save_path` (write then rename).
+    """
+    path = os.path.join(save_path, STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def merge_day_reviews(save_path: str, date_str: str, new_reviews: list[dict]) -> int:
+    """
+    Merge reviews into a day's JSON file, skipping review IDs that are already present.
+
+    Args:
+        save_path: Directory holding the day files
+        date_str: Date string in format YYYY-MM-DD
+        new_reviews: Reviews to add, each with a 'reviewId'
+
+    Returns:
+        Number of reviews actually added
+    """
+    filepath = os.path.join(save_path, f"{date_str}.json")
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            day_reviews = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        day_reviews = []
+
+    seen_ids = {review.get('reviewId') for review in day_reviews if review.get('reviewId')}
+    added = 0
+    for review in new_reviews:
+        review_id = review.get('reviewId')
+        if review_id and review_id in seen_ids:
+            continue
+        seen_ids.add(review_id)
+        day_reviews.append(review)
+        added += 1
+
+    if added:
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(day_reviews, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, filepath)
+    return added
+
+
+def load_app_state(state: dict, package_id: str) -> dict:
+    """
+    Return the pagination state of one app, upgrading the single-pass layout of older state files.
+
+    The state holds the high-water mark (newest review time ingested) and
+    a list of unfinished ranges, each a continuation token plus the time
+    to stop at.
     """
-    Fetch Google Play Store reviews and save them grouped by date.
-    
+    app_state = state.setdefault(package_id, {'high_water_mark': None, 'pending': []})
+    pending = app_state.get('pending')
+    if isinstance(pending, dict):
+        # Older files kept one pass whose newest review had not become the mark yet
+        newest = pending.get('newest')
+        mark = app_state.get('high_water_mark')
+        if newest and (mark is None or parse_review_time(newest) > parse_review_time(mark)):
+            app_state['high_water_mark'] = newest
+        pending = [{'token': pending['token'], 'stop_at': pending['stop_at']}] if pending.get('token') else []
+    app_state['pending'] = pending or []
+    return app_state
+
+
+def fetch_and_save_reviews(package_id: str, save_path: str, max_reviews: int = 2000,
+                           page_size: int = PAGE_SIZE, lang: str = 'en', country: str = 'in') -> int:
+    """
+    Incrementally fetch Google Play Store reviews and merge them into per-day files.
+
+    Reviews are paged newest first. Each page is merged into its day files
+    (deduplicated by review ID) as soon as it arrives, and the state is
+    saved after every page. Every call first runs a fresh pass from the
+    newest review down to the high-water mark (the newest review already
+    ingested), so new reviews keep arriving however much history is left.
+    Whatever remains of `max_reviews` then goes to unfinished ranges: parts
+    of earlier passes cut short by the budget, a crash or an empty page
+    (how `reviews()` reports a failed fetch), resumed from their saved
+    continuation tokens. An empty page ends the call. Review times are
+    compared in UTC.
+
     Args:
         package_id: The package ID of the app (e.g., 'com.example.app')
         save_path: Directory path where JSON files will be saved
-        max_reviews: Maximum number of reviews to fetch (default: 2000)
-    
+        max_reviews: Maximum number of reviews to fetch in this call (default: 2000)
+        page_size: Reviews requested per page (default: 200)
+        lang: Language code (default: 'en')
+        country: Country code (default: 'in')
+
     Returns:
-        None
+        Number of new reviews saved
     """
     # Create the directory if it does not exist
     os.makedirs(save_path, exist_ok=True)
-    
-    # Fetch reviews using google_play_scraper
-    result, continuation_token = reviews(
-        package_id,
-        lang='en',  # Language code
-        country='in',  # Country code
-        count=max_reviews,
-        sort=Sort.NEWEST
-    )
-    
-    # Group reviews by date
-    reviews_by_date = defaultdict(list)
-    
-    for review in result:
-        # Ignore reviews without 'at' or 'content'
-        if 'at' not in review or 'content' not in review:
-            continue
-        
-        # Extract fields: content, score, at (date)
-        content = review.get('content')
-        score = review.get('score')
-        at = review.get('at')
-        
-        # Convert date to YYYY-MM-DD format
-        if isinstance(at, datetime):
-            date_str = at.strftime('%Y-%m-%d')
-        elif isinstance(at, str):
-            # If it's a string, try to parse it
-            try:
-                date_obj = datetime.fromisoformat(at.replace('Z', '+00:00'))
-                date_str = date_obj.strftime('%Y-%m-%d')
-            except (ValueError, AttributeError):
-                continue
-        else:
-            continue
-        
-        # Add review to the date group
-        reviews_by_date[date_str].append({
-            'content': content,
-            'score': score,
-            'at': date_str
-        })
-    
-    # Save each day's reviews into separate JSON files
-    for date_str, day_reviews in reviews_by_date.items():
-        filename = f"{date_str}.json"
-        filepath = os.path.join(save_path, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(day_reviews, f, indent=2, ensure_ascii=False)
 
+    state = load_scrape_state(save_path)
+    app_state = load_app_state(state, package_id)
+
+    fetched = 0
+    added = 0
+
+    def run_range(entry: dict, fresh: bool) -> str:
+        """
+        Page through one range until it is complete ('complete'), the budget
+        runs out ('budget') or a page comes back empty ('failed').
+        """
+        nonlocal fetched, added
+        stop_at = parse_review_time(entry['stop_at']) if entry['stop_at'] else None
+
+        while fetched < max_reviews:
+            page_count = min(page_size, max_reviews - fetched)
+            token = token_from_dict(entry['token'])
+            if token is not None:
+                # reviews() takes the page size from the token when resuming
+                token.count = page_count
+
+            # Fetch one page using google_play_scraper
+            with metrics.timer("scrape.page"):
+                result, continuation_token = reviews(
+                    package_id,
+                    lang=lang,  # Language code
+                    country=country,  # Country code
+                    count=page_count,
+                    sort=Sort.NEWEST,
+                    continuation_token=token
+                )
+            fetched += len(result)
+            metrics.incr("scrape.page.items", len(result))
+
+            # Group reviews by date, stopping at the first already-ingested review
+            reviews_by_date = defaultdict(list)
+            reached_mark = False
+            newest = None
+
+            for review in result:
+                # Ignore reviews without 'at' or 'content'
+                if 'at' not in review or 'content' not in review:
+                    continue
+
+                at = parse_review_time(review.get('at'))
+                if at is None:
+                    continue
+
+                if stop_at is not None and at < stop_at:
+                    reached_mark = True
+                    break
+
+                newest = at if newest is None or at > newest else newest
+
+                # Convert date to YYYY-MM-DD format
+                date_str = at.strftime('%Y-%m-%d')
+
+                # Add review to the date group
+                reviews_by_date[date_str].append({
+                    'reviewId': review.get('reviewId'),
+                    'content': review.get('content'),
+                    'score': review.get('score'),
+                    'at': date_str
+                })
+
+            # Write the page before recording progress, so a crash re-fetches at most one page
+            for date_str, day_reviews in reviews_by_date.items():
+                day_added = merge_day_reviews(save_path, date_str, day_reviews)
+                metrics.incr("scrape.reviews_added", day_added)
+                added += day_added
+
+            if not result and not reached_mark:
+                # reviews() returns an empty page (and no token) when a fetch fails, which cannot be
+                # told apart from the end of the list; keep the range and its token and retry next run
+                print(f"Empty page for {package_id} before the high-water mark; the range resumes on the next run")
+                save_scrape_state(save_path, state)
+                return 'failed'
+
+            mark = app_state['high_water_mark']
+            if fresh and newest is not None and (mark is None or newest > parse_review_time(mark)):
+                # Everything above this pass's position is ingested; the rest is tracked as a range
+                app_state['high_water_mark'] = newest.isoformat()
+
+            next_token = token_to_dict(continuation_token)
+            if reached_mark or next_token is None:
+                # Range complete (reached its stop time, or a real last page)
+                app_state['pending'] = [other for other in app_state['pending'] if other is not entry]
+                save_scrape_state(save_path, state)
+                return 'complete'
+
+            entry['token'] = next_token
+            if not any(other is entry for other in app_state['pending']):
+                # A fresh pass cut short from here on is resumed like any other range
+                app_state['pending'].insert(0, entry)
+            save_scrape_state(save_path, state)
+        return 'budget'
+
+    # New reviews first: a fresh pass from the newest review down to the high-water mark
+    outcome = run_range({'token': None, 'stop_at': app_state['high_water_mark']}, fresh=True)
+
+    # Then the unfinished ranges of earlier passes, with what is left of the budget
+    while outcome == 'complete' and app_state['pending'] and fetched < max_reviews:
+        outcome = run_range(app_state['pending'][0], fresh=False)
+
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch Google Play reviews into per-day files")
+    parser.add_argument("package_id", type=str, help="Package ID of the app (e.g., com.example.app)")
+    parser.add_argument("--save-path", type=str, default=None,
+                        help="Directory for per-day review files (default: data/raw, or the app's raw directory "
+                             "with --app-layout)")
+    parser.add_argument("--app-layout", action="store_true",
+                        help="Save into the per-app layout, data/apps/<package_id>/raw")
+    parser.add_argument("--max-reviews", type=int, default=2000, help="Maximum number of reviews to fetch in this run")
+    args = parser.parse_args()
+
+    from src.utils.app_layout import app_paths
+    save_path = args.save_path or app_paths(args.package_id if args.app_layout else None)["raw"]
+    count = fetch_and_save_reviews(args.package_id, save_path, args.max_reviews)
+    print(f"Saved {count} new reviews to {save_path}")
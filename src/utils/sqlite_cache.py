@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.metrics import metrics
+
+# Default on-disk size limit before the least recently used entries are evicted
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Fraction of entries removed per eviction round
+EVICT_FRACTION = 0.1
+
+# Keys per SELECT, well below SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+
+class SQLiteCache:
+    """
+    Persistent key-value cache in one SQLite table with least-recently-used eviction.
+
+    The database runs in WAL mode with a busy timeout, so several worker
+    processes (each with their own cache object) can read and write it
+    concurrently. Within a process the connection is guarded by a lock and
+    may be shared across threads.
+
+    Subclasses set `table`, `value_column` and `metrics_prefix`, and encode
+    their keys and values around `_lookup` and `_store`.
+    """
+
+    table = ""
+    value_column = ""
+    value_type = "TEXT"
+    metrics_prefix = ""
+
+    def __init__(self, path: str, max_bytes: int = MAX_CACHE_BYTES):
+        """
+        Initialize SQLiteCache.
+
+        Args:
+            path: Path to the SQLite database file
+            max_bytes: Database size above which old entries are evicted (default: 256 MB)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f" key TEXT PRIMARY KEY,"
+            f" {self.value_column} {self.value_type} NOT NULL,"
+            f" accessed REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed)")
+
+    def _lookup(self, keys: list[str]) -> list:
+        """
+        Look up stored values and mark the hits as recently used.
+
+        Args:
+            keys: Cache keys to look up
+
+        Returns:
+            List aligned with `keys`; stored values, or None on a cache miss
+        """
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                # One transaction for all touches; in autocommit mode each UPDATE would commit (and sync) alone
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        f"UPDATE {self.table} SET accessed = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for item in results if item is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        metrics.incr(f"{self.metrics_prefix}.hits", hits)
+        metrics.incr(f"{self.metrics_prefix}.misses", len(results) - hits)
+        return results
+
+    def _store(self, rows: list[tuple]) -> None:
+        """
+        Insert or replace (key, value) rows in one transaction, then evict if the cache is too large.
+        """
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, {self.value_column}, accessed) VALUES (?, ?, ?)",
+                    [(key, value, now) for key, value in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def size_bytes(self) -> int:
+        """
+        Return the number of bytes used by live pages in the database.
+        """
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _evict(self) -> None:
+        """
+        Delete least recently used entries until the database fits in `max_bytes`.
+        """
+        while self.size_bytes() > self.max_bytes:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count == 0:
+                break
+            batch = max(1, int(count * EVICT_FRACTION))
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)", (batch,)
+            )
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters for this process and the size of the cache.
+        """
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            size = self.size_bytes()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
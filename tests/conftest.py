@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Make `src` and `benchmarks` importable when pytest is run from any directory
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
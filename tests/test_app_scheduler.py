@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from src.agents import async_extractor, topic_agent
+from src.agents.app_scheduler import run_apps, shard_apps
+from src.agents.async_extractor import SharedRateLimiter
+from src.utils.app_layout import app_paths
+from src.utils.fake_client import FakeGeminiClient
+
+APPS = {
+    "com.example.food": "delivery was late and the food arrived cold",
+    "com.example.shop": "price is too expensive and items missing",
+}
+
+
+def test_shard_apps_balances_by_weight():
+    weights = {"a.big": 100, "b.big": 90, "c.mid": 50, "d.small": 10, "e.small": 5}
+    shards = shard_apps(list(weights), 2, weights)
+    assert sorted(app for shard in shards for app in shard) == sorted(weights)
+    # Largest first, each to the lightest shard: the two big apps never share a worker
+    assert shards == [["a.big", "d.small", "e.small"], ["b.big", "c.mid"]]
+    # Never more shards than apps
+    assert shard_apps(["a.one"], 4, {"a.one": 1}) == [["a.one"]]
+
+
+@pytest.fixture
+def apps_root(monkeypatch, tmp_path):
+    # The per-app layout is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(topic_agent, "_client", FakeGeminiClient())
+    for package_id, text in APPS.items():
+        raw = app_paths(package_id)["raw"]
+        os.makedirs(raw)
+        for day in ("2024-06-01", "2024-06-02"):
+            reviews = [{"reviewId": f"{day}-{i}", "content": f"{text} {i}", "score": 2, "at": day} for i in range(10)]
+            with open(os.path.join(raw, f"{day}.json"), "w", encoding="utf-8") as f:
+                json.dump(reviews, f)
+    yield tmp_path
+    async_extractor.set_shared_limiter(None)
+
+
+def test_two_apps_produce_disjoint_outputs(apps_root):
+    results = run_apps(list(APPS), workers=1, concurrency=2, cache_path=None,
+                       rate_limit_path=str(apps_root / "rate_limit.sqlite"), cube_dir=str(apps_root / "cube"))
+    assert [result["app"] for result in results] == sorted(APPS)
+    assert all(result["days"] == 2 and not result["failed_days"] for result in results)
+
+    food, shop = app_paths("com.example.food"), app_paths("com.example.shop")
+    for key in ("processed", "counts", "trend_store", "analytics_state", "trend_csv", "topic_memory", "proposals"):
+        assert food[key] != shop[key]
+    for paths in (food, shop):
+        assert os.path.exists(paths["trend_csv"]) and os.path.exists(paths["analytics_state"])
+
+    with open(food["trend_csv"], encoding="utf-8") as f:
+        food_topics = {line.split(",")[0] for line in f.read().splitlines()[1:]}
+    with open(shop["trend_csv"], encoding="utf-8") as f:
+        shop_topics = {line.split(",")[0] for line in f.read().splitlines()[1:]}
+    assert food_topics == {"delivery delay", "food cold"}
+    assert shop_topics == {"pricing", "missing items"}
+
+
+def test_shared_limiter_caps_combined_rate(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(async_extractor.time, "time", lambda: clock[0])
+    path = str(tmp_path / "rate_limit.sqlite")
+    # Two limiters on one file stand in for two worker processes
+    first = SharedRateLimiter(path, rpm=60, tpm=1_000_000)
+    second = SharedRateLimiter(path, rpm=60, tpm=1_000_000)
+
+    granted = sum(limiter._take({"requests": 1, "tokens": 10}) == 0 for limiter in [first, second] * 40)
+    assert granted == 60
+
+    # One request per second refills, shared by both
+    clock[0] += 2.0
+    granted = sum(limiter._take({"requests": 1, "tokens": 10}) == 0 for limiter in [second, first] * 5)
+    assert granted == 2
+    assert first._take({"requests": 1, "tokens": 10}) == pytest.approx(1.0)
+    first.close()
+    second.close()
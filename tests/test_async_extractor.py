@@ -0,0 +1,100 @@
+import asyncio
+import json
+import random
+import time
+
+import pytest
+
+from src.agents import topic_agent
+from src.agents.async_extractor import AdaptiveConcurrency, AsyncExtractor
+from src.agents.daily_topic_processor import process_day
+from src.utils.fake_client import FakeGeminiClient
+
+WORDS = ["delivery", "was", "late", "food", "arrived", "cold", "too", "expensive", "missing", "items",
+         "good", "quality", "small", "portion", "no", "coupon", "price", "stale", "tasty", "slow"]
+
+
+def make_texts(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))) for _ in range(n)]
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeGeminiClient()
+    monkeypatch.setattr(topic_agent, "_client", client)
+    return client
+
+
+def test_rate_limit_holds_across_extract_calls(fake_client):
+    # 600 RPM = 10 requests/s with a burst of 600; one request per review
+    extractor = AsyncExtractor(client=fake_client, concurrency=8, rpm=600, max_batch_size=1)
+    started = time.monotonic()
+    for seed in range(3):
+        extractor.extract([f"{text} {seed}-{i}" for i, text in enumerate(make_texts(205, seed))])
+    elapsed = time.monotonic() - started
+
+    # 615 requests against one bucket: the 15 beyond the burst need ~1.5s of refill
+    assert extractor.requests == 615
+    assert elapsed >= 1.2
+
+
+def test_adaptive_limit_carries_over_between_calls(fake_client):
+    extractor = AsyncExtractor(client=fake_client, concurrency=8, max_batch_size=1)
+    extractor.extract(make_texts(10))
+    assert extractor._slots.limit == 8
+
+    # Backed off in an earlier call; 10 successes at 5 per step add exactly 2 in the next call
+    extractor._slots.limit = 2
+    extractor._slots._successes = 0
+    extractor._slots.increase_after = 5
+    requests = extractor.requests
+    extractor.extract([f"{text} {i}" for i, text in enumerate(make_texts(10, seed=1))])
+    assert extractor.requests - requests == 10
+    assert extractor._slots.limit == 4
+
+
+def test_aimd_limit_sequence():
+    async def run(slots, outcomes):
+        slots.bind()
+        limits = []
+        for quota_error in outcomes:
+            await slots.acquire()
+            await slots.release(quota_error)
+            limits.append(slots.limit)
+        return limits
+
+    # Multiplicative decrease on every 429, floored at min_limit
+    slots = AdaptiveConcurrency(8, max_limit=10, increase_after=3)
+    assert asyncio.run(run(slots, [True] * 5)) == [4, 2, 1, 1, 1]
+
+    # Additive increase: +1 per 3 consecutive successes, up to the ceiling
+    assert asyncio.run(run(slots, [False] * 9)) == [1, 1, 2, 2, 2, 3, 3, 3, 4]
+    assert asyncio.run(run(slots, [False] * 24))[2::3] == [5, 6, 7, 8, 9, 10, 10, 10]
+
+    # An error resets the success streak
+    assert asyncio.run(run(slots, [False, False, True, False, False, False])) == [10, 10, 5, 5, 5, 6]
+
+    # By default the ceiling is the starting limit: AIMD only backs off and recovers
+    slots = AdaptiveConcurrency(4, increase_after=1)
+    assert asyncio.run(run(slots, [True, False, False, False, False])) == [2, 3, 4, 4, 4]
+
+
+def test_extractor_concurrency_ceiling():
+    assert AsyncExtractor(concurrency=4)._slots.max_limit == 4
+    slots = AsyncExtractor(concurrency=4, max_concurrency=16)._slots
+    assert (slots.limit, slots.max_limit) == (4, 16)
+    assert AsyncExtractor(concurrency=4, max_concurrency=2)._slots.max_limit == 4
+
+
+def test_async_counts_match_sequential(fake_client, tmp_path):
+    rng = random.Random(1)
+    reviews = [{"text": text, "score": rng.randint(1, 5)} for text in make_texts(400)]
+    reviews += reviews[:50]
+    with open(tmp_path / "2024-06-01.json", "w", encoding="utf-8") as f:
+        json.dump(reviews, f)
+
+    sequential = process_day("2024-06-01", str(tmp_path), concurrency=0, cache_path=None, counts_dir=None)
+    concurrent = process_day("2024-06-01", str(tmp_path), concurrency=4, cache_path=None, counts_dir=None)
+    assert sum(sequential.values()) > 0
+    assert concurrent == sequential
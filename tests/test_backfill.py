@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from src.agents import backfill as backfill_module
+from src.agents import daily_topic_processor, topic_agent
+from src.agents.backfill import backfill, date_range
+from src.utils.fake_client import FakeGeminiClient
+
+DATES = date_range("2024-06-01", "2024-06-04")
+
+
+@pytest.fixture
+def days(monkeypatch, tmp_path):
+    monkeypatch.setattr(topic_agent, "_client", FakeGeminiClient())
+    input_dir = tmp_path / "processed"
+    input_dir.mkdir()
+    for n, date_str in enumerate(DATES):
+        reviews = [{"text": f"delivery was late {i} and food cold", "score": 1 + (i + n) % 5} for i in range(20)]
+        with open(input_dir / f"{date_str}.json", "w", encoding="utf-8") as f:
+            json.dump(reviews, f)
+    return str(input_dir), str(tmp_path / "counts")
+
+
+def spy_pipeline(monkeypatch, interrupt_on=None):
+    processed = []
+
+    def run_day_pipeline(date_str, *args):
+        if date_str == interrupt_on:
+            raise KeyboardInterrupt
+        processed.append(date_str)
+        return daily_topic_processor.run_day_pipeline(date_str, *args)
+
+    monkeypatch.setattr(backfill_module, "run_day_pipeline", run_day_pipeline)
+    return processed
+
+
+def run(input_dir, counts_dir, dates=DATES):
+    return backfill(dates, input_dir, counts_dir, workers=1, concurrency=2, cache_path=None, store_dir=None,
+                    cube_dir=None)
+
+
+def test_resume_after_interrupt_skips_completed_days(days, monkeypatch):
+    input_dir, counts_dir = days
+    processed = spy_pipeline(monkeypatch, interrupt_on=DATES[2])
+    with pytest.raises(KeyboardInterrupt):
+        run(input_dir, counts_dir)
+    assert processed == DATES[:2]
+
+    processed = spy_pipeline(monkeypatch)
+    results = run(input_dir, counts_dir)
+    assert processed == DATES[2:]
+    assert list(results) == DATES
+    assert all(counts == {"delivery delay": 20, "food cold": 20} for counts in results.values())
+
+    # Nothing is left to do on a third run
+    processed = spy_pipeline(monkeypatch)
+    assert run(input_dir, counts_dir) == results
+    assert processed == []
+
+
+def test_dates_without_input_are_skipped_not_failed(days, monkeypatch, capsys):
+    input_dir, counts_dir = days
+    processed = spy_pipeline(monkeypatch)
+    results = run(input_dir, counts_dir, DATES + ["2024-06-05"])
+    output = capsys.readouterr().out
+
+    assert list(results) == DATES
+    assert "2024-06-05" not in processed
+    assert "0 failed" in output
+    assert "Skipped days without an input file: 2024-06-05" in output
@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+from src.agents import daily_topic_processor, day_counts, topic_agent, trend_builder
+from src.agents.backfill import date_range
+from src.agents.daily_topic_processor import pipeline_config
+from src.agents.topic_classifier import CONFIDENCE_MARGIN, MAX_WORDS
+from src.agents.topic_memory import EMBEDDING_MODEL
+from src.agents.trend_builder import build_trend_table
+from src.utils.fake_client import FakeGeminiClient
+
+DATES = date_range("2024-06-01", "2024-06-04")
+
+
+def write_day(input_dir, date_str, texts):
+    with open(os.path.join(input_dir, f"{date_str}.json"), "w", encoding="utf-8") as f:
+        json.dump([{"text": text, "score": 2} for text in texts], f)
+
+
+@pytest.fixture
+def days(monkeypatch, tmp_path):
+    client = FakeGeminiClient()
+    monkeypatch.setattr(topic_agent, "_client", client)
+    input_dir = tmp_path / "processed"
+    input_dir.mkdir()
+    for date_str in DATES:
+        write_day(input_dir, date_str, [f"delivery was late {i} and food cold" for i in range(5)])
+    return str(input_dir), str(tmp_path / "counts"), client
+
+
+def spy_process_day(monkeypatch):
+    recomputed = []
+    process_day = trend_builder.process_day
+
+    def spy(date_str, *args, **kwargs):
+        recomputed.append(date_str)
+        return process_day(date_str, *args, **kwargs)
+
+    monkeypatch.setattr(trend_builder, "process_day", spy)
+    return recomputed
+
+
+def build(input_dir, counts_dir, **kwargs):
+    return build_trend_table(DATES, input_dir=input_dir, counts_dir=counts_dir, cache_path=None, store_dir=None,
+                             cube_dir=None, **kwargs)
+
+
+def test_editing_one_day_recomputes_only_that_day(days, monkeypatch):
+    input_dir, counts_dir, client = days
+    recomputed = spy_process_day(monkeypatch)
+    build(input_dir, counts_dir)
+    assert recomputed == DATES
+    manifest = day_counts.load_manifest(counts_dir)
+    updated = {date_str: entry["input_hash"] for date_str, entry in manifest.items()}
+
+    # Rerunning with unchanged inputs sends nothing to the LLM
+    recomputed.clear()
+    calls = client.calls
+    build(input_dir, counts_dir)
+    assert recomputed == []
+    assert client.calls == calls
+
+    write_day(input_dir, DATES[2], ["the app keeps crashing", "delivery was late again"])
+    recomputed.clear()
+    df = build(input_dir, counts_dir)
+    assert recomputed == [DATES[2]]
+    assert df[DATES[2]].to_dict() == {"delivery delay": 1, "food cold": 0}
+    assert df[DATES[1]].to_dict() == {"delivery delay": 5, "food cold": 5}
+
+    manifest = day_counts.load_manifest(counts_dir)
+    assert manifest[DATES[2]]["input_hash"] == day_counts.hash_file(os.path.join(input_dir, f"{DATES[2]}.json"))
+    assert manifest[DATES[2]]["input_hash"] != updated[DATES[2]]
+    assert all(manifest[d]["input_hash"] == updated[d] for d in DATES if d != DATES[2])
+
+
+def test_config_change_or_missing_score_split_recomputes(days, monkeypatch):
+    input_dir, counts_dir, _ = days
+    recomputed = spy_process_day(monkeypatch)
+    build(input_dir, counts_dir)
+
+    # Days stored before the split by star rating existed are recomputed once
+    os.remove(day_counts.score_counts_path(DATES[0], counts_dir))
+    recomputed.clear()
+    build(input_dir, counts_dir)
+    assert recomputed == [DATES[0]]
+
+    # A setting the counts depend on invalidates every day
+    recomputed.clear()
+    build(input_dir, counts_dir, dedup_threshold=0.8)
+    assert recomputed == DATES
+
+
+def test_load_fresh_day_counts_checks_input_hash_and_config(days):
+    input_dir, counts_dir, _ = days
+    input_path = os.path.join(input_dir, f"{DATES[0]}.json")
+    config = pipeline_config()
+    day_counts.save_day_counts(DATES[0], {"food cold": 1}, day_counts.hash_file(input_path), config, counts_dir,
+                               reviews=5, score_counts={"food cold": {"2": 1}})
+
+    assert day_counts.load_fresh_day_counts(DATES[0], input_path, config, counts_dir) == {"food cold": 1}
+    assert day_counts.load_fresh_day_counts(DATES[0], input_path, {**config, "model": "other"}, counts_dir) is None
+    assert day_counts.load_fresh_day_counts(DATES[0], os.path.join(input_dir, "missing.json"), config,
+                                            counts_dir) is None
+    write_day(input_dir, DATES[0], ["food cold"])
+    assert day_counts.load_fresh_day_counts(DATES[0], input_path, config, counts_dir) is None
+
+
+def test_pipeline_config_does_not_build_the_classifier(monkeypatch):
+    monkeypatch.setattr(daily_topic_processor, "_classifier", None)
+    config = pipeline_config(cascade_threshold=0.7, dedup_threshold=0.8)
+
+    assert daily_topic_processor._classifier is None
+    assert config["cascade"] == {"model": EMBEDDING_MODEL, "threshold": 0.7, "margin": CONFIDENCE_MARGIN,
+                                 "max_words": MAX_WORDS}
+    assert config["dedup"] == 0.8
+    assert pipeline_config()["cascade"] is None
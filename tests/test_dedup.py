@@ -0,0 +1,96 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from src.agents import topic_agent
+from src.agents.daily_topic_processor import process_day
+from src.utils.dedup import (SHINGLE_SIZE, collapse_texts, dedup_key, group_near_duplicates, lsh_params,
+                             minhash_signatures)
+from src.utils.fake_client import FakeGeminiClient
+
+WORDS = ["delivery", "was", "late", "food", "arrived", "cold", "too", "expensive", "missing", "items",
+         "good", "quality", "small", "portion", "no", "coupon", "price", "stale", "tasty", "slow",
+         "driver", "rude", "refund", "app", "crashed", "order", "wrong", "packaging", "leaked", "again"]
+
+
+def make_texts(n, seed=0, words=(10, 20)):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(*words))) for _ in range(n)]
+
+
+def shingles(key):
+    data = key.encode("utf-8")
+    if len(data) < SHINGLE_SIZE:
+        return {data.ljust(SHINGLE_SIZE, b"\0")}
+    return {data[i:i + SHINGLE_SIZE] for i in range(len(data) - SHINGLE_SIZE + 1)}
+
+
+def test_minhash_estimates_jaccard():
+    base = make_texts(50, seed=1)
+    edited = [text[:len(text) // 2] + " refund " + text[len(text) // 2:] for text in base]
+    signatures = minhash_signatures([dedup_key(t) for t in base + edited], num_perm=256)
+    for i in range(len(base)):
+        a, b = shingles(dedup_key(base[i])), shingles(dedup_key(edited[i]))
+        exact = len(a & b) / len(a | b)
+        estimate = (signatures[i] == signatures[len(base) + i]).mean()
+        assert estimate == pytest.approx(exact, abs=0.15)
+
+
+def test_lsh_banding_reaches_recall_at_threshold():
+    for threshold in (0.5, 0.7, 0.8, 0.9):
+        bands, rows = lsh_params(threshold)
+        assert bands * rows <= 64
+        assert 1 - (1 - threshold ** rows) ** bands >= 0.95
+
+
+def test_planted_near_duplicates_collapse():
+    rng = random.Random(2)
+    base = make_texts(200, seed=3)
+    texts, origin = [], []
+    for i, text in enumerate(base):
+        texts.append(text)
+        origin.append(i)
+        # Two variants per review: changed case and punctuation, and one extra word at the end
+        texts.append(text.upper() + "!!")
+        origin.append(i)
+        texts.append(text + " " + rng.choice(WORDS))
+        origin.append(i)
+
+    representatives = group_near_duplicates(texts, threshold=0.8)
+    # No group mixes two different base reviews
+    for i, rep in enumerate(representatives):
+        assert origin[rep] == origin[i]
+    unique_texts, groups = collapse_texts(texts, threshold=0.8)
+    assert len(unique_texts) <= len(base) * 1.05
+    assert [unique_texts[g] for g in groups] == [texts[rep] for rep in representatives]
+
+
+def test_distinct_texts_are_not_collapsed():
+    texts = list(dict.fromkeys(make_texts(300, seed=4)))
+    unique_texts, groups = collapse_texts(texts, threshold=0.8)
+    assert len(unique_texts) >= len(texts) * 0.95
+
+
+def test_exact_threshold_only_merges_normalized_duplicates():
+    texts = ["Late delivery!", "late   delivery", "late delivery again", "LATE DELIVERY"]
+    assert group_near_duplicates(texts, threshold=1.0) == [0, 0, 2, 0]
+
+
+def test_process_day_counts_match_with_dedup(monkeypatch, tmp_path):
+    client = FakeGeminiClient()
+    monkeypatch.setattr(topic_agent, "_client", client)
+    rng = random.Random(5)
+    texts = make_texts(150, seed=6, words=(3, 12))
+    reviews = [{"text": text, "score": rng.randint(1, 5)} for text in texts]
+    reviews += [{"text": text.title() + ".", "score": 3} for text in texts[:60]]
+    with open(tmp_path / "2024-06-01.json", "w", encoding="utf-8") as f:
+        json.dump(reviews, f)
+
+    plain = process_day("2024-06-01", str(tmp_path), cache_path=None, counts_dir=None)
+    calls = client.calls
+    deduped = process_day("2024-06-01", str(tmp_path), cache_path=None, counts_dir=None, dedup_threshold=1.0)
+    assert deduped == plain
+    # Case and punctuation variants share one extraction
+    assert client.calls - calls < calls
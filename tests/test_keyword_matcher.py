@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from src.agents import daily_topic_processor as dtp
+from src.utils.keyword_matcher import KeywordMatcher
+
+
+def naive_match(keyword_map, text):
+    for label, keywords in keyword_map.items():
+        if any(keyword in text for keyword in keywords):
+            return label
+    return None
+
+
+def test_matches_naive_first_label_loop():
+    rng = random.Random(0)
+    alphabet = "abc de"
+    keyword_map = {
+        f"label{i}": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 4))]
+        for i in range(12)
+    }
+    matcher = KeywordMatcher(keyword_map)
+    texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))) for _ in range(2000)]
+
+    expected = [naive_match(keyword_map, text) for text in texts]
+    assert [matcher.match(text) for text in texts] == expected
+    assert matcher.match_many(texts) == expected
+
+
+def test_overlapping_and_word_boundary_keywords_match_naive_loop():
+    rng = random.Random(1)
+    words = ["cold", "scold", "old", "colder", "food", "foo", "late", "plate", "slate", "a", "at"]
+    pieces = words + [" ", "  "]
+    # Keywords nest inside each other and inside longer words, span word gaps, or carry edge spaces
+    fixed = [["old"], ["cold"], ["scold"], ["late", "plate"], ["food cold", "d c"], [" a ", "at "],
+             [" foo", "food"], ["cold cold", "old c"], ["a"], ["colder"]]
+    for _ in range(50):
+        order = list(fixed)
+        rng.shuffle(order)
+        keyword_map = {f"label{i}": keywords for i, keywords in enumerate(order)}
+        keyword_map["random"] = [" ".join(rng.sample(words, rng.randint(1, 2))) for _ in range(3)]
+        matcher = KeywordMatcher(keyword_map)
+        texts = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 8))) for _ in range(200)]
+        texts += [keyword for keywords in keyword_map.values() for keyword in keywords]
+
+        expected = [naive_match(keyword_map, text) for text in texts]
+        assert [matcher.match(text) for text in texts] == expected
+        assert matcher.match_many(texts) == expected
+
+    # Plain substring semantics, like the loop it replaced: keywords also match inside words
+    matcher = KeywordMatcher({"temperature": ["cold"], "delay": ["late"]})
+    assert matcher.match_many(["she scolded me", "chocolate", "cola", "late cold", "", " "]) == \
+        ["temperature", "delay", None, "temperature", None, None]
+
+
+def test_topic_map_paths_agree_with_naive_loop():
+    # overlapping keywords ("not good" / "good", "cold" / "food arrived cold") resolve by TOPIC_MAP order
+    texts = ["too expensive and late", "food arrived cold", "not good at all", "portion was small",
+             "no coupon and missing items", "nothing relevant", ""]
+    expected = [naive_match(dtp.TOPIC_MAP, t) for t in texts]
+    assert dtp.normalize_topics(texts) == expected
+    assert [dtp.normalize_topic(t) for t in texts] == expected
+
+
+@pytest.fixture
+def topic_map_edit():
+    saved = {topic: list(keywords) for topic, keywords in dtp.TOPIC_MAP.items()}
+    yield dtp.TOPIC_MAP
+    dtp.TOPIC_MAP.clear()
+    dtp.TOPIC_MAP.update(saved)
+    dtp.rebuild_topic_matcher()
+
+
+def test_update_topic_map_is_seen_by_both_paths(topic_map_edit):
+    dtp.normalize_topic("warm up the matcher")
+    dtp.update_topic_map("app crash", ["crash", "freezes"])
+
+    assert dtp.normalize_topic("the app freezes") == "app crash"
+    assert dtp.normalize_topics(["the app freezes"]) == ["app crash"]
+
+
+def test_in_place_edits_are_seen_after_rebuild_or_verify(topic_map_edit):
+    dtp.normalize_topic("warm up the matcher")
+    topic_map_edit["app crash"] = ["crash"]
+    dtp.rebuild_topic_matcher()
+    assert dtp.normalize_topic("the app crash") == "app crash"
+
+    # Batch callers verify the map contents once per day
+    topic_map_edit["app crash"].append("freezes")
+    counts = dtp.count_day_topics("2024-06-01", [["the app freezes"]], "hash", counts_dir=None)
+    assert counts == {"app crash": 1}
+
+
+def test_repeated_lookups_do_not_rehash_topic_map(topic_map_edit, monkeypatch):
+    dtp.get_topic_matcher()
+    hashes = []
+    monkeypatch.setattr(dtp, "topic_map_version", lambda: hashes.append(1) or "unused")
+
+    for _ in range(100):
+        dtp.normalize_topic("too expensive")
+    dtp.normalize_topics(["too expensive"] * 10)
+    assert hashes == []
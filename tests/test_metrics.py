@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from src.utils import metrics as metrics_module
+from src.utils.metrics import LATENCY_BUCKETS, Metrics
+
+
+@pytest.fixture
+def registry():
+    registry = Metrics()
+    for seconds in (2.0, 0.5, 1.5):
+        registry.add_time("clean.files", seconds)
+    registry.add_time("extract", 4.0)
+    registry.incr("clean.files.items", 12)
+    registry.incr("extract.items", 3)
+    registry.incr("orphan.items", 5)
+    registry.incr("cache.hits", 3)
+    registry.incr("cache.misses")
+    registry.incr("cold.misses", 4)
+    registry.incr("empty.hits", 0)
+    for value in (0.01, 0.02, 0.07, 0.3, 0.3, 0.4, 0.9, 2.0, 7.0, 45.0):
+        registry.observe("llm.latency_s", value)
+    return registry
+
+
+def test_report_stages_counters_and_histograms(registry):
+    report = registry.report()
+
+    assert report["stages"]["clean.files"] == {"count": 3, "total_s": 4.0, "mean_s": round(4.0 / 3, 6),
+                                               "min_s": 0.5, "max_s": 2.0}
+    assert report["counters"]["cache.hits"] == 3
+    assert list(report["counters"]) == sorted(report["counters"])
+
+    hist = report["histograms"]["llm.latency_s"]
+    assert hist["count"] == 10
+    assert hist["mean"] == pytest.approx(5.6)
+    assert hist["max"] == 45.0
+    assert list(hist["buckets"].values()) == [2, 1, 0, 3, 1, 1, 0, 1, 0, 1]
+    assert list(hist["buckets"])[-1] == f">{LATENCY_BUCKETS[-1]}"
+    # 5th of 10 samples falls in the <=0.5 bucket, the 10th (95%) in the open-ended one, capped at the max
+    assert hist["p50"] == 0.5
+    assert hist["p95"] == 45.0
+    json.dumps(report)
+
+
+def test_hit_rates_and_throughput(registry):
+    report = registry.report()
+
+    assert report["cache_hit_rates"] == {"cache": 0.75, "empty": 0.0}
+    # items / total stage seconds; items without a stage timer get no throughput
+    assert report["throughput"] == {"clean.files.per_s": 3.0, "extract.per_s": 0.75}
+
+
+def test_quantile_caps_at_max_and_skips_empty_buckets():
+    hist = {"count": 4, "max": 0.3, "buckets": [0, 1, 0, 3] + [0] * (len(LATENCY_BUCKETS) - 3)}
+    assert Metrics._quantile(hist, 0.25) == 0.1
+    assert Metrics._quantile(hist, 0.5) == 0.3
+    assert Metrics._quantile(hist, 1.0) == 0.3
+    assert Metrics._quantile({"count": 0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)}, 0.5) == 0.0
+
+
+def test_timer_records_wall_time_and_reset(monkeypatch, tmp_path):
+    clock = iter([10.0, 12.5, 20.0, 20.25])
+    monkeypatch.setattr(metrics_module.time, "perf_counter", lambda: next(clock))
+    registry = Metrics()
+    with registry.timer("stage"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.timer("stage"):
+            raise ValueError
+    assert registry.report()["stages"]["stage"] == {"count": 2, "total_s": 2.75, "mean_s": 1.375,
+                                                    "min_s": 0.25, "max_s": 2.5}
+
+    written = registry.write_report(str(tmp_path / "profile" / "report.json"), {"mode": "trend"})
+    with open(tmp_path / "profile" / "report.json", encoding="utf-8") as f:
+        assert json.load(f) == written
+    assert written["mode"] == "trend"
+
+    registry.reset()
+    report = registry.report()
+    assert report["stages"] == report["counters"] == report["histograms"] == {}
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from src.utils import preprocess
+from src.utils.preprocess import CLEAN_MANIFEST, clean_daily_reviews
+
+DATES = ["2024-06-01", "2024-06-02", "2024-06-03"]
+
+
+def write_raw(raw_dir, date_str, texts):
+    with open(raw_dir / f"{date_str}.json", "w", encoding="utf-8") as f:
+        json.dump([{"content": text, "score": 3} for text in texts], f)
+
+
+def read_processed(processed_dir, date_str):
+    with open(processed_dir / f"{date_str}.json", "r", encoding="utf-8") as f:
+        return [review["text"] for review in json.load(f)]
+
+
+@pytest.fixture
+def raw_days(tmp_path):
+    raw_dir, processed_dir = tmp_path / "raw", tmp_path / "processed"
+    raw_dir.mkdir()
+    for date_str in DATES:
+        write_raw(raw_dir, date_str, [f"Late  Delivery on {date_str}\n\n😀", "Food was COLD"])
+    return raw_dir, processed_dir
+
+
+def spy_clean_file(monkeypatch):
+    cleaned = []
+    clean_file = preprocess.clean_file
+
+    def spy(json_file, output_path):
+        cleaned.append(os.path.basename(json_file))
+        return clean_file(json_file, output_path)
+
+    monkeypatch.setattr(preprocess, "clean_file", spy)
+    return cleaned
+
+
+def test_second_run_skips_unchanged_and_recleans_modified(raw_days, monkeypatch):
+    raw_dir, processed_dir = raw_days
+    cleaned = spy_clean_file(monkeypatch)
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=1)
+    assert cleaned == [f"{d}.json" for d in DATES]
+    assert read_processed(processed_dir, DATES[0]) == ["late delivery on 2024-06-01", "food was cold"]
+
+    cleaned.clear()
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=1)
+    assert cleaned == []
+
+    write_raw(raw_dir, DATES[1], ["App CRASHES"])
+    cleaned.clear()
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=1)
+    assert cleaned == [f"{DATES[1]}.json"]
+    assert read_processed(processed_dir, DATES[1]) == ["app crashes"]
+
+    # Forcing cleans everything again
+    cleaned.clear()
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=1, force=True)
+    assert cleaned == [f"{d}.json" for d in DATES]
+
+
+def test_touched_identical_file_is_skipped_and_missing_output_recleaned(raw_days, monkeypatch):
+    raw_dir, processed_dir = raw_days
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=1)
+    cleaned = spy_clean_file(monkeypatch)
+
+    touched = raw_dir / f"{DATES[0]}.json"
+    stat = touched.stat()
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    os.remove(processed_dir / f"{DATES[2]}.json")
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=1)
+    assert cleaned == [f"{DATES[2]}.json"]
+
+    # The touched file's new mtime is recorded, so the next run takes the fast path
+    with open(processed_dir / CLEAN_MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest[touched.name]["mtime_ns"] == touched.stat().st_mtime_ns
+
+
+def test_parallel_run_matches_sequential(raw_days, tmp_path, capsys):
+    raw_dir, processed_dir = raw_days
+    sequential_dir = tmp_path / "sequential"
+    clean_daily_reviews(str(raw_dir), str(sequential_dir), workers=1)
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=2)
+    assert all(read_processed(processed_dir, d) == read_processed(sequential_dir, d) for d in DATES)
+
+    write_raw(raw_dir, DATES[0], ["changed"])
+    write_raw(raw_dir, DATES[2], ["changed too"])
+    capsys.readouterr()
+    clean_daily_reviews(str(raw_dir), str(processed_dir), workers=2)
+    assert "Cleaned 2 files, skipped 1 unchanged" in capsys.readouterr().out
+    assert read_processed(processed_dir, DATES[0]) == ["changed"]
+    assert read_processed(processed_dir, DATES[2]) == ["changed too"]
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import scraper
+
+
+class FakeStore:
+    """
+    Stands in for google_play_scraper.reviews over an in-memory list, newest first.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+        self.fail_calls = set()
+
+    def reviews(self, package_id, lang, country, count, sort, continuation_token=None):
+        offset = continuation_token.token if continuation_token is not None else 0
+        self.calls.append(offset)
+        if len(self.calls) in self.fail_calls:
+            # the library swallows fetch errors and returns an empty page without a token
+            return [], None
+        page = self.items[offset:offset + count]
+        end = offset + len(page)
+        token = SimpleNamespace(token=end if end < len(self.items) else None, lang=lang, country=country,
+                                sort=sort, count=count, filter_score_with=None, filter_device_with=None)
+        return page, token
+
+
+def make_reviews(start, n, prefix="r"):
+    # newest first, one hour apart
+    return [
+        {"reviewId": f"{prefix}{i}", "content": f"review {prefix}{i}", "score": 3, "at": start - timedelta(hours=i)}
+        for i in range(n)
+    ]
+
+
+def saved_ids(save_path):
+    ids = []
+    for name in sorted(os.listdir(save_path)):
+        if name.endswith(".json") and not name.startswith("."):
+            with open(os.path.join(save_path, name), encoding="utf-8") as f:
+                ids.extend(review["reviewId"] for review in json.load(f))
+    return sorted(ids)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fake = FakeStore(make_reviews(datetime(2024, 6, 3, 12), 6))
+    monkeypatch.setattr(scraper, "reviews", fake.reviews)
+    return fake
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).isoformat()
+
+
+def test_resumes_from_saved_token(store, tmp_path):
+    path = str(tmp_path)
+    assert scraper.fetch_and_save_reviews("com.example.app", path, max_reviews=2, page_size=2) == 2
+    app_state = scraper.load_scrape_state(path)["com.example.app"]
+    assert app_state["high_water_mark"] == utc(2024, 6, 3, 12)
+    assert [entry["token"]["token"] for entry in app_state["pending"]] == [2]
+
+    assert scraper.fetch_and_save_reviews("com.example.app", path, max_reviews=10, page_size=2) == 4
+    # A fresh pass down to the mark first, then the saved range from its token
+    assert store.calls == [0, 0, 2, 4]
+    assert saved_ids(path) == sorted(f"r{i}" for i in range(6))
+    app_state = scraper.load_scrape_state(path)["com.example.app"]
+    assert app_state["pending"] == []
+    assert app_state["high_water_mark"] == utc(2024, 6, 3, 12)
+
+
+def test_new_reviews_come_before_the_backfill(store, tmp_path):
+    path = str(tmp_path)
+    store.items = make_reviews(datetime(2024, 6, 3, 12), 20)
+    scraper.fetch_and_save_reviews("com.example.app", path, max_reviews=2, page_size=2)
+
+    # New reviews arrive while most of the history is still to be crawled
+    store.items = make_reviews(datetime(2024, 6, 3, 14), 2, prefix="n") + store.items
+    assert scraper.fetch_and_save_reviews("com.example.app", path, max_reviews=2, page_size=2) == 2
+    assert saved_ids(path) == sorted(["n0", "n1", "r0", "r1"])
+    assert scraper.load_scrape_state(path)["com.example.app"]["high_water_mark"] == utc(2024, 6, 3, 14)
+
+    assert scraper.fetch_and_save_reviews("com.example.app", path, max_reviews=100, page_size=4) == 18
+    assert saved_ids(path) == sorted(["n0", "n1"] + [f"r{i}" for i in range(20)])
+    assert scraper.load_scrape_state(path)["com.example.app"]["pending"] == []
+
+
+def test_stops_at_high_water_mark(store, tmp_path):
+    path = str(tmp_path)
+    scraper.fetch_and_save_reviews("com.example.app", path, page_size=2)
+
+    # Two newer reviews arrive; the next pass must stop at the old newest review
+    store.items = make_reviews(datetime(2024, 6, 3, 14), 2, prefix="n") + store.items
+    store.calls.clear()
+    assert scraper.fetch_and_save_reviews("com.example.app", path, page_size=2) == 2
+    assert store.calls == [0, 2]
+    assert saved_ids(path) == sorted([f"r{i}" for i in range(6)] + ["n0", "n1"])
+    app_state = scraper.load_scrape_state(path)["com.example.app"]
+    assert app_state["high_water_mark"] == utc(2024, 6, 3, 14)
+    assert app_state["pending"] == []
+
+
+def test_empty_page_keeps_range_pending(store, tmp_path):
+    path = str(tmp_path)
+    store.fail_calls = {2}
+    assert scraper.fetch_and_save_reviews("com.example.app", path, page_size=2) == 2
+
+    # The failed page leaves the rest of the pass as a range to resume
+    app_state = scraper.load_scrape_state(path)["com.example.app"]
+    assert app_state["high_water_mark"] == utc(2024, 6, 3, 12)
+    assert app_state["pending"] == [{**app_state["pending"][0], "stop_at": None}]
+    assert app_state["pending"][0]["token"]["token"] == 2
+
+    assert scraper.fetch_and_save_reviews("com.example.app", path, page_size=2) == 4
+    assert store.calls == [0, 2, 0, 2, 4]
+    assert saved_ids(path) == sorted(f"r{i}" for i in range(6))
+    assert scraper.load_scrape_state(path)["com.example.app"]["pending"] == []
+
+
+def test_empty_first_page_keeps_state(store, tmp_path):
+    path = str(tmp_path)
+    scraper.fetch_and_save_reviews("com.example.app", path, page_size=2)
+    before = scraper.load_scrape_state(path)["com.example.app"]
+
+    # A failing first page of a fresh pass changes nothing
+    store.fail_calls = {len(store.calls) + 1}
+    assert scraper.fetch_and_save_reviews("com.example.app", path, page_size=2) == 0
+    assert scraper.load_scrape_state(path)["com.example.app"] == before
+
+
+def test_mixed_timezones_and_old_state_layout(store, tmp_path):
+    path = str(tmp_path)
+    # Reviews with aware times in another zone, and a state file with a naive mark and the old single pass
+    ist = timezone(timedelta(hours=5, minutes=30))
+    for review in store.items:
+        review["at"] = review["at"].replace(tzinfo=timezone.utc).astimezone(ist)
+    with open(os.path.join(path, scraper.STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"com.example.app": {"high_water_mark": "2024-06-03T10:00:00", "pending": {
+            "token": None, "stop_at": "2024-06-03T10:00:00", "newest": None}}}, f)
+
+    # r0-r2 are at 12:00, 11:00 and 10:00 UTC; r3 is older than the mark
+    assert scraper.fetch_and_save_reviews("com.example.app", path, page_size=2) == 3
+    assert saved_ids(path) == ["r0", "r1", "r2"]
+    app_state = scraper.load_scrape_state(path)["com.example.app"]
+    assert app_state == {"high_water_mark": utc(2024, 6, 3, 12), "pending": []}
@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.utils.embedding_cache import EmbeddingCache
+from src.utils.extraction_cache import ExtractionCache
+
+
+def test_extraction_cache_round_trip(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+    cache.put_many({"late delivery": ["late delivery"], "cold food": []}, "model", "v1")
+
+    assert cache.get_many(["late delivery", "cold food", "other"], "model", "v1") == [["late delivery"], [], None]
+    assert cache.get("late delivery", "model", "v2") is None
+    assert cache.stats()["entries"] == 2
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.close()
+
+
+def test_embedding_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embedding.sqlite"))
+    vector = np.arange(8, dtype=np.float32)
+    cache.put_many({"late delivery": vector}, "model")
+
+    found, missing = cache.get_many(["late delivery", "other"], "model")
+    assert missing is None
+    np.testing.assert_array_equal(found, vector)
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"), max_bytes=64 * 1024)
+    cache.put_many({"keep": ["kept phrase"]}, "model", "v1")
+    for batch in range(20):
+        # Reading "keep" marks it recently used, so eviction takes older entries first
+        assert cache.get("keep", "model", "v1") == ["kept phrase"]
+        cache.put_many({f"text {batch} {i}": ["x" * 200] for i in range(20)}, "model", "v1")
+
+    assert cache.size_bytes() <= 64 * 1024
+    assert cache.stats()["entries"] < 401
+    assert cache.get("keep", "model", "v1") == ["kept phrase"]
+    cache.close()
+
+
+def test_lookup_touches_hits_in_one_transaction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embedding.sqlite"))
+    texts = [f"text {i}" for i in range(50)]
+    cache.put_many({text: np.ones(4, dtype=np.float32) for text in texts}, "model")
+
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    assert all(vector is not None for vector in cache.get_many(texts, "model"))
+    cache._conn.set_trace_callback(None)
+
+    writes = [s.split()[0] for s in statements if not s.startswith("SELECT")]
+    assert writes == ["BEGIN"] + ["UPDATE"] * 50 + ["COMMIT"]
+    cache.close()
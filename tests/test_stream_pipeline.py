@@ -0,0 +1,40 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from src.agents import topic_agent
+from src.agents.async_extractor import AsyncExtractor
+from src.agents.stream_pipeline import process_file_streaming
+from src.utils.fake_client import FakeGeminiClient
+
+WORDS = ["delivery", "late", "food", "cold", "expensive", "missing", "good", "quality", "small", "portion"]
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    rng = random.Random(0)
+    reviews = [{"content": " ".join(rng.choice(WORDS) for _ in range(6)), "score": 3} for _ in range(300)]
+    path = tmp_path / "2024-06-01.jsonl"
+    path.write_text("\n".join(json.dumps(review) for review in reviews), encoding="utf-8")
+    return str(path)
+
+
+def test_windows_share_one_loop_and_limiter(raw_file, monkeypatch):
+    monkeypatch.setattr(topic_agent, "_client", FakeGeminiClient())
+    seen = []
+    original = AsyncExtractor.extract_async
+
+    async def recording(self, review_texts, *args, **kwargs):
+        seen.append((asyncio.get_running_loop(), id(self)))
+        result = await original(self, review_texts, *args, **kwargs)
+        seen[-1] += (id(self._limiter),)
+        return result
+
+    monkeypatch.setattr(AsyncExtractor, "extract_async", recording)
+    concurrent = process_file_streaming(raw_file, window=20, concurrency=2, cache_path=None)
+
+    assert len(seen) > 1
+    assert len({entry for entry in seen}) == 1
+    assert concurrent == process_file_streaming(raw_file, window=20, concurrency=0, cache_path=None)
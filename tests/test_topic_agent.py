@@ -0,0 +1,123 @@
+import json
+
+from src.agents import topic_agent
+from src.agents.topic_agent import (
+    build_batch_prompt,
+    estimate_tokens,
+    extract_topic_phrases_batch,
+    parse_batch_response,
+    split_batches,
+)
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.fake_client import FakeAPIError, FakeGeminiClient, FakeResponse, fake_phrases
+
+
+class ScriptedClient(FakeGeminiClient):
+    """
+    Fake client whose batched responses are rewritten by `edit`; single-review requests for `fail_single` fail.
+    """
+
+    def __init__(self, edit, fail_single=()):
+        super().__init__()
+        self.edit = edit
+        self.fail_single = set(fail_single)
+        self.prompts = []
+
+    def _respond(self, contents):
+        self.prompts.append(contents)
+        response = super()._respond(contents)
+        if "Reviews:" in contents:
+            return FakeResponse(self.edit(response.text))
+        if any(f'"{text}"' in contents for text in self.fail_single):
+            raise FakeAPIError(503, "UNAVAILABLE")
+        return response
+
+
+def batch_calls(client):
+    return sum("Reviews:" in prompt for prompt in client.prompts)
+
+
+TEXTS = ["delivery was late again", "food arrived cold and soggy", "price is too high", "app keeps crashing"]
+
+
+def test_parse_batch_response_missing_and_duplicated_ids():
+    # Missing ids stay None; out-of-range and non-numeric ids are ignored
+    text = '{"0": ["Late Delivery!"], "2": [], "7": ["out of range"], "x": ["bad id"], "3": "not a list"}'
+    assert parse_batch_response(text, 4) == [["late delivery"], None, [], None]
+
+    # A duplicated id keeps its last value, in both the object and the list shape
+    assert parse_batch_response('{"1": ["first"], "1": ["second"]}', 2) == [None, ["second"]]
+    listed = json.dumps([{"id": 0, "topics": ["first"]}, {"id": 1, "phrases": ["other"]}, {"id": 0, "topics": ["again"]}])
+    assert parse_batch_response(listed, 2) == [["again"], ["other"]]
+
+    # Code fences are stripped; malformed JSON or the wrong shape leaves every entry missing
+    assert parse_batch_response('```json\n{"0": ["a"]}\n```', 1) == [["a"]]
+    assert parse_batch_response('{"0": ["a"], ', 2) == [None, None]
+    assert parse_batch_response('"just a string"', 2) == [None, None]
+
+
+def test_split_batches_gives_oversize_item_its_own_batch():
+    overhead = estimate_tokens(build_batch_prompt([]))
+    budget = overhead + 3 * (estimate_tokens("x" * 40) + 8)
+    texts = ["x" * 40, "x" * 40, "x" * 4000, "x" * 40, "x" * 40, "x" * 40, "x" * 40]
+
+    batches = split_batches(texts, max_batch_tokens=budget, max_batch_size=50)
+    assert batches == [[0, 1], [2], [3, 4, 5], [6]]
+    assert sorted(i for batch in batches for i in batch) == list(range(len(texts)))
+    assert split_batches(texts, max_batch_tokens=10 ** 6, max_batch_size=3) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert split_batches([]) == []
+
+
+def test_oversize_item_is_sent_alone(monkeypatch):
+    client = ScriptedClient(lambda text: text)
+    monkeypatch.setattr(topic_agent, "_client", client)
+    long_review = "the checkout page " * 400
+    texts = TEXTS[:2] + [long_review] + TEXTS[2:]
+
+    results = extract_topic_phrases_batch(texts, max_batch_tokens=500)
+    assert results == [fake_phrases(text) for text in texts]
+    assert len(client.prompts) == 3
+    assert batch_calls(client) == 2
+
+
+def test_malformed_batch_response_falls_back_per_item(monkeypatch):
+    client = ScriptedClient(lambda text: text[:-5])
+    monkeypatch.setattr(topic_agent, "_client", client)
+    failed = []
+
+    results = extract_topic_phrases_batch(TEXTS, failed=failed)
+    assert results == [fake_phrases(text) for text in TEXTS]
+    assert failed == []
+    # One batched call, then one single-review call per review
+    assert batch_calls(client) == 1
+    assert len(client.prompts) == 1 + len(TEXTS)
+
+
+def test_missing_ids_fall_back_only_for_those_items(monkeypatch):
+    def drop_ids(text):
+        data = json.loads(text)
+        del data["1"], data["3"]
+        return json.dumps(data)
+
+    client = ScriptedClient(drop_ids)
+    monkeypatch.setattr(topic_agent, "_client", client)
+
+    results = extract_topic_phrases_batch(TEXTS + [TEXTS[0]])
+    assert results == [fake_phrases(text) for text in TEXTS + [TEXTS[0]]]
+    single = [prompt for prompt in client.prompts if "Reviews:" not in prompt]
+    assert len(single) == 2
+    assert TEXTS[1] in single[0] and TEXTS[3] in single[1]
+
+
+def test_failed_fallback_is_reported_and_not_cached(monkeypatch, tmp_path):
+    client = ScriptedClient(lambda text: "not json at all", fail_single={TEXTS[1]})
+    monkeypatch.setattr(topic_agent, "_client", client)
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    failed = []
+
+    results = extract_topic_phrases_batch(TEXTS[:3], cache=cache, failed=failed)
+    assert results == [fake_phrases(TEXTS[0]), [], fake_phrases(TEXTS[2])]
+    assert failed == [TEXTS[1]]
+    assert cache.get(TEXTS[1], topic_agent.MODEL_NAME, topic_agent.PROMPT_VERSION) is None
+    assert cache.get(TEXTS[0], topic_agent.MODEL_NAME, topic_agent.PROMPT_VERSION) == fake_phrases(TEXTS[0])
+    cache.close()
@@ -0,0 +1,43 @@
+from benchmarks.synthetic import HashingEncoder
+from src.agents.topic_classifier import TopicClassifier
+from src.agents.topic_memory import TopicMemory
+
+TOPICS = {
+    "delivery delay": ["late", "delay", "slow"],
+    "food cold": ["cold", "not hot"],
+}
+
+
+class CountingEncoder(HashingEncoder):
+    def __init__(self, dim=64):
+        super().__init__(dim)
+        self.texts = []
+
+    def encode(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return super().encode(texts, **kwargs)
+
+
+def make_memory(tmp_path, encoder):
+    memory = TopicMemory(str(tmp_path / "topic_memory.json"),
+                         embedding_cache_path=str(tmp_path / "embedding_cache.sqlite"))
+    memory._model = encoder
+    return memory
+
+
+def test_classifier_embeds_through_topic_memory_caches(tmp_path):
+    encoder = CountingEncoder()
+    classifier = TopicClassifier(TOPICS, threshold=0.5, margin=0.0, memory=make_memory(tmp_path, encoder))
+    reviews = ["late delay", "cold", "late delay", "the app crashed on login every single time i tried to open it this morning"]
+
+    labels = classifier.classify(reviews)
+    assert labels == ["delivery delay", "food cold", "delivery delay", None]
+    # Prototype texts and each distinct short review are encoded once
+    assert sorted(encoder.texts) == sorted(["delivery delay", "late", "delay", "slow", "food cold", "cold",
+                                            "not hot", "late delay"])
+
+    # A fresh memory over the same on-disk cache needs no model calls at all
+    encoder = CountingEncoder()
+    classifier = TopicClassifier(TOPICS, threshold=0.5, margin=0.0, memory=make_memory(tmp_path, encoder))
+    assert classifier.classify(reviews) == labels
+    assert encoder.texts == []
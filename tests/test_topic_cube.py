@@ -0,0 +1,108 @@
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from src.agents import topic_cube
+from src.agents.topic_cube import TopicCube
+
+TOPICS = ["ads", "battery", "crash", "login", "ui"]
+APPS = ["com.example.one", "com.example.two"]
+FIRST_DAY = date(2024, 6, 1)
+DAYS = 20
+
+
+@pytest.fixture
+def cube_data(tmp_path):
+    """
+    Fill a cube store with random counts and return it with the raw (date, topic, score, app, count) rows.
+    """
+    rng = random.Random(0)
+    store_dir = str(tmp_path / "topic_cube")
+    index = topic_cube.load_index(store_dir)
+    rows = []
+    dates = [(FIRST_DAY + timedelta(days=i)).isoformat() for i in range(DAYS)]
+    for app in APPS:
+        # Each app misses a few days, and some stored days have no topics at all
+        for date_str in dates:
+            if rng.random() < 0.15:
+                continue
+            score_counts = {}
+            for topic in rng.sample(TOPICS, rng.randint(0, len(TOPICS))):
+                by_score = {score: rng.randint(1, 9) for score in rng.sample(range(1, 6), rng.randint(1, 5))}
+                score_counts[topic] = by_score
+                rows.extend((date_str, topic, score, app, count) for score, count in by_score.items())
+            topic_cube.upsert_day(date_str, score_counts, store_dir, index, app)
+    return TopicCube(store_dir), rows
+
+
+def brute_force(rows, start, end, by=(), topics=None, scores=None, apps=None):
+    totals = Counter()
+    for date_str, topic, score, app, count in rows:
+        if not start <= date_str <= end:
+            continue
+        if (topics is not None and topic not in topics) or (scores is not None and score not in scores) \
+                or (apps is not None and app not in apps):
+            continue
+        values = {"date": date_str, "topic": topic, "score": score, "app": app}
+        totals[tuple(values[name] for name in by)] += count
+    return totals
+
+
+def random_ranges(dates, rng, n=30):
+    # Every single-day range, ranges touching the first and last day, and random spans
+    ranges = [(d, d) for d in dates]
+    ranges += [(dates[0], dates[-1]), (dates[0], dates[0]), (dates[-1], dates[-1])]
+    ranges += [(dates[0], rng.choice(dates)) for _ in range(5)]
+    ranges += [(rng.choice(dates), dates[-1]) for _ in range(5)]
+    for _ in range(n):
+        low, high = sorted(rng.sample(range(len(dates)), 2))
+        ranges.append((dates[low], dates[high]))
+    return ranges
+
+
+def test_range_totals_match_brute_force(cube_data):
+    cube, rows = cube_data
+    rng = random.Random(1)
+    for start, end in random_ranges(cube.dates, rng):
+        assert cube.query(start=start, end=end) == brute_force(rows, start, end)[()]
+        topics = rng.sample(TOPICS, 2)
+        scores = rng.sample(range(1, 6), 3)
+        apps = [rng.choice(APPS)]
+        expected = brute_force(rows, start, end, topics=topics, scores=scores, apps=apps)[()]
+        assert cube.query(topics=topics, scores=scores, apps=apps, start=start, end=end) == expected
+
+
+@pytest.mark.parametrize("by", ["topic", "score", "app", "date", ["app", "topic"], ["score", "date"]])
+def test_roll_ups_match_brute_force(cube_data, by):
+    cube, rows = cube_data
+    group = [by] if isinstance(by, str) else by
+    rng = random.Random(2)
+    for start, end in random_ranges(cube.dates, rng, n=10):
+        result = cube.query(start=start, end=end, by=by)
+        actual = {(key if isinstance(key, tuple) else (key,)): int(value) for key, value in result.items() if value}
+        assert actual == dict(brute_force(rows, start, end, by=group))
+
+
+def test_last_days_and_unstored_bounds(cube_data):
+    cube, rows = cube_data
+    last = cube.dates[-1]
+    week_start = (date.fromisoformat(last) - timedelta(days=6)).isoformat()
+    assert cube.query(last_days=7) == brute_force(rows, week_start, last)[()]
+    assert cube.query(last_days=1) == brute_force(rows, last, last)[()]
+
+    # Bounds need not be stored dates
+    assert cube.query(start="2024-05-01", end="2024-12-31") == brute_force(rows, cube.dates[0], last)[()]
+    assert cube.query(start="2024-12-01") == 0
+
+
+def test_refresh_picks_up_new_partitions(cube_data):
+    cube, rows = cube_data
+    assert not cube.refresh()
+    first = cube.dates[0]
+    topic_cube.upsert_day(first, {"battery": {1: 100}}, cube.store_dir, app="com.example.three")
+
+    assert cube.refresh()
+    assert cube.query(apps=["com.example.three"]) == 100
+    assert cube.query(start=first, end=first) == brute_force(rows, first, first)[()] + 100
@@ -0,0 +1,92 @@
+import itertools
+import random
+
+import numpy as np
+
+from benchmarks.synthetic import HashingEncoder
+from src.agents.topic_discovery import assign, discover_topics, leader_clustering, minibatch_kmeans
+from src.agents.topic_memory import TopicMemory
+
+GROUPS = {
+    "refund": ["refund", "money", "returned", "wallet", "bank"],
+    "driver": ["driver", "rude", "behaviour", "rider", "attitude"],
+    "app": ["app", "crash", "login", "update", "screen"],
+}
+
+
+def planted_vectors(n_clusters=6, per_cluster=200, dim=32, noise=0.15, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    truth = np.repeat(np.arange(n_clusters), per_cluster)
+    vectors = centers[truth] + rng.normal(scale=noise, size=(len(truth), dim)) / np.sqrt(dim)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    order = rng.permutation(len(truth))
+    return vectors[order].astype(np.float32), truth[order]
+
+
+def assert_recovers(labels, truth):
+    # Every found cluster holds one planted cluster, and every planted cluster maps to one found cluster
+    pairs = set(zip(labels.tolist(), truth.tolist()))
+    assert len({label for label, _ in pairs}) == len(pairs)
+    assert len({planted for _, planted in pairs}) == len(set(truth.tolist()))
+    assert len(pairs) == len(set(truth.tolist()))
+
+
+def test_leader_clustering_recovers_planted_clusters():
+    vectors, truth = planted_vectors()
+    leaders = leader_clustering(vectors, threshold=0.75, chunk_size=128)
+    labels, similarities = assign(vectors, leaders)
+    assert len(leaders) == 6
+    assert similarities.min() >= 0.75
+    assert_recovers(labels, truth)
+
+
+def test_minibatch_kmeans_recovers_planted_clusters():
+    vectors, truth = planted_vectors(seed=1)
+    # Too many centroids on purpose: merging near-duplicates brings them back to the planted count
+    centroids = leader_clustering(minibatch_kmeans(vectors, 12, batch_size=256, steps=50), threshold=0.75)
+    labels, _ = assign(vectors, centroids)
+    assert len(centroids) == 6
+    assert_recovers(labels, truth)
+
+
+def make_memory(tmp_path):
+    memory = TopicMemory(str(tmp_path / "topic_memory.json"), embedding_cache_path=None)
+    memory._model = HashingEncoder(dim=256)
+    return memory
+
+
+def planted_phrases(seed=0):
+    rng = random.Random(seed)
+    phrases = {}
+    owner = {}
+    for group, words in GROUPS.items():
+        for subset in itertools.combinations(words, 4):
+            for _ in range(3):
+                phrase = " ".join(rng.sample(subset, 4))
+                phrases[phrase] = rng.randint(1, 4)
+                owner[phrase] = group
+    return phrases, owner
+
+
+def test_discover_topics_proposes_one_topic_per_planted_group(tmp_path):
+    phrases, owner = planted_phrases()
+    for method in ("kmeans", "threshold"):
+        proposals = discover_topics(phrases, make_memory(tmp_path), method=method, threshold=0.6)
+        assert sorted(owner[p["topic"]] for p in proposals) == sorted(GROUPS)
+        for proposal in proposals:
+            assert {owner[example] for example in proposal["examples"]} == {owner[proposal["topic"]]}
+        assert sum(p["mentions"] for p in proposals) == sum(phrases.values())
+
+
+def test_discover_topics_skips_known_topics_and_registers(tmp_path):
+    phrases, owner = planted_phrases()
+    memory = make_memory(tmp_path)
+    known = {phrase for phrase in phrases if owner[phrase] == "app" and "screen" not in phrase}
+    memory.register_topics(["app crash login update"])
+
+    proposals = discover_topics(phrases, memory, method="threshold", threshold=0.6, register=True)
+    # Phrases with exactly the known topic's words are set aside before clustering
+    assert sum(p["mentions"] for p in proposals) == sum(v for p, v in phrases.items() if p not in known)
+    assert all(p["registered_as"] in memory.topic_names for p in proposals)
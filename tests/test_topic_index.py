@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from src.agents.topic_index import VectorIndex, ExactIndex, IVFIndex, create_index
+
+
+def unit_rows(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def clustered_rows(n, centers, dim=32, spread=0.35, seed=0):
+    # Topic-like data: points scattered around a few directions
+    rng = np.random.default_rng(seed)
+    means = unit_rows(centers, dim, seed + 1)
+    vectors = means[rng.integers(0, centers, n)] + spread * rng.normal(size=(n, dim)).astype(np.float32) / np.sqrt(dim)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def chroma_path(tmp_path):
+    pytest.importorskip("chromadb")
+    return tmp_path / "chroma"
+
+
+def test_vector_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex()
+
+    class Partial(VectorIndex):
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert len(ExactIndex()) == 0
+
+
+def test_ivf_recall_against_exact_index_as_nprobe_grows():
+    vectors = clustered_rows(3000, centers=60)
+    queries = clustered_rows(300, centers=60, seed=7)
+    exact = ExactIndex()
+    exact.build(vectors)
+    exact_ids, exact_scores = exact.search(queries)
+    # Exact top-10 of every query, for recall@10 of the IVF top hit
+    top10 = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+
+    index = IVFIndex(nlist=32, min_train_size=256)
+    index.build(vectors)
+    assert len(index.centroids) == 32
+
+    recall_at_1, recall_at_10 = [], []
+    previous = np.full(len(queries), -np.inf)
+    for nprobe in (1, 2, 4, 8, 16, 32):
+        index.nprobe = nprobe
+        ids, scores = index.search(queries)
+        np.testing.assert_allclose(scores, np.einsum("ij,ij->i", vectors[ids], queries), atol=1e-5)
+        # Probing more buckets scans a superset of candidates, so no query gets a worse match
+        assert np.all(scores >= previous - 1e-6)
+        previous = scores
+        recall_at_1.append(np.mean(ids == exact_ids))
+        recall_at_10.append(np.mean([found in row for found, row in zip(ids, top10)]))
+
+    assert recall_at_1 == sorted(recall_at_1)
+    assert recall_at_1[0] < 1.0
+    assert recall_at_10[2] >= 0.9
+    # nprobe = nlist scans every bucket and is exact
+    assert recall_at_1[-1] == 1.0
+    np.testing.assert_allclose(previous, exact_scores, atol=1e-6)
+
+
+def test_chroma_build_replaces_changed_rows(chroma_path):
+    vectors = unit_rows(20)
+    index = create_index("chroma", path=chroma_path)
+    index.build(vectors)
+
+    # Same row count, but topic 5 was replaced by a different one
+    replaced = vectors.copy()
+    replaced[5] = unit_rows(1, seed=1)[0]
+    reopened = create_index("chroma", path=chroma_path)
+    reopened.build(replaced)
+
+    assert reopened.collection.count() == 20
+    ids, scores = reopened.search(replaced[[5]])
+    assert ids[0] == 5 and scores[0] == pytest.approx(1.0, abs=1e-4)
+    # The old vector of row 5 is gone, not kept next to the new one
+    stored = reopened.collection.get(include=[])["ids"]
+    assert [entry_id for entry_id in stored if entry_id.startswith("5:")] == [reopened._ids[5]]
+
+
+def test_chroma_build_shrinks_and_updates(chroma_path):
+    vectors = unit_rows(10)
+    index = create_index("chroma", path=chroma_path)
+    index.build(vectors)
+    index.build(vectors[:6])
+    assert len(index) == 6 and index.collection.count() == 6
+
+    new = unit_rows(1, seed=2)[0]
+    index.update(2, new)
+    index.add(vectors[7])
+    assert index.collection.count() == 7
+    ids, _ = index.search(np.stack([new, vectors[7]]))
+    assert ids.tolist() == [2, 6]
+
+
+def test_chroma_search_ef_applies_to_existing_collection(chroma_path):
+    create_index("chroma", path=chroma_path, search_ef=32)
+    index = create_index("chroma", path=chroma_path, search_ef=128)
+    assert index.collection.configuration["hnsw"]["ef_search"] == 128
@@ -0,0 +1,61 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import HashingEncoder
+from src.agents.topic_memory import TopicMemory
+
+
+def make_memory(path):
+    memory = TopicMemory(str(path), embedding_cache_path=None)
+    memory._model = HashingEncoder(dim=64)
+    return memory
+
+
+def test_two_memories_share_one_store(tmp_path):
+    path = tmp_path / "topic_memory.json"
+    first, second = make_memory(path), make_memory(path)
+    first.register_topics(["late delivery"])
+    first.flush()
+    second.register_topics(["cold food"])
+    second.flush()
+
+    # The second flush adopted the first memory's topic instead of truncating it
+    assert second.topic_names == ["late delivery", "cold food"]
+    assert make_memory(path).topic_names == ["late delivery", "cold food"]
+    assert second.find_closest_topic("late delivery") == "late delivery"
+
+
+def test_memory_is_not_kept_alive_and_flushes_when_collected(tmp_path):
+    path = tmp_path / "topic_memory.json"
+    memory = make_memory(path)
+    memory.register_topics(["missing items"])
+    ref = weakref.ref(memory)
+    del memory
+    gc.collect()
+
+    assert ref() is None
+    assert make_memory(path).topic_names == ["missing items"]
+
+
+@pytest.mark.parametrize("index", ["exact", "chroma"])
+def test_reading_the_matrix_does_not_flush(tmp_path, index):
+    if index == "chroma":
+        pytest.importorskip("chromadb")
+    path = tmp_path / "topic_memory.json"
+    memory = TopicMemory(str(path), embedding_cache_path=None, index=index)
+    memory._model = HashingEncoder(dim=64)
+    memory.register_topics(["late delivery", "cold food"])
+
+    matrix = memory.embedding_matrix
+    assert matrix.shape == (2, 64)
+    np.testing.assert_allclose(matrix, memory.get_embeddings(["late delivery", "cold food"]), atol=1e-3)
+    assert list(memory.memory) == ["late delivery", "cold food"]
+    assert not memory.store.vectors_path.exists()
+
+    memory.flush()
+    assert make_memory(path).topic_names == ["late delivery", "cold food"]
+    assert memory.embedding_matrix.shape == (2, 64)
+    memory.close()
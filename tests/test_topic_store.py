@@ -0,0 +1,53 @@
+import numpy as np
+
+from src.agents.topic_store import TopicStore
+
+
+def unit_rows(n, dim=8, seed=0):
+    rows = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_flush_keeps_rows_appended_by_another_writer(tmp_path):
+    base = tmp_path / "topic_memory"
+    first, second = TopicStore(base), TopicStore(base)
+    first.load()
+    second.load()
+
+    vectors = unit_rows(4)
+    first.append("a", vectors[0])
+    first.flush()
+    second.append("b", vectors[1])
+    second.flush()
+    first.append("c", vectors[2])
+    first.flush()
+
+    assert second.external_rows == 1
+    assert first.external_rows == 1
+    fresh = TopicStore(base)
+    fresh.load()
+    assert fresh.names == ["a", "b", "c"]
+    np.testing.assert_allclose(np.asarray(fresh.vectors, dtype=np.float32), vectors[:3], atol=1e-3)
+    assert first.names == fresh.names
+
+
+def test_flush_truncates_only_a_torn_tail(tmp_path):
+    base = tmp_path / "topic_memory"
+    store = TopicStore(base)
+    vectors = unit_rows(3)
+    store.append("a", vectors[0])
+    store.flush()
+
+    # An interrupted flush left a vector row without its name
+    with open(store.vectors_path, "ab") as f:
+        f.write(vectors[1].astype("<f2").tobytes())
+
+    other = TopicStore(base)
+    other.load()
+    other.append("c", vectors[2])
+    other.flush()
+
+    fresh = TopicStore(base)
+    fresh.load()
+    assert fresh.names == ["a", "c"]
+    np.testing.assert_allclose(np.asarray(fresh.vectors, dtype=np.float32), vectors[[0, 2]], atol=1e-3)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.agents.trend_analytics import compute_analytics, update_analytics, MIN_STD
+
+DATES = [str(d.date()) for d in pd.date_range("2024-06-01", periods=40)]
+
+
+@pytest.fixture
+def counts():
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame(rng.poisson(6, size=(5, len(DATES))), index=[f"topic {i}" for i in range(5)], columns=DATES)
+    table.iloc[2, 30] = 40  # a spike
+    table.loc["late topic"] = [0] * 25 + list(rng.poisson(3, size=15))  # appears on day 26
+    return table
+
+
+def table_until(counts, end):
+    # Topics only appear in the trend table once they have been seen
+    table = counts.iloc[:, :end]
+    return table[table.sum(axis=1) > 0]
+
+
+def naive_zscores(series, alpha):
+    # Textbook EWMA mean/variance recursion, one topic at a time
+    mean = var = 0.0
+    zscores, ewmas = [], []
+    for value in series:
+        diff = value - mean
+        zscores.append(diff / max(np.sqrt(max(var, mean)), MIN_STD))
+        mean += alpha * diff
+        var = (1 - alpha) * (var + diff * alpha * diff)
+        ewmas.append(mean)
+    return zscores, ewmas
+
+
+def test_incremental_updates_match_full_computation(counts, tmp_path):
+    state_path = str(tmp_path / "analytics.json")
+    parts = [update_analytics(table_until(counts, end), state_path) for end in (10, 11, 25, 33, 40)]
+    incremental = pd.concat(parts, ignore_index=True).set_index(["date", "topic"]).sort_index()
+
+    full = compute_analytics(counts).set_index(["date", "topic"]).sort_index()
+    # The full table carries the late topic from the first day, with zero counts before it appears
+    assert (full.loc[~full.index.isin(incremental.index), "count"] == 0).all()
+    pd.testing.assert_frame_equal(incremental, full.loc[incremental.index], check_exact=False)
+    assert incremental["spike"].any()
+
+
+def test_ewma_and_zscore_match_naive_recursion(counts):
+    full = compute_analytics(counts, alpha=0.2)
+    for topic, rows in full.groupby("topic"):
+        rows = rows.sort_values("date")
+        zscores, ewmas = naive_zscores(counts.loc[topic].to_numpy(dtype=float), 0.2)
+        np.testing.assert_allclose(rows["zscore"], zscores)
+        np.testing.assert_allclose(rows["ewma"], ewmas)
+        np.testing.assert_allclose(rows["rolling_mean"], counts.loc[topic].rolling(7, min_periods=1).mean())
+
+
+def test_changed_past_day_rebuilds_state(counts, tmp_path):
+    state_path = str(tmp_path / "analytics.json")
+    update_analytics(table_until(counts, 20), state_path)
+
+    edited = counts.copy()
+    edited.iloc[0, 5] += 10
+    rebuilt = update_analytics(table_until(edited, 30), state_path)
+    assert sorted(rebuilt["date"].unique()) == DATES[:30]
+    expected = compute_analytics(table_until(edited, 30))
+    pd.testing.assert_frame_equal(rebuilt.reset_index(drop=True), expected.reset_index(drop=True), check_exact=False)
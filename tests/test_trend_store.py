@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+
+from src.agents import trend_store
+from src.agents.trend_builder import save_trend_table
+from src.utils.app_layout import app_paths
+
+DAYS = {
+    "2024-06-01": {"battery": 3, "login": 1},
+    "2024-06-02": {"battery": 2, "crash": 4},
+    "2024-06-03": {},
+    "2024-06-04": {"login": 5},
+}
+
+
+def fill(store_dir, days=DAYS):
+    index = trend_store.load_index(store_dir)
+    for date_str, counts in days.items():
+        trend_store.upsert_day(date_str, counts, store_dir, index)
+
+
+def test_upsert_replaces_only_that_days_partition(tmp_path):
+    store_dir = str(tmp_path / "trend_store")
+    fill(store_dir)
+    other = trend_store.partition_path("2024-06-01", store_dir)
+    other_mtime = os.stat(other).st_mtime_ns
+
+    # Unchanged counts are not rewritten, changed counts replace the partition
+    assert not trend_store.upsert_day("2024-06-02", DAYS["2024-06-02"], store_dir)
+    assert trend_store.upsert_day("2024-06-02", {"crash": 1, "ui": 2}, store_dir)
+
+    day = trend_store.read_trend(store_dir, dates=["2024-06-02"])
+    assert list(zip(day["topic"], day["count"])) == [("crash", 1), ("ui", 2)]
+    assert os.stat(other).st_mtime_ns == other_mtime
+    assert trend_store.list_dates(store_dir) == sorted(DAYS)
+    assert trend_store.load_index(store_dir)["2024-06-02"] == trend_store.counts_digest({"crash": 1, "ui": 2})
+
+
+def test_read_trend_prunes_dates_topics_and_columns(tmp_path):
+    store_dir = str(tmp_path / "trend_store")
+    fill(store_dir)
+
+    df = trend_store.read_trend(store_dir, dates=["2024-06-02", "2024-06-04", "2024-07-01"],
+                                topics=["battery", "login"])
+    assert list(zip(df["date"], df["topic"], df["count"])) == [("2024-06-02", "battery", 2), ("2024-06-04", "login", 5)]
+
+    counts = trend_store.read_trend(store_dir, dates=["2024-06-01"], columns=["topic", "count"])
+    assert list(counts.columns) == ["topic", "count"]
+    assert trend_store.read_trend(store_dir, dates=["2024-07-01"]).empty
+
+
+def test_app_stores_are_pruned_independently(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first, second = app_paths("com.example.one")["trend_store"], app_paths("com.example.two")["trend_store"]
+    fill(first)
+    fill(second, {"2024-06-05": {"ads": 7}})
+
+    assert trend_store.list_dates(first) == sorted(DAYS)
+    assert trend_store.list_dates(second) == ["2024-06-05"]
+    assert trend_store.read_trend(second, dates=["2024-06-01"]).empty
+    assert set(trend_store.read_trend(first)["topic"]) == {"battery", "crash", "login"}
+
+
+def test_export_csv_matches_legacy_trend_csv(tmp_path):
+    store_dir = str(tmp_path / "trend_store")
+    fill(store_dir)
+
+    # The wide table build_trend_table returns and main.py used to save directly
+    legacy = pd.DataFrame.from_dict(DAYS, orient="columns").reindex(columns=sorted(DAYS))
+    legacy = legacy.sort_index().fillna(0).astype(int)
+    legacy.index.name = "topic"
+    legacy_path = tmp_path / "legacy.csv"
+    save_trend_table(legacy, str(legacy_path))
+
+    exported_path = tmp_path / "reports" / "trend.csv"
+    trend_store.export_csv(str(exported_path), store_dir)
+    assert exported_path.read_text() == legacy_path.read_text()
+
+    subset_path = tmp_path / "subset.csv"
+    trend_store.export_csv(str(subset_path), store_dir, dates=["2024-06-03", "2024-06-04"])
+    assert subset_path.read_text().splitlines()[0] == "topic,2024-06-03,2024-06-04"